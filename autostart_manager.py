@@ -14,6 +14,9 @@ from typing import Optional, Tuple
 class AutostartManager:
     """开机启动项管理器"""
 
+    # 本进程写入注册表的次数（所有实例共享），状态缓存据此失效
+    registry_generation = 0
+
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self.last_error_code = None  # 记录最近一次失败原因，供上层展示
@@ -113,6 +116,7 @@ class AutostartManager:
         try:
             with self._open_registry_key(write=True) as key:
                 winreg.SetValueEx(key, name, 0, winreg.REG_SZ, command)
+                AutostartManager.registry_generation += 1
                 self.logger.info(f"设置开机启动项成功: {name} -> {command}")
                 return True
         except PermissionError as e:
@@ -131,6 +135,7 @@ class AutostartManager:
         try:
             with self._open_registry_key(write=True) as key:
                 winreg.DeleteValue(key, name)
+                AutostartManager.registry_generation += 1
                 self.logger.info(f"删除开机启动项成功: {name}")
                 return True
         except FileNotFoundError:
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+本地 REST 服务压测脚本
+在进程内创建 RestServer（不打开窗口），分别用不同的服务后端（见 rest_serving.py）监听随机端口，
+并发请求 /api/ping、/api/config、/api/scheduler/status，统计吞吐量（请求/秒）与延迟分位数，
+用于对比 Werkzeug 开发服务器（werkzeug）与线程池后端（pooled）。
+
+用法：
+    python bench_rest.py                                  # 两种后端、三个接口各 2000 次，并发 8
+    python bench_rest.py --count 5000 --concurrency 32
+    python bench_rest.py --backends pooled --no-keep-alive
+"""
+
+import argparse
+import http.client
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ENDPOINTS = ("/api/ping", "/api/config", "/api/scheduler/status")
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summarize(name, samples_ms, wall, errors):
+    if not samples_ms:
+        return f"{name:<24} 无样本（错误 {errors}）"
+    return (f"{name:<24} {len(samples_ms) / wall:9.1f} req/s  p50={percentile(samples_ms, 50):7.2f}ms  "
+            f"p95={percentile(samples_ms, 95):7.2f}ms  p99={percentile(samples_ms, 99):7.2f}ms  "
+            f"max={max(samples_ms):7.2f}ms  错误={errors}")
+
+
+def run_endpoint(port, path, count, concurrency, keep_alive):
+    """并发请求同一接口 count 次，返回 (延迟列表ms, 总耗时s, 错误数)"""
+    local = threading.local()
+    samples, errors = [], [0]
+    lock = threading.Lock()
+
+    def _conn():
+        conn = getattr(local, "conn", None)
+        if conn is None or not keep_alive:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+            local.conn = conn
+        return conn
+
+    def one(_):
+        t0 = time.perf_counter()
+        try:
+            conn = _conn()
+            conn.request("GET", path, headers={} if keep_alive else {"Connection": "close"})
+            resp = conn.getresponse()
+            resp.read()
+            ok = resp.status == 200
+            if not keep_alive or resp.getheader("Connection", "").lower() == "close":
+                conn.close()
+                local.conn = None
+        except (OSError, http.client.HTTPException):
+            ok = False
+            local.conn = None
+        elapsed = (time.perf_counter() - t0) * 1000
+        with lock:
+            if ok:
+                samples.append(elapsed)
+            else:
+                errors[0] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(count)))
+    return samples, time.perf_counter() - started, errors[0]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Auto Homework 本地 REST 服务压测")
+    ap.add_argument("--backends", default="werkzeug,pooled", help="逗号分隔：werkzeug、pooled")
+    ap.add_argument("--count", type=int, default=2000, help="每个接口的请求次数")
+    ap.add_argument("--concurrency", type=int, default=8, help="并发客户端数")
+    ap.add_argument("--warmup", type=int, default=100, help="每个接口正式计时前的预热请求数")
+    ap.add_argument("--workers", type=int, default=8, help="pooled 后端的工作线程数")
+    ap.add_argument("--max-pending", type=int, default=32, help="pooled 后端的排队连接数")
+    ap.add_argument("--no-keep-alive", action="store_true", help="每个请求新建连接")
+    args = ap.parse_args()
+
+    # 使用临时数据目录，避免读写用户的配置与运行记录
+    data_dir = tempfile.mkdtemp(prefix="ah_bench_rest_")
+    os.environ["APPDATA"] = data_dir
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from autostart_manager import AutostartManager
+    from homework_api import HomeworkAPI
+    from main import RestServer, ScheduleManager
+    from rest_serving import create_backend
+
+    api = HomeworkAPI()
+    scheduler = ScheduleManager(api)
+    scheduler.apply_config(api.get_config())
+    rest = RestServer(api, scheduler, AutostartManager())
+    keep_alive = not args.no_keep_alive
+
+    print(f"[Bench] 每个接口 {args.count} 次，并发 {args.concurrency}，"
+          f"{'keep-alive' if keep_alive else '每请求新建连接'}")
+    for backend_name in [b.strip() for b in args.backends.split(",") if b.strip()]:
+        backend = create_backend(rest._app, "127.0.0.1", 0, {
+            "rest_backend": backend_name,
+            "rest_workers": args.workers,
+            "rest_max_pending": args.max_pending,
+        })
+        thread = threading.Thread(target=backend.serve_forever, name="BenchREST", daemon=True)
+        thread.start()
+        print(f"\n== {backend_name} (127.0.0.1:{backend.port}) ==")
+        for path in ENDPOINTS:
+            run_endpoint(backend.port, path, args.warmup, args.concurrency, keep_alive)
+            samples, wall, errors = run_endpoint(backend.port, path, args.count, args.concurrency, keep_alive)
+            print(summarize(path, samples, wall, errors))
+        t0 = time.perf_counter()
+        drained = backend.drain(timeout=5)
+        print(f"drain: {'完成' if drained else '超时'}，{(time.perf_counter() - t0) * 1000:.1f}ms  "
+              f"{backend.snapshot()}")
+        thread.join(timeout=5)
+
+    scheduler.shutdown()
+    print(f"\n[Bench] 临时数据目录: {data_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+发送链路压测脚本
+在本地钉钉模拟服务上批量执行“预览→发送”，统计延迟分位数（p50/p95/p99）与吞吐量，
+用于离线检查重试、连接复用与限流行为，并发现性能回退。不会访问真实的 oapi.dingtalk.com。
+
+用法：
+    python bench_send.py --count 500 --concurrency 8 --latency-ms 50 --drop-rate 0.02
+    python bench_send.py --pptx 作业.pptx --targets 3
+    python bench_send.py --base-url http://127.0.0.1:18080   # 使用已启动的 mock_dingtalk.py
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summarize(name, samples_ms):
+    if not samples_ms:
+        return f"{name:<8} 无样本"
+    return (f"{name:<8} n={len(samples_ms):<6} p50={percentile(samples_ms, 50):8.2f}ms  "
+            f"p95={percentile(samples_ms, 95):8.2f}ms  p99={percentile(samples_ms, 99):8.2f}ms  "
+            f"max={max(samples_ms):8.2f}ms")
+
+
+def synthetic_content(lines):
+    body = "".join(f"- 第{i + 1}项作业：完成练习册第{i + 3}页\n" for i in range(lines))
+    return f"# 作业内容\n\n{body}"
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Auto Homework 发送链路压测")
+    ap.add_argument("--count", type=int, default=200, help="发送次数")
+    ap.add_argument("--concurrency", type=int, default=4, help="并发发送数")
+    ap.add_argument("--targets", type=int, default=1, help="每次发送的群数量")
+    ap.add_argument("--pptx", default=None, help="每次先解析该PPT再发送；不指定时使用合成内容")
+    ap.add_argument("--lines", type=int, default=20, help="合成内容的作业条数")
+    ap.add_argument("--base-url", default=None, help="使用已运行的模拟服务，不指定时在进程内启动")
+    ap.add_argument("--latency-ms", type=float, default=30.0)
+    ap.add_argument("--jitter-ms", type=float, default=20.0)
+    ap.add_argument("--errcode", type=int, default=0)
+    ap.add_argument("--error-rate", type=float, default=1.0, help="返回 --errcode 的比例")
+    ap.add_argument("--http-5xx-rate", type=float, default=0.0)
+    ap.add_argument("--drop-rate", type=float, default=0.0)
+    ap.add_argument("--server-rate-limit", type=int, default=0, help="模拟服务端每 token 每分钟限额")
+    ap.add_argument("--client-rate", type=int, default=0,
+                    help="客户端令牌桶速率（条/分钟），默认 0 表示放开以测量链路本身")
+    ap.add_argument("--no-outbox", action="store_true", help="不经过持久化发送队列")
+    args = ap.parse_args()
+
+    # 使用临时数据目录，避免读写用户的配置、缓存与发送队列
+    data_dir = tempfile.mkdtemp(prefix="ah_bench_")
+    os.environ["APPDATA"] = data_dir
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from homework_api import HomeworkAPI
+    from mock_dingtalk import MockDingTalkServer
+
+    server = None
+    base_url = args.base_url
+    if not base_url:
+        server = MockDingTalkServer(
+            latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, errcode=args.errcode,
+            error_rate=args.error_rate, status_5xx_rate=args.http_5xx_rate, drop_rate=args.drop_rate,
+            rate_limit_per_minute=args.server_rate_limit, keyword="作业",
+        ).start()
+        base_url = server.url
+
+    api = HomeworkAPI(dingtalk_base_url=base_url)
+    tokens = [f"bench{i:03d}" for i in range(max(1, args.targets))]
+    api.config.update({
+        "access_token": tokens[0],
+        "targets": [{"name": f"压测群{i}", "access_token": t} for i, t in enumerate(tokens[1:], 2)],
+        "outbox_enabled": not args.no_outbox,
+        "send_backoff_base": 0.05,
+        "dingtalk_rate_per_minute": args.client_rate or 10 ** 7,
+        "dingtalk_burst": args.client_rate // 4 if args.client_rate else 10 ** 6,
+        "rate_limit_max_wait": 30,
+        "send_pool_maxsize": max(8, args.concurrency * len(tokens)),
+    })
+    content = synthetic_content(args.lines)
+
+    preview_ms, send_ms, attempts = [], [], []
+    outcomes = {"ok": 0, "failed": 0, "queued": 0}
+
+    def one(_):
+        text = content
+        if args.pptx:
+            t0 = time.perf_counter()
+            parsed = api.preview_homework(args.pptx)
+            preview_ms.append((time.perf_counter() - t0) * 1000)
+            if not parsed.get("success"):
+                return {"success": False, "error": parsed.get("error")}
+            text = parsed["content"]
+        t0 = time.perf_counter()
+        result = api.send_to_dingtalk(text)
+        send_ms.append((time.perf_counter() - t0) * 1000)
+        for r in result.get("results", []):
+            attempts.append(len(r.get("attempts", [])))
+        return result
+
+    print(f"[Bench] 目标 {base_url}，{args.count} 次 × {len(tokens)} 个群，并发 {args.concurrency}")
+    started = time.perf_counter()
+    errors = {}
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for result in pool.map(one, range(args.count)):
+            if result.get("success"):
+                outcomes["ok"] += 1
+            else:
+                outcomes["queued" if result.get("queued") else "failed"] += 1
+                key = (result.get("error") or "")[:80]
+                errors[key] = errors.get(key, 0) + 1
+    wall = time.perf_counter() - started
+
+    messages = args.count * len(tokens)
+    print(summarize("preview", preview_ms) if args.pptx else "preview  （未启用）")
+    print(summarize("send", send_ms))
+    print(f"吞吐: {messages / wall:.1f} 条消息/秒（{args.count / wall:.1f} 次发送/秒），总耗时 {wall:.2f}s")
+    print(f"结果: {outcomes}")
+    if attempts:
+        print(f"每群平均尝试次数: {sum(attempts) / len(attempts):.2f}，最多 {max(attempts)}")
+    for err, n in sorted(errors.items(), key=lambda kv: -kv[1])[:5]:
+        print(f"  {n:>5} × {err}")
+    if server:
+        print(f"模拟服务统计: {dict(server.stats)}")
+        server.stop()
+    if api.outbox is not None:
+        print(f"发送队列: {api.outbox.summary(limit=1)['counts']}")
+    print(f"[Bench] 临时数据目录: {data_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -32,7 +32,6 @@ def build_with_nuitka():
         "--include-data-files=icon.ico=icon.ico",
         "--windows-icon-from-ico=icon.ico",
         "--include-module=webview.platforms.edgechromium",
-        "--include-module=schedule",
         "--include-module=requests",
         "--include-module=pptx",
         "--include-module=json",
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+进程内事件总线
+调度状态变化、发送任务进度与结果、更新下载进度、配置变更等都发布到总线，
+REST 服务通过 /api/events（Server-Sent Events）推送给界面，界面订阅一次即可，不再定时轮询。
+
+每个主题保留最后一条事件，新订阅者连接后立即收到各主题的当前状态；
+另保留最近的若干条事件，断线重连（Last-Event-ID）时补发错过的事件。
+"""
+
+import itertools
+import json
+import queue
+import threading
+import time
+from collections import deque
+
+TOPIC_SCHEDULER = "scheduler"
+TOPIC_JOB = "job"
+TOPIC_UPDATE = "update"
+TOPIC_CONFIG = "config"
+
+
+class Subscription:
+    """单个订阅者的事件队列；队列满时丢弃最旧的事件，慢订阅者不会拖慢发布方"""
+
+    def __init__(self, bus, topics, max_queue):
+        self._bus = bus
+        self.topics = set(topics) if topics else None
+        self._queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.closed = False
+
+    def wants(self, topic):
+        return self.topics is None or topic in self.topics
+
+    def put(self, event):
+        while True:
+            try:
+                self._queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        """取下一条事件，超时返回 None"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.closed = True
+        self._bus.unsubscribe(self)
+
+
+class EventBus:
+    """进程内发布/订阅：publish(topic, data) 发布，subscribe() 订阅"""
+
+    def __init__(self, history=200, max_queue=100):
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._subscribers = []
+        self._listeners = []
+        self._retained = {}
+        self._history = deque(maxlen=history)
+
+    def publish(self, topic, data):
+        """发布事件；data 需可 JSON 序列化。返回事件 ID。"""
+        with self._lock:
+            event = {"id": next(self._ids), "topic": topic, "ts": round(time.time(), 3), "data": data}
+            self._retained[topic] = event
+            self._history.append(event)
+            subscribers = [s for s in self._subscribers if s.wants(topic)]
+            listeners = [cb for topics, cb in self._listeners if topics is None or topic in topics]
+        for subscription in subscribers:
+            subscription.put(event)
+        for callback in listeners:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"[Events] 事件回调失败: {e}")
+        return event["id"]
+
+    def add_listener(self, callback, topics=None):
+        """注册进程内回调 callback(event)，在发布线程中同步调用（用于缓存失效等轻量处理）"""
+        with self._lock:
+            self._listeners.append((set(topics) if topics else None, callback))
+
+    def subscribe(self, topics=None, last_event_id=None, max_subscribers=None):
+        """订阅指定主题（None 表示全部）。
+
+        未提供 last_event_id 时先收到各主题保留的最后一条事件；提供时补发其后的历史事件
+        （已超出保留范围时退化为各主题的最后一条）。已有 max_subscribers 个订阅时返回 None。
+        """
+        subscription = Subscription(self, topics, self.max_queue)
+        with self._lock:
+            if max_subscribers is not None and len(self._subscribers) >= max_subscribers:
+                return None
+            replay = None
+            if last_event_id is not None and self._history and self._history[0]["id"] <= last_event_id + 1:
+                replay = [e for e in self._history if e["id"] > last_event_id]
+            if replay is None:
+                replay = sorted(self._retained.values(), key=lambda e: e["id"])
+            for event in replay:
+                if subscription.wants(event["topic"]):
+                    subscription.put(event)
+            self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    def close(self):
+        """关闭全部订阅（程序退出时调用），正在等待事件的 SSE 连接随即结束，不会拖住退出"""
+        with self._lock:
+            subscribers, self._subscribers = self._subscribers, []
+        for subscription in subscribers:
+            subscription.closed = True
+            subscription.put(None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "topics": sorted(self._retained),
+                "last_event_id": self._history[-1]["id"] if self._history else 0,
+            }
+
+
+def format_sse(event):
+    """把事件编码为 text/event-stream 格式"""
+    data = json.dumps(event["data"], ensure_ascii=False, default=str)
+    return f"id: {event['id']}\nevent: {event['topic']}\ndata: {data}\n\n"
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+PPT 文件监视模块
+监视配置中的 PPT 文件，在 PowerPoint 保存完成（文件状态稳定）后自动重新解析，
+使预览与定时发送直接读取已解析好的结果。
+变化通知优先使用系统机制（Windows 目录变更通知 / Linux inotify），不可用时回退到 stat 轮询；
+两种方式都以文件大小与修改时间为准做防抖，合并一次保存产生的多次写入。
+"""
+
+import os
+import sys
+import time
+import threading
+
+
+class _PollBackend:
+    """轮询后端：仅按间隔休眠，由调用方比较文件状态。"""
+
+    name = "poll"
+
+    def __init__(self, directory, stop_event, interval=2.0):
+        self._stop_event = stop_event
+        self.interval = interval
+
+    def wait(self, timeout):
+        self._stop_event.wait(min(timeout, self.interval))
+
+    def close(self):
+        pass
+
+
+class _WindowsBackend:
+    """Windows 目录变更通知（FindFirstChangeNotification），目录内有写入或重命名时唤醒。"""
+
+    name = "win32"
+
+    def __init__(self, directory, stop_event):
+        import win32file
+        import win32event
+        import win32con
+        self._win32file = win32file
+        self._win32event = win32event
+        flags = (win32con.FILE_NOTIFY_CHANGE_FILE_NAME
+                 | win32con.FILE_NOTIFY_CHANGE_SIZE
+                 | win32con.FILE_NOTIFY_CHANGE_LAST_WRITE)
+        self._handle = win32file.FindFirstChangeNotification(directory, False, flags)
+
+    def wait(self, timeout):
+        rc = self._win32event.WaitForSingleObject(self._handle, int(timeout * 1000))
+        if rc == self._win32event.WAIT_OBJECT_0:
+            self._win32file.FindNextChangeNotification(self._handle)
+
+    def close(self):
+        try:
+            self._win32file.FindCloseChangeNotification(self._handle)
+        except Exception:
+            pass
+
+
+class _InotifyBackend:
+    """Linux inotify（通过 ctypes 调用 libc），目录内有写入、移动或删除时唤醒。"""
+
+    name = "inotify"
+
+    _IN_MODIFY = 0x00000002
+    _IN_CLOSE_WRITE = 0x00000008
+    _IN_MOVED_TO = 0x00000080
+    _IN_CREATE = 0x00000100
+    _IN_DELETE = 0x00000200
+    _IN_NONBLOCK = 0o4000
+    _IN_CLOEXEC = 0o2000000
+
+    def __init__(self, directory, stop_event):
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(self._IN_NONBLOCK | self._IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = self._IN_MODIFY | self._IN_CLOSE_WRITE | self._IN_MOVED_TO | self._IN_CREATE | self._IN_DELETE
+        if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+            os.close(fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+        self._fd = fd
+
+    def wait(self, timeout):
+        import select
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if readable:
+            try:
+                # 只作为唤醒信号，事件内容无需解析
+                while os.read(self._fd, 65536):
+                    pass
+            except BlockingIOError:
+                pass
+
+    def close(self):
+        try:
+            os.close(self._fd)
+        except OSError:
+            pass
+
+
+def _create_backend(directory, stop_event, poll_interval):
+    """按平台选择监视后端，失败时回退到轮询。"""
+    try:
+        if sys.platform.startswith("win"):
+            return _WindowsBackend(directory, stop_event)
+        if sys.platform.startswith("linux"):
+            return _InotifyBackend(directory, stop_event)
+    except Exception as e:
+        print(f"[Watcher] 系统文件通知不可用，改用轮询: {e}")
+    return _PollBackend(directory, stop_event, poll_interval)
+
+
+class PptWatcher:
+    """监视单个 PPT 文件并在其稳定后重新解析，保持最新预览常驻内存"""
+
+    def __init__(self, api, on_update=None, debounce=1.5, poll_interval=2.0, idle_interval=5.0):
+        self.api = api
+        self.on_update = on_update
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        # 使用系统通知时的兜底唤醒间隔（防止通知丢失，如网络共享目录；同时用于响应停止/切换）
+        self.idle_interval = idle_interval
+        self._path = None
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._restart_event = threading.Event()
+        self._lock = threading.Lock()
+        self._latest = None
+        self._version = 0
+        self.backend_name = None
+
+    @staticmethod
+    def _signature(path):
+        try:
+            st = os.stat(path)
+            return st.st_size, st.st_mtime_ns
+        except OSError:
+            return None
+
+    def start(self, path):
+        self.set_path(path)
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name="PptWatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._restart_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.idle_interval + 1)
+
+    def set_path(self, path):
+        """切换监视的文件；路径未变化时不做任何事。"""
+        path = os.path.abspath(path) if path else None
+        with self._lock:
+            if path == self._path:
+                return
+            self._path = path
+            self._latest = None
+        self._restart_event.set()
+
+    def get_latest(self, file_path=None):
+        """返回最近一次解析结果；指定路径与监视路径不一致时返回 None。"""
+        with self._lock:
+            latest = self._latest
+        if not latest:
+            return None
+        if file_path and os.path.abspath(file_path) != latest["file_path"]:
+            return None
+        return dict(latest)
+
+    def _refresh(self, path):
+        result = self.api.parse_ppt_to_markdown(path)
+        if not result.get("success"):
+            print(f"[Watcher] 重新解析失败，保留上一次结果: {result.get('error')}")
+            return
+        with self._lock:
+            if path != self._path:
+                return
+            self._version += 1
+            self._latest = {
+                "file_path": path,
+                "file_name": os.path.basename(path),
+                "content": result["content"],
+                "version": self._version,
+                "updated_at": time.time(),
+            }
+            latest = dict(self._latest)
+        print(f"[Watcher] 预览已更新(v{latest['version']}): {path}")
+        if self.on_update:
+            try:
+                self.on_update(latest)
+            except Exception as e:
+                print(f"[Watcher] 推送更新失败: {e}")
+
+    def _loop(self):
+        while not self._stop_event.is_set():
+            self._restart_event.clear()
+            path = self._path
+            if not path:
+                self._restart_event.wait()
+                continue
+            directory = os.path.dirname(path)
+            if not os.path.isdir(directory):
+                self._restart_event.wait(self.idle_interval)
+                continue
+
+            backend = _create_backend(directory, self._stop_event, self.poll_interval)
+            self.backend_name = backend.name
+            print(f"[Watcher] 开始监视({backend.name}): {path}")
+            try:
+                self._watch(path, backend)
+            except Exception as e:
+                print(f"[Watcher] 监视异常: {e}")
+                self._stop_event.wait(self.poll_interval)
+            finally:
+                backend.close()
+
+    def _watch(self, path, backend):
+        # 启动时预热一次，首次预览即可命中
+        last_sig = self._signature(path)
+        if last_sig is not None:
+            self._refresh(path)
+        changed_at = None
+
+        while not self._stop_event.is_set() and not self._restart_event.is_set():
+            backend.wait(self.debounce if changed_at is not None else self.idle_interval)
+            sig = self._signature(path)
+            if sig != last_sig:
+                # 保存过程中会连续写入/替换文件：每次变化都重新计时，直到状态稳定
+                last_sig = sig
+                changed_at = time.monotonic()
+                continue
+            if changed_at is not None and time.monotonic() - changed_at >= self.debounce:
+                changed_at = None
+                if sig is not None:
+                    self._refresh(path)
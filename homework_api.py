@@ -1,12 +1,29 @@
 import os
 import json
+import queue
 import requests
 import sys
+from urllib3 import exceptions as urllib3_exceptions
 from pathlib import Path
+from urllib.parse import urlparse, parse_qs
 from pptx import Presentation
+from pptx_fast_reader import read_last_slide_texts, FastPathUnsupported
+from parse_worker import ParseWorker
+from file_watcher import PptWatcher
+from outbox import Outbox, STATUS_SENT
+from jobs import JobManager
+from events import EventBus, TOPIC_CONFIG, TOPIC_JOB
+from metrics import (MetricsRegistry, TimedHTTPAdapter, begin_request_timing, end_request_timing,
+                     request_opened_connection)
 from tkinter import filedialog
 import threading
 import time
+import hashlib
+import random
+import socket
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 
 def get_app_data_path():
     """获取应用数据存储路径（优先使用用户AppData\Auto_Homework）。"""
@@ -24,10 +41,456 @@ def get_app_data_path():
             pass
         return os.path.abspath(os.path.dirname(__file__))
 
+
+DINGTALK_BASE_URL = "https://oapi.dingtalk.com"
+# 钉钉自定义机器人限流错误码（每分钟超过配额）
+DINGTALK_RATE_LIMIT_ERRCODES = {130101, 130102}
+
+
+def normalize_access_token(value):
+    """支持直接填写 webhook 链接：从中解析出 access_token；其余情况原样去除空白。"""
+    if not isinstance(value, str):
+        return ""
+    value = value.strip()
+    if "access_token=" in value:
+        try:
+            at = (parse_qs(urlparse(value).query).get("access_token") or [""])[0]
+            if at:
+                return at
+        except Exception:
+            pass
+    return value
+
+
+def _mask_token(error, token):
+    """错误信息中可能带有完整 URL，隐藏其中的 access_token 以免写入日志或界面。"""
+    text = str(error)
+    return text.replace(token, "***") if token else text
+
+
+def _failed_before_send(error):
+    """判断连接错误是否发生在请求发出之前（DNS 解析失败、建连失败、连接超时）。
+
+    其他连接错误（如复用的长连接在请求发出后被对端重置）无法确定钉钉是否已经处理了该请求。
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    seen = set()
+    pending = [error]
+    while pending:
+        exc = pending.pop()
+        if exc is None or id(exc) in seen:
+            continue
+        seen.add(id(exc))
+        if isinstance(exc, (urllib3_exceptions.NewConnectionError, urllib3_exceptions.ConnectTimeoutError,
+                            socket.gaierror)):
+            return True
+        # requests 把 urllib3 的 MaxRetryError 放在 args 中，真正的原因在其 reason 上
+        pending.append(getattr(exc, "reason", None))
+        pending.append(exc.__cause__)
+        pending.extend(a for a in getattr(exc, "args", ()) if isinstance(a, BaseException))
+    return False
+
+
+def _fast_file_hash(file_path, size, block=64 * 1024):
+    """快速指纹：仅读取文件首尾各 64KB，配合大小与修改时间判定内容是否变化。"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        h.update(f.read(block))
+        if size > block:
+            f.seek(max(block, size - block))
+            h.update(f.read(block))
+    return h.hexdigest()
+
+
+class ParseCache:
+    """PPT 解析结果缓存：按（绝对路径、大小、mtime_ns、可选快速哈希）判定有效，LRU 淘汰并持久化到 AppData。"""
+
+    def __init__(self, cache_file=None, max_entries=128, max_bytes=4 * 1024 * 1024, use_hash=False):
+        self.cache_file = cache_file or os.path.join(get_app_data_path(), 'parse_cache.json')
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.use_hash = use_hash
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def _size(content):
+        return len(content.encode('utf-8'))
+
+    @staticmethod
+    def _normalize(file_path):
+        return os.path.normcase(os.path.abspath(file_path))
+
+    def signature(self, file_path):
+        """计算文件签名；文件不可访问时抛出 OSError。"""
+        path = self._normalize(file_path)
+        st = os.stat(path)
+        digest = _fast_file_hash(path, st.st_size) if self.use_hash else ""
+        return path, {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "hash": digest}
+
+    def get(self, file_path):
+        """命中返回缓存的 Markdown，否则返回 None。"""
+        try:
+            path, sig = self.signature(file_path)
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry and all(entry.get(k) == v for k, v in sig.items()):
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry["content"]
+            self.misses += 1
+            return None
+
+    def put(self, file_path, content, sig=None):
+        """写入缓存并持久化；sig 为解析前取得的签名，避免解析期间文件被改写导致误存。"""
+        try:
+            path, cur = (self._normalize(file_path), sig) if sig else self.signature(file_path)
+        except OSError:
+            return
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old:
+                self._bytes -= self._size(old["content"])
+            self._entries[path] = {**cur, "content": content}
+            self._bytes += self._size(content)
+            self._evict_locked()
+            snapshot = list(self._entries.items())
+        self._save(snapshot)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        self._save([])
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _evict_locked(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, old = self._entries.popitem(last=False)
+            self._bytes -= self._size(old["content"])
+
+    def _load(self):
+        try:
+            if os.path.exists(self.cache_file):
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                for path, entry in data.get("entries", []):
+                    if isinstance(entry, dict) and isinstance(entry.get("content"), str):
+                        self._entries[path] = entry
+                        self._bytes += self._size(entry["content"])
+                self._evict_locked()
+        except Exception as e:
+            print('[ParseCache] load failed:', e)
+            self._entries.clear()
+            self._bytes = 0
+
+    def _save(self, snapshot):
+        # 先写临时文件再替换，避免进程被杀时留下半截 JSON
+        try:
+            tmp = self.cache_file + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({"version": 1, "entries": snapshot}, f, ensure_ascii=False)
+            os.replace(tmp, self.cache_file)
+        except Exception as e:
+            print('[ParseCache] save failed:', e)
+
+
+def _read_last_slide_texts_pptx(file_path, timings=None):
+    """使用 python-pptx 读取最后一页的形状文本（完整加载演示文稿）。"""
+    started = time.perf_counter()
+    presentation = Presentation(file_path)
+    opened = time.perf_counter()
+    texts = []
+    # 只处理最后一页
+    if presentation.slides:
+        last_slide = presentation.slides[-1]
+        for shape in last_slide.shapes:
+            if hasattr(shape, "text"):
+                texts.append(shape.text)
+    if timings is not None:
+        # python-pptx 在打开时即解析全部部件，open 中已包含大部分 XML 解析
+        timings["open"] = (opened - started) * 1000
+        timings["xml_parse"] = (time.perf_counter() - opened) * 1000
+    return texts
+
+
+def shape_texts_to_markdown(texts):
+    """将形状文本列表转换为作业 Markdown。"""
+    markdown_content = "# 作业内容\n\n"
+    for text in texts:
+        if text.strip():
+            # 每行一个无序列表项（不额外添加空白行）
+            normalized = text.replace('\r', '\n')
+            lines = [ln.strip() for ln in normalized.split('\n') if ln.strip()]
+            for ln in lines:
+                markdown_content += f"- {ln}\n"
+
+    # 去除结尾多余空白行，仅保留必要结尾换行
+    return markdown_content.rstrip() + "\n"
+
+
+def extract_homework_markdown(file_path, engine="auto", timings=None):
+    """解析PPT最后一页为 Markdown，失败时抛出异常。
+
+    engine 为 "auto" 时优先使用流式快速路径，遇到无法处理的结构再回退到 python-pptx；
+    为 "pptx" 时始终使用 python-pptx。传入 timings 时记录 open/xml_parse/markdown 各阶段耗时（毫秒）。
+    """
+    texts = None
+    if engine != "pptx":
+        try:
+            texts = read_last_slide_texts(file_path, timings)
+        except FastPathUnsupported as e:
+            print(f"[Parse] 快速路径不可用，回退到 python-pptx: {e}")
+        except Exception as e:
+            print(f"[Parse] 快速路径异常，回退到 python-pptx: {e}")
+    if texts is None:
+        texts = _read_last_slide_texts_pptx(file_path, timings)
+    started = time.perf_counter()
+    content = shape_texts_to_markdown(texts)
+    if timings is not None:
+        timings["markdown"] = (time.perf_counter() - started) * 1000
+    return content
+
+
+def build_dingtalk_payload(content):
+    """构建钉钉 Markdown 消息体。"""
+    # 确保消息包含"作业"字段
+    if "作业" not in content:
+        content = f"【作业通知】\n\n{content}"
+    return {
+        "msgtype": "markdown",
+        "markdown": {
+            "title": "作业通知",
+            "text": content
+        }
+    }
+
+
+def _utf8_len(text):
+    return len(text.encode("utf-8"))
+
+
+def _split_line_bytes(line, limit):
+    """按 UTF-8 字节数切分过长的单行，不会拆开多字节字符。"""
+    chunks, current, size = [], [], 0
+    for ch in line:
+        n = _utf8_len(ch)
+        if current and size + n > limit:
+            chunks.append("".join(current))
+            current, size = [], 0
+        current.append(ch)
+        size += n
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+def split_homework_markdown(content, max_bytes):
+    """将超过钉钉消息长度上限的 Markdown 按行（作业条目）拆分为多条，长度按 UTF-8 字节计算。
+
+    每条以“【作业 i/n】”开头（同时满足机器人“作业”关键词校验）；被拆开的科目在下一条中
+    以“## 科目（续）”延续标题。未超限时原样返回单条。
+    """
+    if _utf8_len(content) <= max_bytes:
+        return [content]
+
+    # 预留编号前缀的长度（按三位数计算）
+    budget = max_bytes - _utf8_len("【作业 999/999】\n\n")
+    heading_limit = budget // 4
+    piece_limit = budget - heading_limit - 2
+    if piece_limit <= 0:
+        raise ValueError(f"消息长度上限过小: {max_bytes}")
+
+    parts, current, size = [], [], 0
+    heading = None
+    for line in content.rstrip("\n").split("\n"):
+        if line.startswith("## "):
+            heading = line if _utf8_len(line) <= heading_limit else None
+        pieces = _split_line_bytes(line, piece_limit) if _utf8_len(line) > piece_limit else [line]
+        for piece in pieces:
+            n = _utf8_len(piece) + 1
+            if current and size + n > budget:
+                parts.append(current)
+                current, size = [], 0
+                if heading and piece != heading:
+                    cont = f"{heading}（续）"
+                    current.append(cont)
+                    size += _utf8_len(cont) + 1
+            current.append(piece)
+            size += n
+    if current:
+        parts.append(current)
+
+    total = len(parts)
+    return [f"【作业 {i}/{total}】\n\n" + "\n".join(part).strip("\n") + "\n" for i, part in enumerate(parts, 1)]
+
+
+def _parse_in_subprocess(file_path, engine="auto"):
+    """子进程工作函数：解析单个PPT并返回结果与耗时（需为模块级函数以便在子进程中导入）。"""
+    started = time.perf_counter()
+    timings = {}
+    try:
+        content = extract_homework_markdown(file_path, engine, timings)
+        result = {"success": True, "content": content}
+    except Exception as e:
+        result = {"success": False, "error": str(e)}
+    result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    result["timings"] = timings
+    return result
+
+
+def merge_homework_markdown(sections):
+    """将多个科目的作业合并为一份 Markdown；sections 为 [(科目, Markdown)]，按给定顺序输出。"""
+    markdown_content = "# 作业内容\n"
+    for subject, content in sections:
+        bullets = [ln for ln in content.split("\n") if ln.startswith("- ")]
+        if not bullets:
+            continue
+        markdown_content += f"\n## {subject}\n\n" + "\n".join(bullets) + "\n"
+    return markdown_content.rstrip() + "\n"
+
+
+class TokenBucket:
+    """单个钉钉机器人的令牌桶：发送前排队取令牌，而不是超额后被钉钉限流 10 分钟。
+
+    为保证任意 60 秒内不超过 rate_per_minute 条，容量 burst 与每分钟补充量之和等于配额；
+    收到钉钉限流错误码时补充速率减半（乘性减少），之后每次成功缓慢恢复（加性增加）。
+    """
+
+    MIN_REFILL_PER_MINUTE = 1.0
+
+    def __init__(self, rate_per_minute=20, burst=5):
+        self._cond = threading.Condition()
+        self.waiting = 0
+        self.throttled = 0
+        self.refill = None
+        self.tokens = None
+        self._updated = time.monotonic()
+        self.configure(rate_per_minute, burst)
+
+    def configure(self, rate_per_minute, burst):
+        with self._cond:
+            self.rate_per_minute = max(1, int(rate_per_minute))
+            self.burst = max(1, int(burst))
+            self.capacity = max(1, min(self.burst, self.rate_per_minute - 1))
+            self.base_refill = max(self.MIN_REFILL_PER_MINUTE, self.rate_per_minute - self.capacity) / 60.0
+            # 已被限流收缩的速率不因重新配置而直接恢复
+            self.refill = self.base_refill if self.refill is None else min(self.refill, self.base_refill)
+            self.tokens = float(self.capacity) if self.tokens is None else min(self.tokens, self.capacity)
+            self._cond.notify_all()
+
+    def _refill_locked(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.refill)
+        self._updated = now
+
+    def _expected_wait_locked(self, position):
+        """队列中第 position 个请求（从 1 开始）预计的等待秒数。"""
+        missing = position - self.tokens
+        return max(0.0, missing / self.refill)
+
+    def expected_wait(self):
+        with self._cond:
+            self._refill_locked()
+            return self._expected_wait_locked(self.waiting + 1)
+
+    def acquire(self, timeout=None):
+        """取得一个令牌，返回实际等待秒数；超过 timeout 仍未取得时返回 None。"""
+        started = time.monotonic()
+        with self._cond:
+            self.waiting += 1
+            try:
+                while True:
+                    self._refill_locked()
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return time.monotonic() - started
+                    wait = self._expected_wait_locked(1)
+                    if timeout is not None:
+                        remaining = timeout - (time.monotonic() - started)
+                        if remaining <= 0:
+                            return None
+                        wait = min(wait, remaining)
+                    self._cond.wait(wait)
+            finally:
+                self.waiting -= 1
+                self._cond.notify_all()
+
+    def on_throttled(self):
+        """钉钉返回限流：清空令牌并将补充速率减半。"""
+        with self._cond:
+            self.throttled += 1
+            self.tokens = 0.0
+            self._updated = time.monotonic()
+            self.refill = max(self.MIN_REFILL_PER_MINUTE / 60.0, self.refill / 2)
+
+    def on_success(self):
+        """发送成功：补充速率每次恢复每分钟 1 条，直至配置值。"""
+        with self._cond:
+            if self.refill < self.base_refill:
+                self.refill = min(self.base_refill, self.refill + 1 / 60.0)
+
+    def status(self):
+        with self._cond:
+            self._refill_locked()
+            return {
+                "waiting": self.waiting,
+                "tokens": round(self.tokens, 2),
+                "capacity": self.capacity,
+                "refill_per_minute": round(self.refill * 60, 2),
+                "base_refill_per_minute": round(self.base_refill * 60, 2),
+                "expected_wait_s": round(self._expected_wait_locked(self.waiting + 1), 2),
+                "throttled": self.throttled,
+            }
+
+
 class HomeworkAPI:
-    def __init__(self):
+    def __init__(self, dingtalk_base_url=None):
+        # 钉钉接口地址覆盖（用于本地模拟服务 mock_dingtalk.py 与压测）；
+        # 未指定时依次读取环境变量 AH_DINGTALK_BASE_URL 与配置 dingtalk_base_url
+        self.dingtalk_base_url = dingtalk_base_url
         self.config_file = os.path.join(get_app_data_path(), "config.json")
         self.config = self.load_config()
+        self.parse_cache = ParseCache(use_hash=bool(self.config.get("parse_cache_hash", False)))
+        self.parse_worker = ParseWorker()
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._send_attempts = deque(maxlen=200)
+        self._fanout_pool = None
+        self._rate_limiters = {}
+        self.watcher = None
+        # 批量解析：一组 ParseWorker（各自管理一个子进程）及驱动它们的线程
+        self._batch_workers = None
+        self._batch_threads = None
+        self._batch_pool_lock = threading.Lock()
+        self.outbox = self._open_outbox()
+        # 所有发送（界面、REST、定时任务）共用的有界任务队列
+        self.jobs = JobManager(max_workers=max(1, int(self.config.get("send_job_workers", 2))))
+        # 进程内事件总线：任务进度、配置变更等经 /api/events 推送给界面
+        self.events = EventBus()
+        self.jobs.add_listener(lambda job: self.events.publish(TOPIC_JOB, job))
+        # 解析与发送的分阶段耗时
+        self.metrics = MetricsRegistry(os.path.join(get_app_data_path(), "send_metrics.jsonl"))
+        self.last_warmup = None
         
     def load_config(self):
         """加载配置文件"""
@@ -79,7 +542,83 @@ class HomeworkAPI:
             pass
         with open(self.config_file, 'w', encoding='utf-8') as f:
             json.dump(self.config, f, ensure_ascii=False, indent=2)
+        self._sync_watcher()
+        self.events.publish(TOPIC_CONFIG, self.config)
         return {"success": True}
+
+    def start_watcher(self, on_update=None):
+        """启动PPT文件监视：文件保存后自动重新解析并保持最新预览常驻内存"""
+        if not bool(self.config.get("watch_ppt_file", True)):
+            return
+        if self.watcher is None:
+            self.watcher = PptWatcher(self, on_update=on_update)
+        self.watcher.start(self.config.get("ppt_file_path"))
+
+    def _sync_watcher(self):
+        if self.watcher is not None:
+            self.watcher.set_path(self.config.get("ppt_file_path"))
+
+    def get_latest_preview(self):
+        """获取监视器预先解析好的最新预览"""
+        latest = self.watcher.get_latest() if self.watcher else None
+        if not latest:
+            return {"success": False, "error": "暂无预解析结果"}
+        return {"success": True, **latest}
+    
+    def _open_outbox(self):
+        """打开持久化发送队列；数据库不可用时返回 None，发送退化为直接发送"""
+        try:
+            return Outbox(
+                os.path.join(get_app_data_path(), "outbox.db"),
+                self._post_payload,
+                max_attempts=int(self.config.get("outbox_max_attempts", 20)),
+                max_age_hours=float(self.config.get("outbox_max_age_hours", 12)),
+            )
+        except Exception as e:
+            print(f"[Outbox] 无法打开发送队列，将直接发送: {e}")
+            return None
+
+    def start_outbox(self):
+        """启动发送队列的后台补发：恢复上次未送达的消息并在网络恢复后重发"""
+        if self.outbox is not None:
+            self.outbox.start()
+
+    def get_outbox_status(self, limit=50):
+        """获取发送队列状态"""
+        try:
+            if self.outbox is None:
+                return {"success": False, "error": "发送队列不可用"}
+            return {"success": True, **self.outbox.summary(limit)}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    
+    def submit_send_homework(self, file_path, source="ui"):
+        """提交“解析并发送”任务，立即返回任务 ID"""
+        return self.jobs.submit("send_homework", self.send_homework, file_path, source=source)
+
+    def submit_send_content(self, content, source="ui"):
+        """提交“发送编辑后内容”任务，立即返回任务 ID"""
+        return self.jobs.submit("send_content", self.send_to_dingtalk, content, source=source)
+
+    def get_job(self, job_id, wait=0, since_version=None):
+        """查询发送任务；wait > 0 时长轮询，直到任务完成、状态变化或超时"""
+        try:
+            if wait and wait > 0:
+                job = self.jobs.wait(job_id, timeout=wait, since_version=since_version)
+            else:
+                job = self.jobs.get(job_id)
+            if job is None:
+                return {"success": False, "error": "任务不存在或已过期"}
+            return {"success": True, "job": job}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    def list_jobs(self, limit=50):
+        """获取最近的发送任务"""
+        try:
+            return {"success": True, "jobs": self.jobs.list(limit), **self.jobs.stats()}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
     
     def select_ppt_file(self):
         """选择PPT文件"""
@@ -105,62 +644,623 @@ class HomeworkAPI:
             return {"success": False, "error": str(e)}
     
     def parse_ppt_to_markdown(self, file_path):
-        """将PPT转换为Markdown格式"""
+        """将PPT转换为Markdown格式（文件未变化时直接返回缓存结果）"""
+        started = time.perf_counter()
+        use_cache = bool(self.config.get("parse_cache_enabled", True))
+        sig = None
+        if use_cache:
+            cached = self.parse_cache.get(file_path)
+            if cached is not None:
+                self.metrics.observe("parse.cache_hit", (time.perf_counter() - started) * 1000)
+                return {"success": True, "content": cached, "cached": True}
+            try:
+                _, sig = self.parse_cache.signature(file_path)
+            except OSError:
+                sig = None
+
+        result = self._parse_ppt_uncached(file_path)
+        self._record_parse_metrics(file_path, result, (time.perf_counter() - started) * 1000)
+        if use_cache and sig and result.get("success"):
+            self.parse_cache.put(file_path, result["content"], sig)
+        return result
+
+    def _record_parse_metrics(self, file_path, result, total_ms):
         try:
-            presentation = Presentation(file_path)
-            markdown_content = "# 作业内容\n\n"
-            
-            # 只处理最后一页
-            if presentation.slides:
-                last_slide = presentation.slides[-1]
-                
-                for shape in last_slide.shapes:
-                    if hasattr(shape, "text") and shape.text.strip():
-                        # 每行一个无序列表项（不额外添加空白行）
-                        normalized = shape.text.replace('\r', '\n')
-                        lines = [ln.strip() for ln in normalized.split('\n') if ln.strip()]
-                        for ln in lines:
-                            markdown_content += f"- {ln}\n"
-
-            # 去除结尾多余空白行，仅保留必要结尾换行
-            markdown_content = markdown_content.rstrip() + "\n"
-            
-            return {"success": True, "content": markdown_content}
+            phases = dict(result.pop("timings", None) or {})
+            worker_ms = result.pop("elapsed_ms", None)
+            if worker_ms is not None:
+                # 子进程外的开销：进程启动、管道传输与排队
+                phases["ipc"] = max(0.0, total_ms - worker_ms)
+            phases["total"] = total_ms
+            self.metrics.observe_phases("parse", phases)
+            self.metrics.record_sample("parse", phases, file=os.path.basename(file_path),
+                                       success=bool(result.get("success")))
+        except Exception as e:
+            print(f"[Metrics] 记录解析耗时失败: {e}")
+
+    def get_parse_cache_stats(self):
+        """获取解析缓存命中统计"""
+        try:
+            return {"success": True, **self.parse_cache.stats()}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    def _configure_parse_worker(self, worker, timeout):
+        worker.timeout = timeout
+        worker.max_rss_mb = int(self.config.get("parse_max_rss_mb", 1024))
+        worker.max_tasks = int(self.config.get("parse_worker_max_tasks", 20))
+
+    def _parse_ppt_uncached(self, file_path):
+        """实际解析PPT，不经过缓存（默认在隔离子进程中执行）"""
+        try:
+            engine = self.config.get("parse_engine", "auto")
+            if not bool(self.config.get("parse_isolated", True)):
+                timings = {}
+                content = extract_homework_markdown(file_path, engine, timings)
+                return {"success": True, "content": content, "timings": timings}
+
+            # 每次解析前同步配置，保存设置后无需重启
+            self._configure_parse_worker(self.parse_worker, float(self.config.get("parse_timeout", 60)))
+            return self.parse_worker.parse(file_path, engine)
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    def cancel_parse(self):
+        """取消正在进行的PPT解析"""
+        try:
+            return {"success": True, "cancelled": self.parse_worker.cancel()}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    def get_parse_worker_status(self):
+        """获取解析子进程状态"""
+        try:
+            return {"success": True, **self.parse_worker.status()}
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    def send_to_dingtalk(self, content, access_token=None):
-        """发送消息到钉钉"""
+    def get_send_targets(self, profile=None):
+        """获取发送目标列表：默认群（access_token）加上 targets 中启用的命名群，按 token 去重
+
+        profile 为发送方案（见 profiles.py），不指定时使用顶层配置。
+        """
+        config = profile or self.config
+        targets = []
+        default_token = normalize_access_token(config.get("access_token"))
+        if default_token:
+            targets.append({"name": config.get("access_token_name") or "默认群", "access_token": default_token})
+        for i, item in enumerate(config.get("targets") or []):
+            if not isinstance(item, dict) or item.get("enabled") is False:
+                continue
+            token = normalize_access_token(item.get("access_token"))
+            if token:
+                targets.append({"name": item.get("name") or f"群{i + 1}", "access_token": token})
+        seen = set()
+        unique = []
+        for t in targets:
+            if t["access_token"] not in seen:
+                seen.add(t["access_token"])
+                unique.append(t)
+        return unique
+
+    def send_to_dingtalk(self, content, access_token=None, dedup_key=None, profile=None):
+        """发送消息到钉钉（未指定 access_token 时并发发送到所有配置的群）
+
+        dedup_key 用于去重：同一键的消息只会入队一次（例如同一天同一时刻的定时发送）。
+        """
         try:
-            token = access_token or self.config.get("access_token")
-            if not token:
+            if access_token:
+                targets = [{"name": "指定群", "access_token": normalize_access_token(access_token)}]
+            else:
+                targets = self.get_send_targets(profile)
+            if not targets:
                 return {"success": False, "error": "未设置ACCESS_TOKEN"}
-            
-            # 确保消息包含"作业"字段
-            if "作业" not in content:
-                content = f"【作业通知】\n\n{content}"
-            
-            url = f"https://oapi.dingtalk.com/robot/send?access_token={token}"
-            
-            payload = {
-                "msgtype": "markdown",
-                "markdown": {
-                    "title": "作业通知",
-                    "text": content
+            return self._fan_out(self.build_dingtalk_payloads(content), targets, dedup_key)
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    def _get_fanout_pool(self):
+        with self._session_lock:
+            if self._fanout_pool is None:
+                self._fanout_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="DingTalkSend")
+            return self._fanout_pool
+
+    def build_dingtalk_payloads(self, content):
+        """构建消息体列表：超过钉钉长度上限（dingtalk_max_bytes，UTF-8 字节）时拆分为多条"""
+        max_bytes = int(self.config.get("dingtalk_max_bytes", 18000))
+        return [build_dingtalk_payload(part) for part in split_homework_markdown(content, max_bytes)]
+
+    def _fan_out(self, payloads, targets, dedup_key=None):
+        """将同一组消息体并发发送到多个群，总耗时约等于最慢的一个群；返回逐群结果
+
+        拆分后的多条消息在每个群内按顺序逐条发送（复用同一长连接），前一条未送达时不会先发后一条。
+        """
+        started = time.perf_counter()
+        total = len(payloads)
+
+        def _send_one(target):
+            t0 = time.perf_counter()
+            parts, attempts, message = [], [], None
+            for i, payload in enumerate(payloads, 1):
+                key = f"{dedup_key}:p{i}" if dedup_key and total > 1 else dedup_key
+                if parts and not parts[-1]["success"]:
+                    # 前一条已进入待发送队列时，后续部分也只入队，由后台按顺序补发
+                    if parts[-1]["queued"] and self._enqueue_only(target, payload, key):
+                        parts.append({"part": i, "success": False, "queued": True, "error": "等待前一部分送达"})
+                    else:
+                        parts.append({"part": i, "success": False, "queued": False, "error": "前一部分发送失败，已跳过"})
+                    continue
+                result = self._send_via_outbox(target, payload, key)
+                attempts.extend(result.get("attempts", []))
+                message = result.get("message")
+                parts.append({"part": i, "success": bool(result.get("success")),
+                              "queued": bool(result.get("queued")), "error": result.get("error")})
+
+            failed = next((p for p in parts if not p["success"]), None)
+            error = None
+            if failed:
+                error = failed["error"] if total == 1 else f"第 {failed['part']}/{total} 部分: {failed['error']}"
+            item = {
+                "name": target["name"],
+                "success": failed is None,
+                "message": message if failed is None else None,
+                "error": error,
+                "queued": bool(failed and failed["queued"]),
+                "attempts": attempts,
+                "elapsed_ms": round((time.perf_counter() - t0) * 1000, 2),
+            }
+            if total > 1:
+                item["parts"] = parts
+            return item
+
+        if len(targets) == 1:
+            results = [_send_one(targets[0])]
+        else:
+            pool = self._get_fanout_pool()
+            results = [f.result() for f in [pool.submit(_send_one, t) for t in targets]]
+
+        ok = sum(1 for r in results if r["success"])
+        summary = {
+            "results": results,
+            "parts": total,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+        if ok == len(results):
+            message = "发送成功" if len(results) == 1 else f"发送成功（{ok}/{len(results)} 个群）"
+            if total > 1:
+                message += f"，内容过长已拆分为 {total} 条"
+            return {"success": True, "message": message, **summary}
+        summary["queued"] = sum(1 for r in results if r["queued"])
+        if len(results) == 1:
+            return {"success": False, "error": results[0]["error"], **summary}
+        failed = "；".join(f"{r['name']}: {r['error']}" for r in results if not r["success"])
+        return {"success": False, "error": f"{len(results) - ok}/{len(results)} 个群发送失败 - {failed}", **summary}
+
+    def _outbox_enabled(self):
+        return self.outbox is not None and bool(self.config.get("outbox_enabled", True))
+
+    @staticmethod
+    def _outbox_key(token, dedup_key):
+        if dedup_key:
+            return f"{dedup_key}:{hashlib.sha1(token.encode('utf-8')).hexdigest()[:12]}"
+        return uuid.uuid4().hex
+
+    def _enqueue_only(self, target, payload, dedup_key=None):
+        """只写入发送队列、不立即投递（由后台按入队顺序发送）；队列不可用时返回 False"""
+        if not self._outbox_enabled():
+            return False
+        token = target["access_token"]
+        self.outbox.enqueue(token, payload, self._outbox_key(token, dedup_key), target["name"])
+        self.outbox.wake()
+        return True
+
+    def _send_via_outbox(self, target, payload, dedup_key=None):
+        """先写入发送队列再立即投递一次；可重试的失败留在队列中由后台补发"""
+        token = target["access_token"]
+        if not self._outbox_enabled():
+            return self._post_payload(token, payload)
+        item, created = self.outbox.enqueue(token, payload, self._outbox_key(token, dedup_key), target["name"])
+        if not created and item["status"] == STATUS_SENT:
+            return {"success": True, "message": "已发送过，跳过重复发送", "deduplicated": True, "attempts": []}
+        if not self.outbox.claim(item["id"]):
+            # 同一消息正在由其他线程发送，或已被放弃
+            return {"success": False, "error": item.get("last_error") or "该消息正在发送中",
+                    "queued": item["status"] != "failed", "attempts": []}
+        result = self.outbox.deliver(item)
+        if result.get("queued"):
+            result["error"] = f"{result.get('error')}（已加入待发送队列，网络恢复后自动重发）"
+        return result
+
+    def _get_session(self):
+        """懒加载长连接会话：复用 DNS/TCP/TLS，连接池大小可配置，重试由 _post_payload 自行控制"""
+        with self._session_lock:
+            if self._session is None:
+                session = requests.Session()
+                # 可计时的适配器：记录新建连接的 DNS/建连/TLS 与每次请求的服务端耗时
+                adapter = TimedHTTPAdapter(
+                    pool_connections=4,
+                    pool_maxsize=int(self.config.get("send_pool_maxsize", 8)),
+                    max_retries=0,
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+            return self._session
+
+    def _send_url(self):
+        base = (self.dingtalk_base_url or os.environ.get("AH_DINGTALK_BASE_URL")
+                or self.config.get("dingtalk_base_url") or DINGTALK_BASE_URL)
+        return f"{base.rstrip('/')}/robot/send"
+
+    def _post_payload(self, token, payload):
+        """将已构建的消息体 POST 到钉钉机器人（连接失败与 5xx 时指数退避重试）
+
+        钉钉发送接口不是幂等的：只有确定请求未被服务端处理时才重试（DNS/建连失败、连接超时、5xx）；
+        读取超时与请求发出后的连接中断可能已经送达，默认不重试以免家长收到重复消息
+        （由 send_retry_read_timeout 控制）。
+        """
+        url = f"{self._send_url()}?access_token={token}"
+        timeout = (
+            float(self.config.get("send_connect_timeout", 3.05)),
+            float(self.config.get("send_read_timeout", 10)),
+        )
+        max_retries = max(0, int(self.config.get("send_max_retries", 3)))
+        backoff_base = float(self.config.get("send_backoff_base", 0.5))
+        retry_read_timeout = bool(self.config.get("send_retry_read_timeout", False))
+        attempts = []
+
+        bucket = self._get_rate_limiter(token)
+        max_wait = float(self.config.get("rate_limit_max_wait", 120))
+
+        for attempt in range(max_retries + 1):
+            # 每次真正发出的请求都计入钉钉配额，因此每次尝试前都要排队取令牌
+            waited = bucket.acquire(timeout=max_wait)
+            if waited is None:
+                self._record_send_attempts(attempts)
+                return {
+                    "success": False,
+                    "error": f"发送过于频繁，排队超过 {max_wait:.0f} 秒，请稍后重试",
+                    "rate_limited": True,
+                    "retryable": True,
+                    "attempts": attempts,
                 }
+            started = time.perf_counter()
+            record = {"attempt": attempt + 1, "started_at": time.time(), "status": None, "error": None,
+                      "queued_ms": round(waited * 1000, 2)}
+            attempts.append(record)
+            retryable = False
+            try:
+                begin_request_timing()
+                try:
+                    response = self._get_session().post(url, json=payload, timeout=timeout)
+                finally:
+                    self._finish_send_timing(record, started)
+                record["status"] = response.status_code
+                if response.status_code == 429:
+                    bucket.on_throttled()
+                    record["error"] = "HTTP 429"
+                    retryable = True
+                elif response.status_code >= 500:
+                    record["error"] = f"HTTP {response.status_code}"
+                    retryable = True
+                else:
+                    result = response.json()
+                    record["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+                    record["errcode"] = result.get("errcode")
+                    self._record_send_attempts(attempts)
+                    if result.get("errcode") == 0:
+                        bucket.on_success()
+                        return {"success": True, "message": "发送成功", "attempts": attempts}
+                    if result.get("errcode") in DINGTALK_RATE_LIMIT_ERRCODES:
+                        # 已被钉钉限流（通常持续 10 分钟），收缩令牌桶，不再立即重试
+                        bucket.on_throttled()
+                        print(f"[RateLimit] 钉钉返回限流({result.get('errcode')})，已降低发送速率")
+                        return {"success": False, "error": f"发送失败: {result.get('errmsg')}",
+                                "rate_limited": True, "retryable": True, "attempts": attempts}
+                    return {"success": False, "error": f"发送失败: {result.get('errmsg')}", "attempts": attempts}
+            except requests.exceptions.ConnectionError as e:
+                if _failed_before_send(e):
+                    # DNS 失败、建连失败、连接超时：请求尚未发出，可以放心重试
+                    record["error"] = f"连接失败: {_mask_token(e, token)}"
+                    retryable = True
+                else:
+                    # 请求发出后连接中断（如复用的长连接被对端重置）：钉钉可能已处理，按读取超时对待
+                    record["error"] = f"连接中断: {_mask_token(e, token)}"
+                    retryable = retry_read_timeout
+            except requests.exceptions.Timeout as e:
+                record["error"] = f"等待响应超时: {_mask_token(e, token)}"
+                retryable = retry_read_timeout
+            except Exception as e:
+                record["error"] = _mask_token(e, token)
+            record["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+            if not retryable or attempt >= max_retries:
+                break
+            # 指数退避 + 抖动，避免多台机器同一时刻重试
+            delay = backoff_base * (2 ** attempt)
+            delay = delay / 2 + random.uniform(0, delay / 2)
+            record["retry_in_ms"] = round(delay * 1000, 2)
+            print(f"[Send] 第 {attempt + 1} 次发送失败，{delay:.2f}s 后重试: {record['error']}")
+            time.sleep(delay)
+
+        self._record_send_attempts(attempts)
+        # retryable 供发送队列判断是否值得稍后补发（网络中断、5xx、429）
+        return {"success": False, "error": attempts[-1]["error"] or "发送失败", "retryable": retryable,
+                "attempts": attempts}
+
+    def warm_up_connection(self, max_attempts=3, retry_delay=5.0):
+        """预热发送连接：解析钉钉域名、建立 TLS 长连接并留在连接池中，同时确认接口可达
+
+        使用不带 access_token 的 HEAD 请求，不会发出消息，也不占用机器人的发送配额；
+        收到任何非 5xx 响应即视为可达。失败时按退避重试，以便在定时发送前发现网络问题。
+        """
+        url = self._send_url()
+        parsed = urlparse(url)
+        host = parsed.hostname
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        timeout = (
+            float(self.config.get("send_connect_timeout", 3.05)),
+            float(self.config.get("send_read_timeout", 10)),
+        )
+        attempts = []
+        result = {"success": False, "host": host, "attempts": attempts}
+        for attempt in range(max_attempts):
+            record = {"attempt": attempt + 1, "started_at": time.time()}
+            attempts.append(record)
+            try:
+                t0 = time.perf_counter()
+                infos = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+                record["resolve_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+                record["addresses"] = sorted({info[4][0] for info in infos})[:4]
+                begin_request_timing()
+                try:
+                    response = self._get_session().head(url, timeout=timeout, allow_redirects=False)
+                finally:
+                    phases = end_request_timing()
+                record["status"] = response.status_code
+                record["phases"] = {k: round(v, 2) for k, v in phases.items()}
+                self.metrics.record_sample("warmup", phases, status=response.status_code)
+                if response.status_code < 500:
+                    result["success"] = True
+                    break
+                record["error"] = f"HTTP {response.status_code}"
+            except socket.gaierror as e:
+                record["error"] = f"域名解析失败: {e}"
+            except requests.exceptions.RequestException as e:
+                record["error"] = f"连接失败: {e}"
+            except Exception as e:
+                record["error"] = str(e)
+            if attempt + 1 < max_attempts:
+                delay = retry_delay * (2 ** attempt)
+                print(f"[Warmup] 第 {attempt + 1} 次预热失败，{delay:.0f}s 后重试: {record['error']}")
+                time.sleep(delay)
+
+        if not result["success"]:
+            result["error"] = attempts[-1].get("error") or "预热失败"
+        result["finished_at"] = time.time()
+        self.last_warmup = result
+        return result
+
+    def _get_rate_limiter(self, token):
+        """获取（或创建）该机器人的令牌桶，并同步配置中的速率"""
+        rate = int(self.config.get("dingtalk_rate_per_minute", 20))
+        burst = int(self.config.get("dingtalk_burst", 5))
+        with self._session_lock:
+            bucket = self._rate_limiters.get(token)
+            if bucket is None:
+                bucket = self._rate_limiters[token] = TokenBucket(rate, burst)
+        if (bucket.rate_per_minute, bucket.burst) != (rate, burst):
+            bucket.configure(rate, burst)
+        return bucket
+
+    def get_rate_limit_status(self):
+        """获取各机器人的限流排队情况（排队数量与预计等待时间）"""
+        try:
+            names = {t["access_token"]: t["name"] for t in self.get_send_targets()}
+            with self._session_lock:
+                buckets = list(self._rate_limiters.items())
+            targets = []
+            for token, bucket in buckets:
+                targets.append({"name": names.get(token, "其他"), "token": token[:6] + "***", **bucket.status()})
+            return {
+                "success": True,
+                "targets": targets,
+                "waiting": sum(t["waiting"] for t in targets),
+                "expected_wait_s": max([t["expected_wait_s"] for t in targets] or [0.0]),
             }
-            
-            response = requests.post(url, json=payload, timeout=10)
-            result = response.json()
-            
-            if result.get("errcode") == 0:
-                return {"success": True, "message": "发送成功"}
-            else:
-                return {"success": False, "error": f"发送失败: {result.get('errmsg')}"}
-                
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    def _finish_send_timing(self, record, started):
+        """收集本次请求的网络阶段耗时，写入尝试记录与直方图"""
+        phases = end_request_timing()
+        phases["total"] = (time.perf_counter() - started) * 1000
+        phases["queue"] = record.get("queued_ms") or 0.0
+        record["phases"] = {k: round(v, 2) for k, v in phases.items()}
+        # 请求已发出且没有新建连接，说明复用了已有的长连接
+        record["reused_connection"] = "request" in phases and not request_opened_connection()
+        self.metrics.observe_phases("send", phases)
+
+    def _record_send_attempts(self, attempts):
+        with self._session_lock:
+            self._send_attempts.extend(attempts)
+        for a in attempts:
+            if "phases" in a:
+                self.metrics.record_sample("send", a["phases"], attempt=a["attempt"], status=a["status"],
+                                           errcode=a.get("errcode"), error=a["error"],
+                                           reused_connection=a["reused_connection"])
+
+    def get_send_metrics(self, recent=50):
+        """获取解析与发送的分阶段耗时直方图及最近样本"""
+        try:
+            return {"success": True, **self.metrics.snapshot(prefixes=("send", "parse"), recent=recent)}
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    def get_send_stats(self):
+        """获取最近的发送尝试记录（每次尝试的耗时、状态码与错误）"""
+        try:
+            with self._session_lock:
+                recent = list(self._send_attempts)
+            ok = [a for a in recent if a.get("status") and a["status"] < 500 and not a.get("error")]
+            return {
+                "success": True,
+                "attempts": len(recent),
+                "ok": len(ok),
+                "avg_ok_ms": round(sum(a["elapsed_ms"] for a in ok) / len(ok), 2) if ok else None,
+                "recent": recent[-20:],
+            }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    def prepare_homework(self, file_path=None, profile=None):
+        """预渲染作业消息：解析PPT、校验内容并生成消息体，供定时发送时直接使用"""
+        try:
+            ppt_path = file_path or (profile or self.config).get("ppt_file_path")
+            if not ppt_path or not os.path.exists(ppt_path):
+                return {"success": False, "error": "未设置PPT文件路径或文件不存在"}
+            if not self.get_send_targets(profile):
+                return {"success": False, "error": "未设置ACCESS_TOKEN"}
+
+            # 先记录文件状态再解析，解析期间文件被改写会在发送前被识别出来
+            st = os.stat(ppt_path)
+            parse_result = self.parse_ppt_to_markdown(ppt_path)
+            if not parse_result["success"]:
+                return parse_result
+            content = parse_result["content"]
+            if not any(ln.startswith("- ") for ln in content.split("\n")):
+                return {"success": False, "error": "作业内容为空"}
+
+            return {
+                "success": True,
+                "file_path": ppt_path,
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "content": content,
+                "payloads": self.build_dingtalk_payloads(content),
+                "prepared_at": time.time(),
+            }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    def is_prepared_fresh(self, prepared, profile=None):
+        """检查预渲染结果是否仍与PPT文件一致（仅比较大小与修改时间）"""
+        try:
+            if not prepared or not prepared.get("success"):
+                return False
+            if prepared["file_path"] != (profile or self.config).get("ppt_file_path"):
+                return False
+            st = os.stat(prepared["file_path"])
+            return st.st_size == prepared["size"] and st.st_mtime_ns == prepared["mtime_ns"]
+        except Exception:
+            return False
+
+    def send_prepared(self, prepared, dedup_key=None, profile=None):
+        """发送预渲染好的消息体"""
+        try:
+            targets = self.get_send_targets(profile)
+            if not targets:
+                return {"success": False, "error": "未设置ACCESS_TOKEN"}
+            return self._fan_out(prepared["payloads"], targets, dedup_key)
         except Exception as e:
             return {"success": False, "error": str(e)}
     
+    def _get_batch_workers(self):
+        """懒加载批量解析用的子进程组（按CPU核数）：每个子进程由一个 ParseWorker 管理，超时即结束并重建。"""
+        with self._batch_pool_lock:
+            if self._batch_workers is None:
+                count = os.cpu_count() or 1
+                self._batch_workers = queue.Queue()
+                for _ in range(count):
+                    self._batch_workers.put(ParseWorker())
+                self._batch_threads = ThreadPoolExecutor(max_workers=count, thread_name_prefix="BatchParse")
+            return self._batch_workers, self._batch_threads
+
+    def _parse_batch_item(self, workers, file_path, engine, deadline):
+        """取一个空闲的 ParseWorker 解析单个文件；整批共用同一个截止时间"""
+        started = time.perf_counter()
+        timeout_result = {"success": False, "error": "解析超时（整批解析时间已用完）",
+                          "elapsed_ms": 0.0}
+        try:
+            worker = workers.get(timeout=max(0.0, deadline - time.monotonic()))
+        except queue.Empty:
+            return timeout_result
+        try:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return timeout_result
+            self._configure_parse_worker(worker, round(max(remaining, 0.1), 1))
+            result = dict(worker.parse(file_path, engine))
+            result.setdefault("elapsed_ms", round((time.perf_counter() - started) * 1000, 2))
+            return result
+        finally:
+            workers.put(worker)
+
+    def parse_many(self, paths):
+        """并行解析多个PPT（每个科目一个文件），返回逐文件结果与耗时，并按给定顺序合并为一份 Markdown。
+
+        python-pptx 解析为 CPU 密集且持有 GIL，因此在多个子进程中并行解析；缓存命中的文件不会派发。
+        整批最多等待 parse_timeout 秒，超时的文件记为失败，其子进程被结束并在下次使用时重建。
+        """
+        started = time.perf_counter()
+        try:
+            paths = [p for p in (paths or []) if p]
+            if not paths:
+                return {"success": False, "error": "未提供文件路径"}
+
+            engine = self.config.get("parse_engine", "auto")
+            use_cache = bool(self.config.get("parse_cache_enabled", True))
+            results = []
+            pending = []
+            for path in paths:
+                item = {
+                    "file_path": path,
+                    "file_name": os.path.basename(path),
+                    "subject": os.path.splitext(os.path.basename(path))[0],
+                }
+                results.append(item)
+                cached = self.parse_cache.get(path) if use_cache else None
+                if cached is not None:
+                    item.update({"success": True, "content": cached, "cached": True, "elapsed_ms": 0.0})
+                elif not os.path.exists(path):
+                    item.update({"success": False, "error": "文件不存在", "elapsed_ms": 0.0})
+                else:
+                    try:
+                        sig = self.parse_cache.signature(path)[1] if use_cache else None
+                    except OSError:
+                        sig = None
+                    pending.append((item, sig))
+
+            if len(pending) == 1:
+                # 单个文件无需启动额外的子进程，交给常驻解析子进程（同样受 parse_timeout 约束）
+                item, _ = pending[0]
+                single_started = time.perf_counter()
+                item.update(self._parse_ppt_uncached(item["file_path"]))
+                item.setdefault("elapsed_ms", round((time.perf_counter() - single_started) * 1000, 2))
+            elif pending:
+                deadline = time.monotonic() + float(self.config.get("parse_timeout", 60))
+                workers, threads = self._get_batch_workers()
+                futures = [threads.submit(self._parse_batch_item, workers, item["file_path"], engine, deadline)
+                           for item, _ in pending]
+                # 每个文件都在截止时间前返回（超时由 ParseWorker 结束子进程）
+                for (item, _), fut in zip(pending, futures):
+                    item.update(fut.result())
+
+            for item, sig in pending:
+                if use_cache and sig and item.get("success"):
+                    self.parse_cache.put(item["file_path"], item["content"], sig)
+
+            ok = [r for r in results if r.get("success")]
+            return {
+                "success": bool(ok),
+                "content": merge_homework_markdown([(r["subject"], r["content"]) for r in ok]),
+                "results": results,
+                "failed": len(results) - len(ok),
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+            }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
     def preview_homework(self, file_path):
         """预览作业内容"""
         result = self.parse_ppt_to_markdown(file_path)
@@ -172,23 +1272,23 @@ class HomeworkAPI:
             }
         return result
     
-    def send_homework(self, file_path):
+    def send_homework(self, file_path, dedup_key=None, profile=None):
         """发送作业"""
         parse_result = self.parse_ppt_to_markdown(file_path)
         if not parse_result["success"]:
             return parse_result
         
-        send_result = self.send_to_dingtalk(parse_result["content"])
+        send_result = self.send_to_dingtalk(parse_result["content"], dedup_key=dedup_key, profile=profile)
         return send_result
     
-    def auto_send_homework(self):
-        """自动发送作业（使用配置中的PPT文件路径）"""
+    def auto_send_homework(self, dedup_key=None, profile=None):
+        """自动发送作业（使用配置或发送方案中的PPT文件路径）"""
         try:
-            ppt_path = self.config.get("ppt_file_path")
+            ppt_path = (profile or self.config).get("ppt_file_path")
             if not ppt_path or not os.path.exists(ppt_path):
                 return {"success": False, "error": "未设置PPT文件路径或文件不存在"}
             
-            return self.send_homework(ppt_path)
+            return self.send_homework(ppt_path, dedup_key, profile)
         except Exception as e:
             return {"success": False, "error": str(e)}
     
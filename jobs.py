@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+发送任务管理模块
+界面、REST 接口与定时任务的发送都作为任务提交到同一个有界线程池，
+调用方立即拿到任务 ID，再通过查询（支持长轮询）或推送获取进度与结果，HTTP 线程不再被发送阻塞。
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+
+
+class JobManager:
+    """有界发送任务队列：同时执行 max_workers 个任务，排队与执行中的任务总数不超过 max_pending"""
+
+    def __init__(self, max_workers=2, max_pending=32, keep=200):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.keep = keep
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="SendJob")
+        self._cond = threading.Condition()
+        self._jobs = OrderedDict()
+        self._active = 0
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """注册任务状态变化回调 callback(job)，用于向界面推送进度"""
+        self._listeners.append(callback)
+
+    def _notify(self, job):
+        for callback in list(self._listeners):
+            try:
+                callback(job)
+            except Exception as e:
+                print(f"[Jobs] 推送任务状态失败: {e}")
+
+    def _update_locked(self, job, **changes):
+        job.update(changes)
+        job["version"] += 1
+        self._cond.notify_all()
+        return dict(job)
+
+    def _evict_locked(self):
+        finished = [jid for jid, j in self._jobs.items() if j["status"] == JOB_DONE]
+        for jid in finished[:max(0, len(finished) - self.keep)]:
+            del self._jobs[jid]
+
+    def submit(self, kind, fn, *args, source="ui", **kwargs):
+        """提交任务，返回 {"success", "job_id", "job"}；队列已满时返回错误而不是排队等待。"""
+        with self._cond:
+            if self._active >= self.max_pending:
+                return {"success": False, "error": "发送任务过多，请稍后重试"}
+            job = {
+                "id": uuid.uuid4().hex[:12],
+                "kind": kind,
+                "source": source,
+                "status": JOB_QUEUED,
+                "success": None,
+                "result": None,
+                "created_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "version": 0,
+            }
+            self._jobs[job["id"]] = job
+            self._active += 1
+            self._evict_locked()
+            snapshot = dict(job)
+        self._notify(snapshot)
+        self._pool.submit(self._run, job, fn, args, kwargs)
+        return {"success": True, "job_id": job["id"], "job": snapshot}
+
+    def _run(self, job, fn, args, kwargs):
+        with self._cond:
+            snapshot = self._update_locked(job, status=JOB_RUNNING, started_at=time.time())
+        self._notify(snapshot)
+        try:
+            result = fn(*args, **kwargs)
+            if not isinstance(result, dict):
+                result = {"success": bool(result)}
+        except Exception as e:
+            print(f"[Jobs] 任务 {job['id']}({job['kind']}) 异常: {e}")
+            result = {"success": False, "error": str(e)}
+        with self._cond:
+            self._active -= 1
+            snapshot = self._update_locked(job, status=JOB_DONE, success=bool(result.get("success")),
+                                           result=result, finished_at=time.time())
+        self._notify(snapshot)
+
+    def get(self, job_id):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def wait(self, job_id, timeout=None, since_version=None):
+        """等待任务完成（或版本号超过 since_version 即状态有变化）；超时返回当前状态，任务不存在返回 None。"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    return None
+                if job["status"] == JOB_DONE:
+                    return dict(job)
+                if since_version is not None and job["version"] > since_version:
+                    return dict(job)
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return dict(job)
+                self._cond.wait(remaining)
+
+    def run(self, kind, fn, *args, source="ui", **kwargs):
+        """提交任务并阻塞等待结果（供定时任务与兼容旧接口使用），返回任务的结果字典"""
+        submitted = self.submit(kind, fn, *args, source=source, **kwargs)
+        if not submitted["success"]:
+            return submitted
+        job = self.wait(submitted["job_id"])
+        if job is None:
+            # 任务在完成后、唤醒前已被清理
+            return {"success": False, "error": "任务不存在或已过期", "job_id": submitted["job_id"]}
+        result = dict(job["result"] or {})
+        result["job_id"] = job["id"]
+        return result
+
+    def list(self, limit=50):
+        with self._cond:
+            jobs = [dict(j) for j in self._jobs.values()]
+        return jobs[-limit:][::-1]
+
+    def stats(self):
+        with self._cond:
+            queued = sum(1 for j in self._jobs.values() if j["status"] == JOB_QUEUED)
+            running = sum(1 for j in self._jobs.values() if j["status"] == JOB_RUNNING)
+        return {"queued": queued, "running": running, "max_workers": self.max_workers,
+                "max_pending": self.max_pending}
@@ -3,16 +3,25 @@ import sys
 import threading
 import time
 import argparse
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 
-import schedule
 import webview
 import traceback
 import json
 
-from homework_api import HomeworkAPI, get_app_data_path
+from homework_api import HomeworkAPI, get_app_data_path, normalize_access_token
+from timer_engine import TimerEngine
+from timetable import Timetable
+from scheduler_state import SchedulerState
+from profiles import DEFAULT_PROFILE_ID, ProfileRegistry
+from events import TOPIC_CONFIG, TOPIC_SCHEDULER, TOPIC_UPDATE, format_sse
+from rest_serving import create_backend
+from snapshots import SnapshotCache
+from run_history import (OUTCOME_FAILED, OUTCOME_QUEUED, OUTCOME_SENT, OUTCOME_SKIPPED, RunHistory,
+                         classify_error, parse_since)
 from autostart_manager import AutostartManager
-from flask import Flask, request as flask_request, jsonify, make_response
+from flask import Flask, Response, request as flask_request, jsonify, make_response
 
 # Windows 专用：将 8.3 短路径（如 AUTOHO~1）转换为长路径
 _def_long_path_loaded = False
@@ -70,100 +79,374 @@ REST_FIXED_PORT = 58701  # 固定REST端口，避免随机端口导致发现失
 APP_VERSION = "1.0.0"  # 应与实际发布版本一致
 
 
+def _push_preview_update(latest: dict):
+    """PPT 文件保存后，将重新解析的预览推送到前端。"""
+    try:
+        if _MAIN_WINDOW:
+            payload = json.dumps({
+                "file_path": latest.get("file_path"),
+                "file_name": latest.get("file_name"),
+                "content": latest.get("content"),
+                "version": latest.get("version"),
+            }, ensure_ascii=False)
+            _MAIN_WINDOW.evaluate_js(f"window.onHomeworkUpdated && window.onHomeworkUpdated({payload});")
+    except Exception as e:
+        print(f"[Watcher] 推送预览到前端失败: {e}")
+
+
+def _push_job_update(job: dict):
+    """发送任务状态变化时推送到前端。"""
+    try:
+        if _MAIN_WINDOW:
+            payload = json.dumps(job, ensure_ascii=False, default=str)
+            _MAIN_WINDOW.evaluate_js(f"window.onSendJobUpdated && window.onSendJobUpdated({payload});")
+    except Exception as e:
+        print(f"[Jobs] 推送任务状态到前端失败: {e}")
+
+
+def request_exit(api: HomeworkAPI, scheduler, reason: str, delay: float = 0.0, drain_timeout: float = 5.0):
+    """优雅退出（在后台线程中执行，调用方可先返回响应）。
+
+    依次停止调度器、关闭事件流、停止发送队列、等待进行中的 REST 请求完成，最后关闭窗口，
+    窗口事件循环结束后进程正常退出并执行 atexit 清理；若仍有线程阻塞，超时后才强制结束进程。
+    """
+    def _run():
+        if delay:
+            time.sleep(delay)
+        print(f"[Exit] {reason}，正在退出...")
+        steps = [
+            ("调度器", scheduler.shutdown),
+            ("事件流", api.events.close),
+            ("发送队列", lambda: api.outbox.stop() if api.outbox is not None else None),
+            ("REST 服务", lambda: _REST_SERVER.drain(drain_timeout) if _REST_SERVER else None),
+        ]
+        for name, step in steps:
+            try:
+                step()
+            except Exception as e:
+                print(f"[Exit] 停止{name}时出错: {e}")
+        try:
+            if _MAIN_WINDOW:
+                _MAIN_WINDOW.destroy()
+        except Exception as e:
+            print(f"[Exit] 销毁窗口时出错: {e}")
+        time.sleep(drain_timeout)
+        print("[Exit] 仍有线程未结束，强制退出")
+        os._exit(0)
+
+    threading.Thread(target=_run, name="GracefulExit", daemon=True).start()
+
+
+class ProfileSchedule:
+    """单个发送方案的调度数据：时间表、调度状态与预渲染结果"""
+
+    def __init__(self, profile: dict, state: SchedulerState):
+        self.profile = profile
+        self.state = state
+        # 发送时间表（每周时间、节假日、调休），预先计算接下来的发送时刻
+        self.timetable = None
+        # 预渲染结果：定时发送前提前解析好的消息体
+        self.prepared = None
+        self.prepared_lock = threading.Lock()
+        # 补发与定时触发可能同时到来，同一时刻只处理一个计划时刻
+        self.run_lock = threading.Lock()
+
+    @property
+    def id(self):
+        return self.profile["id"]
+
+    @property
+    def name(self):
+        return self.profile["name"]
+
+
 class ScheduleManager:
-    """负责根据配置安排与运行每日自动发送任务。"""
+    """负责根据配置安排与运行每日自动发送任务；多个发送方案（班级）共用一个调度线程与发送线程池。"""
+
+    # 实际触发晚于计划时刻超过该秒数视为“错过”，按补发策略处理
+    LATE_TOLERANCE_SECONDS = 120
 
     def __init__(self, api: HomeworkAPI):
         self.api = api
-        self._thread = None
-        self._stop_event = threading.Event()
-        self._scheduled_time_str = None
-
-    def _loop(self):
-        while not self._stop_event.is_set():
-            try:
-                schedule.run_pending()
-            except Exception:
-                # 避免调度循环因异常中断
-                pass
-            time.sleep(1)
+        # 最小堆定时器：休眠到下一个截止时间，配置变化时立即唤醒；任务按方案 id 打标签，
+        # 到期后在有界线程池中执行，慢发送不会推迟其他任务
+        try:
+            workers = max(1, int(api.config.get("scheduler_workers", 4)))
+        except (TypeError, ValueError):
+            workers = 4
+        self._engine = TimerEngine(name="SchedulerLoop", on_clock_jump=self._on_clock_jump, max_workers=workers)
+        # 方案 id -> ProfileSchedule
+        self._profiles = {}
+        # 调度状态按方案分别保存，配置重载后沿用
+        self._states = {}
+        # 定时发送运行记录（SQLite），不可用时只打印日志
+        self._history = self._open_history()
 
     def start(self):
-        if self._thread and self._thread.is_alive():
-            return
-        self._stop_event.clear()
-        self._thread = threading.Thread(target=self._loop, name="SchedulerLoop", daemon=True)
-        self._thread.start()
+        self._engine.start()
 
     def shutdown(self):
-        self._stop_event.set()
         try:
-            if self._thread:
-                self._thread.join(timeout=2)
+            self._engine.shutdown(timeout=2)
         except Exception:
             pass
 
+    def next_run(self):
+        """下一次触发的精确时间（任一方案的任一任务，包括预热与预渲染）"""
+        return self._engine.next_run()
+
+    def _open_history(self):
+        try:
+            history = RunHistory(os.path.join(get_app_data_path(), "run_history.db"),
+                                 retention_days=int(self.api.config.get("run_history_retention_days", 400)))
+            removed = history.purge()
+            if removed:
+                print(f"[Scheduler] 已清理 {removed} 条过期运行记录")
+            return history
+        except Exception as e:
+            print(f"[Scheduler] 无法打开运行记录数据库: {e}")
+            return None
+
+    def _state_for(self, profile_id):
+        """方案的调度状态；默认方案沿用原来的 scheduler_state.json"""
+        state = self._states.get(profile_id)
+        if state is None:
+            file_name = "scheduler_state.json" if profile_id == DEFAULT_PROFILE_ID \
+                else f"scheduler_state_{profile_id}.json"
+            state = self._states[profile_id] = SchedulerState(os.path.join(get_app_data_path(), file_name))
+        return state
+
+    def _on_clock_jump(self, kind, seconds):
+        """调度线程发现时钟跳变或睡眠唤醒；到期任务随后按补发策略处理"""
+        if kind == "jump":
+            reason = f"墙上时间相对单调时钟{'快进' if seconds > 0 else '回拨'}了 {abs(seconds):.0f} 秒（睡眠唤醒或系统时间调整）"
+        else:
+            reason = f"调度线程比预期晚醒 {seconds:.0f} 秒（可能刚从睡眠中唤醒）"
+        for ps in list(self._profiles.values()):
+            ps.state.log_decision("clock_jump", reason, due=self._engine_next_send(ps.id))
+        self.publish_status()
+
+    def _catch_up_policy(self, config):
+        """补发策略：send（补发窗口内立即补发）或 skip（一律跳过）；补发窗口（分钟）"""
+        policy = str(config.get("catchup_policy", "send")).lower()
+        try:
+            grace_minutes = max(0, int(config.get("catchup_grace_minutes", 60)))
+        except (TypeError, ValueError):
+            grace_minutes = 60
+        return ("skip" if policy == "skip" else "send"), grace_minutes
+
     def apply_config(self, config: dict):
-        """根据配置重建调度任务。"""
-        schedule.clear()
-        self._scheduled_time_str = None
+        """根据配置重建全部方案的调度任务。"""
+        self._engine.clear()
+        self._profiles = {}
 
-        enabled = bool(config.get("auto_send_enabled"))
+        # 预渲染提前量（分钟），0 表示关闭预渲染
+        try:
+            prerender_minutes = max(0, int(config.get("prerender_minutes", 5)))
+        except (TypeError, ValueError):
+            prerender_minutes = 5
 
-        if not enabled:
-            return
+        # 连接预热提前量（秒），0 表示关闭；过早预热的长连接可能被服务端空闲回收
+        try:
+            warmup_seconds = max(0, int(config.get("warmup_seconds", 60)))
+        except (TypeError, ValueError):
+            warmup_seconds = 60
+
+        policy, grace_minutes = self._catch_up_policy(config)
+        run_options = self._run_options(config)
+
+        for profile in ProfileRegistry.from_config(config).all():
+            self._profiles[profile["id"]] = ProfileSchedule(profile, self._state_for(profile["id"]))
+        for ps in list(self._profiles.values()):
+            if not bool(ps.profile.get("auto_send_enabled")):
+                continue
+            try:
+                self._schedule_profile(ps, prerender_minutes, warmup_seconds, policy, grace_minutes, run_options)
+            except Exception as exc:
+                print(f"[Scheduler] 无法安排方案 {ps.name} 的每日任务: {exc}")
+
+        if self._engine.has_jobs():
+            self.start()
+        self.publish_status()
+
+    def publish_status(self):
+        """把当前调度状态发布到事件总线（界面经 /api/events 实时更新）"""
+        try:
+            self.api.events.publish(TOPIC_SCHEDULER, self.get_status())
+        except Exception as e:
+            print(f"[Scheduler] 发布调度状态失败: {e}")
+
+    def _run_options(self, config):
+        """各类任务的执行超时（秒）与重叠策略；定时发送的重叠策略可通过 scheduler_overlap 配置"""
+        def _seconds(key, default):
+            try:
+                value = float(config.get(key, default))
+            except (TypeError, ValueError):
+                value = default
+            return value if value > 0 else None
+
+        overlap = str(config.get("scheduler_overlap", "skip")).lower()
+        if overlap not in ("skip", "queue", "allow"):
+            overlap = "skip"
+        return {
+            "send": {"timeout": _seconds("scheduled_send_timeout", 600), "overlap": overlap},
+            "prerender": {"timeout": _seconds("prerender_timeout", 300), "overlap": "skip"},
+            "warmup": {"timeout": _seconds("warmup_timeout", 60), "overlap": "skip"},
+        }
+
+    def _schedule_profile(self, ps: ProfileSchedule, prerender_minutes, warmup_seconds, policy, grace_minutes,
+                          run_options):
+        profile = ps.profile
+        state = ps.state
+        label = f"[{ps.name}] " if len(self._profiles) > 1 or ps.id != DEFAULT_PROFILE_ID else ""
 
-        # 获取工作日和周五的时间设置
-        weekday_time = str(config.get("weekday_send_time", config.get("auto_send_time", "09:00")))
-        friday_time = str(config.get("friday_send_time", config.get("auto_send_time", "09:00")))
+        def _warmup(due=None):
+            # 在调度线程池中执行，预热重试不会阻塞调度循环
+            result = self.api.warm_up_connection()
+            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            if result.get("success"):
+                last = result["attempts"][-1]
+                print(f"[Warmup] {label}{timestamp} 连接已预热: {result.get('host')} -> {last.get('status')} "
+                      f"{last.get('phases')}")
+            else:
+                print(f"[Warmup] {label}{timestamp} 预热失败，发送时将继续重试: {result.get('error')}")
+            self.publish_status()
+
+        def _prerender(due=None):
+            prepared = self.api.prepare_homework(profile=profile)
+            with ps.prepared_lock:
+                ps.prepared = prepared if prepared.get("success") else None
+            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            if prepared.get("success"):
+                print(f"[Prerender] {label}{timestamp} 已预渲染: {prepared.get('file_path')}")
+            else:
+                print(f"[Prerender] {label}{timestamp} 预渲染失败，发送时将重新解析: {prepared.get('error')}")
+            self.publish_status()
+
+        def _send(due):
+            # 同一方案同一计划时刻的定时发送只入队一次，重复触发不会让家长收到两条
+            dedup_key = f"scheduled:{ps.id}:{due.strftime('%Y-%m-%d %H:%M')}"
+            # 发送时只做一次文件状态检查；文件在预渲染后被修改则重新渲染
+            with ps.prepared_lock:
+                prepared, ps.prepared = ps.prepared, None
+            if prepared and self.api.is_prepared_fresh(prepared, profile):
+                return self.api.send_prepared(prepared, dedup_key, profile)
+            if prepared:
+                print(f"[Prerender] {label}PPT 已在预渲染后修改，重新渲染")
+            return self.api.auto_send_homework(dedup_key, profile)
+
+        def _task(due=None):
+            try:
+                with ps.run_lock:
+                    _run_due(due or datetime.now())
+            finally:
+                self.publish_status()
+
+        def _run_due(due):
+            now = datetime.now()
+            if state.is_handled(due):
+                state.log_decision("skip", "该计划时刻已处理过（时钟回拨或重复触发），不再发送", due)
+                return
+            # 睡眠期间可能错过不止一次，只考虑最近的一次，更早的记为跳过
+            missed = [f for f in ps.timetable.iter_fire_times(due) if f <= now] if ps.timetable else []
+            if missed:
+                for earlier in [due] + missed[:-1]:
+                    state.log_decision("skip", "错过的较早计划时刻，只处理最近一次", earlier)
+                    self._record_run(ps, earlier, {"success": False, "skipped": True,
+                                                   "error": "错过的较早计划时刻，只处理最近一次"})
+                due = missed[-1]
+            next_due = self._engine_next_send(ps.id)
+            late_seconds = (now - due).total_seconds()
+            if late_seconds > self.LATE_TOLERANCE_SECONDS:
+                late_text = f"比计划晚了 {late_seconds / 60:.0f} 分钟"
+                if policy == "send" and late_seconds <= grace_minutes * 60:
+                    state.log_decision("catch_up", f"{late_text}，在补发窗口 {grace_minutes} 分钟内，立即补发", due)
+                else:
+                    reason = f"{late_text}，超出补发窗口 {grace_minutes} 分钟" if policy == "send" \
+                        else f"{late_text}，补发策略为跳过"
+                    state.log_decision("skip", reason, due)
+                    state.mark_done(due, "skipped", next_due)
+                    self._record_run(ps, due, {"success": False, "skipped": True, "error": reason})
+                    self._show_send_notification(
+                        {"success": False, "skipped": True,
+                         "error": f"{label}{due.strftime('%m-%d %H:%M')} 的定时发送已错过（{reason}），请手动发送"},
+                        now.strftime('%Y-%m-%d %H:%M:%S'))
+                    return
+            else:
+                state.log_decision("send", f"{label}按计划发送", due)
 
-        def _task():
+            started = datetime.now()
             try:
-                result = self.api.auto_send_homework()
+                # 与界面发送共用同一个任务队列
+                result = self.api.jobs.run("scheduled_send", _send, due, source=f"scheduler:{ps.id}")
                 timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                print(f"[Auto Send] {timestamp} -> {result}")
+                print(f"[Auto Send] {label}{timestamp} -> {result}")
+                outcome = self._record_run(ps, due, result, started)
+                state.mark_done(due, outcome, next_due)
+                # 分阶段耗时，便于排查“作业发晚了”（详见 /api/metrics/send）
+                for item in result.get("results") or []:
+                    attempts = item.get("attempts") or []
+                    if attempts:
+                        print(f"[Auto Send] {label}{item.get('name')}: 尝试 {len(attempts)} 次，"
+                              f"最后一次各阶段耗时(ms) {attempts[-1].get('phases')}")
 
                 # 发送完成后显示通知
-                self._show_send_notification(result, timestamp)
+                self._show_send_notification(result, timestamp, ps.name if label else None)
 
             except Exception as exc:
-                print(f"[Auto Send] 任务异常: {exc}")
+                print(f"[Auto Send] {label}任务异常: {exc}")
+                state.mark_done(due, "failed", next_due)
+                self._record_run(ps, due, {"success": False, "error": str(exc)}, started, error_class="exception")
                 # 异常时也显示通知
                 timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                self._show_send_notification({"success": False, "error": str(exc)}, timestamp)
-
-        try:
-            # 获取当前日期是星期几 (0=周一, 1=周二, ..., 4=周五, 5=周六, 6=周日)
-            today = datetime.now()
-            weekday = today.weekday()
-
-            # 根据星期几选择不同的发送时间
-            if weekday == 4:  # 周五
-                time_str = friday_time
-            else:  # 周一到周四
-                time_str = weekday_time
-
-            # 安排明天的任务
-            schedule.every().day.at(time_str).do(_task)
-            self._scheduled_time_str = time_str
-            self.start()
-
-            print(f"[Scheduler] 已安排任务 - 周{weekday+1}: {time_str}")
-
-        except Exception as exc:
-            print(f"[Scheduler] 无法安排每日任务: {exc}")
+                self._show_send_notification({"success": False, "error": str(exc)}, timestamp,
+                                             ps.name if label else None)
+
+        # 每天按时间表决定是否发送及发送时间（周五、周末、节假日、调休各不相同）
+        timetable = Timetable.from_config(profile)
+        ps.timetable = timetable
+        self._engine.add("send", timetable.next_fire, _task, tag=ps.id, **run_options["send"])
+        # 预渲染与连接预热跟随每一次发送时刻
+        if prerender_minutes:
+            self._engine.add("prerender", timetable.offset_rule(timedelta(minutes=prerender_minutes)), _prerender,
+                             tag=ps.id, **run_options["prerender"])
+        if warmup_seconds:
+            self._engine.add("warmup", timetable.offset_rule(timedelta(seconds=warmup_seconds)), _warmup,
+                             tag=ps.id, **run_options["warmup"])
+
+        upcoming = "、".join(f.strftime("%m-%d %H:%M") for f in timetable.upcoming()[:3]) or "无"
+        print(f"[Scheduler] {label}已安排任务，接下来: {upcoming}")
+
+        # 程序未运行或电脑睡眠期间错过的发送：按补发策略处理
+        missed_due = state.next_due
+        now = datetime.now()
+        if missed_due and missed_due <= now and not state.is_handled(missed_due):
+            if timetable.time_for(missed_due.date()) != missed_due.time():
+                state.log_decision("skip", "错过的计划时刻已不在当前时间表中", missed_due)
+                state.mark_done(missed_due, "skipped")
+            else:
+                threading.Thread(target=_task, args=(missed_due,), name="SchedulerCatchUp", daemon=True).start()
+        state.set_next_due(self._engine_next_send(ps.id))
 
-    def _show_send_notification(self, result: dict, timestamp: str):
-        """显示发送完成通知"""
+    def _show_send_notification(self, result: dict, timestamp: str, profile_name=None):
+        """显示发送完成通知（多个方案时标题带上方案名称）"""
         try:
             # 构建通知消息
             if result.get("success"):
                 title = "作业发送成功"
                 message = f"作业已于 {timestamp} 成功发送到钉钉"
+            elif result.get("skipped"):
+                title = "错过定时发送"
+                message = result.get("error", "定时发送已错过，请手动发送")
+            elif result.get("queued"):
+                title = "作业暂未送达"
+                message = "网络异常，作业已保存到待发送队列，恢复后将自动补发"
             else:
                 title = "作业发送失败"
                 error_msg = result.get("error", "未知错误")
                 message = f"作业发送失败: {error_msg}"
+            if profile_name:
+                title = f"{profile_name}：{title}"
 
             # 尝试显示系统通知
             try:
@@ -205,57 +488,130 @@ class ScheduleManager:
             print(f"[Notification] 显示通知失败: {e}")
 
     def get_status(self) -> dict:
-        """提供完整状态。注意：若外部担心阻塞，可改用 get_status_fast。"""
-        # 为避免潜在阻塞，对 next_run 与磁盘 IO 做保护
-        try:
-            next_run = schedule.next_run()
-        except Exception:
-            next_run = None
-
+        """提供完整状态：顶层字段为默认方案（兼容旧界面），profiles 为全部方案；
+        下一次发送时间直接取自时间表预先计算的索引，不做重新计算。"""
         try:
             # 直接读取内存配置，避免不必要的磁盘 IO
             config = getattr(self.api, "config", None) or self.api.get_config()
         except Exception:
             config = {}
 
-        weekday = datetime.now().weekday()
-        if weekday == 4:  # 周五
-            current_time = config.get("friday_send_time", config.get("auto_send_time", "09:00"))
-        else:  # 周一到周四
-            current_time = config.get("weekday_send_time", config.get("auto_send_time", "09:00"))
-
+        now = datetime.now()
         weekday_names = ["一", "二", "三", "四", "五", "六", "日"]
+        profiles = [self._profile_status(ps, now) for ps in list(self._profiles.values())]
+        default = next((p for p in profiles if p["id"] == DEFAULT_PROFILE_ID), None) or {}
 
         return {
             "auto_send_enabled": bool(config.get("auto_send_enabled")),
-            "scheduler_running": bool(self._thread and self._thread.is_alive() and len(schedule.jobs) > 0),
-            "scheduled_time": self._scheduled_time_str,
-            "current_time": current_time,
-            "current_weekday": f"周{weekday_names[weekday]}",
+            "scheduler_running": bool(self._engine.is_running() and self._engine.has_jobs()),
+            "scheduled_time": default.get("scheduled_time"),
+            "current_time": default.get("current_time"),
+            "current_weekday": f"周{weekday_names[now.weekday()]}",
             "weekday_send_time": config.get("weekday_send_time", config.get("auto_send_time", "09:00")),
             "friday_send_time": config.get("friday_send_time", config.get("auto_send_time", "09:00")),
+            "weekly_times": default.get("weekly_times"),
+            "next_run": default.get("next_run", "None"),
+            "upcoming_runs": default.get("upcoming_runs", []),
+            "prerender_time": default.get("prerender_time"),
+            "prepared_at": default.get("prepared_at"),
+            "warmup_time": default.get("warmup_time"),
+            "last_warmup": self._last_warmup_summary(),
+            "catch_up": default.get("catch_up"),
+            "last_run": default.get("last_run"),
+            "profiles": profiles,
+            "jobs": self._engine_jobs_summary(),
+        }
+
+    def status_version(self):
+        """状态快照的版本键：日期变化（今天的发送时间、星期）或任务到期、开始、结束时改变"""
+        return datetime.now().date().isoformat(), self._engine.version
+
+    def get_profile_status(self, profile_id):
+        """单个方案的状态，方案不存在时返回 None"""
+        ps = self._profiles.get(profile_id)
+        return self._profile_status(ps, datetime.now()) if ps else None
+
+    def _profile_status(self, ps: ProfileSchedule, now):
+        timetable = ps.timetable
+        upcoming = timetable.upcoming(now) if timetable else []
+        next_run = upcoming[0] if upcoming else None
+        jobs = {job["name"]: job["due"] for job in self._engine.jobs() if job["tag"] == ps.id}
+        prepared = ps.prepared
+        return {
+            "id": ps.id,
+            "name": ps.name,
+            "auto_send_enabled": bool(ps.profile.get("auto_send_enabled")),
+            "ppt_file_path": ps.profile.get("ppt_file_path"),
+            "targets": [t["name"] for t in self.api.get_send_targets(ps.profile)],
+            "scheduled_time": next_run.strftime("%H:%M") if next_run else None,
+            "current_time": timetable.today_time() if timetable else None,
+            "weekly_times": Timetable.describe_weekly(timetable.weekly) if timetable else None,
             "next_run": str(next_run) if next_run else "None",
+            "upcoming_runs": [str(f) for f in upcoming],
+            "prerender_time": jobs["prerender"].strftime("%H:%M:%S") if jobs.get("prerender") else None,
+            "prepared_at": datetime.fromtimestamp(prepared["prepared_at"]).strftime('%Y-%m-%d %H:%M:%S')
+            if prepared else None,
+            "warmup_time": jobs["warmup"].strftime("%H:%M:%S") if jobs.get("warmup") else None,
+            "catch_up": ps.state.snapshot(decisions=5),
+            "last_run": self._history.last(ps.id) if self._history else None,
         }
 
-    def get_status_fast(self) -> dict:
-        """极简状态，避免任何可能的阻塞调用。"""
-        config = getattr(self.api, "config", {})
-        weekday = datetime.now().weekday()
-        if weekday == 4:
-            current_time = config.get("friday_send_time", config.get("auto_send_time", "09:00"))
+    def _record_run(self, ps: ProfileSchedule, due, result, started=None, error_class=None):
+        """写入运行记录，返回结果（sent/queued/failed/skipped）"""
+        if result.get("skipped"):
+            outcome = OUTCOME_SKIPPED
+        elif result.get("success"):
+            outcome = OUTCOME_SENT
+        elif result.get("queued"):
+            outcome = OUTCOME_QUEUED
         else:
-            current_time = config.get("weekday_send_time", config.get("auto_send_time", "09:00"))
+            outcome = OUTCOME_FAILED
+        if self._history is None:
+            return outcome
+        try:
+            targets = [t["name"] for t in self.api.get_send_targets(ps.profile)]
+            self._history.record(
+                ps.id, due, outcome,
+                started=started, finished=datetime.now() if started else None, targets=targets,
+                error_class=error_class or classify_error(result),
+                error=None if result.get("success") else result.get("error"),
+                job_id=result.get("job_id"),
+            )
+        except Exception as e:
+            print(f"[Scheduler] 写入运行记录失败: {e}")
+        return outcome
 
-        weekday_names = ["一", "二", "三", "四", "五", "六", "日"]
+    def get_history(self, since=None, limit=100, profile_id=None):
+        """运行记录查询：最近的记录（按计划时间倒序）与同一时间范围内的统计"""
+        if self._history is None:
+            return {"success": False, "error": "运行记录不可用"}
         return {
-            "auto_send_enabled": bool(config.get("auto_send_enabled")),
-            "scheduler_running": bool(self._thread and self._thread.is_alive() and len(schedule.jobs) > 0),
-            "scheduled_time": self._scheduled_time_str,
-            "current_time": current_time,
-            "current_weekday": f"周{weekday_names[weekday]}",
-            "weekday_send_time": config.get("weekday_send_time", config.get("auto_send_time", "09:00")),
-            "friday_send_time": config.get("friday_send_time", config.get("auto_send_time", "09:00")),
-            "next_run": "Unknown",
+            "success": True,
+            "runs": self._history.query(since=since, limit=limit, profile_id=profile_id),
+            "stats": self._history.stats(since=since, profile_id=profile_id),
+        }
+
+    def _engine_jobs_summary(self):
+        """调度任务的执行情况：执行中/排队数、跳过与超时次数、耗时统计"""
+        return [{**job, "due": str(job["due"]) if job["due"] else None,
+                 "last_run": job["last_run"].strftime('%Y-%m-%d %H:%M:%S') if job["last_run"] else None}
+                for job in self._engine.jobs()]
+
+    def _engine_next_send(self, profile_id=DEFAULT_PROFILE_ID):
+        for job in self._engine.jobs():
+            if job["name"] == "send" and job["tag"] == profile_id:
+                return job["due"]
+        return None
+
+    def _last_warmup_summary(self):
+        warmup = self.api.last_warmup
+        if not warmup:
+            return None
+        return {
+            "success": warmup.get("success"),
+            "error": warmup.get("error"),
+            "attempts": len(warmup.get("attempts") or []),
+            "finished_at": datetime.fromtimestamp(warmup["finished_at"]).strftime('%Y-%m-%d %H:%M:%S'),
         }
 
 
@@ -526,7 +882,10 @@ class ApiBridge:
         return self._api.preview_homework(file_path)
 
     def send_homework(self, file_path: str):
-        return self._api.send_homework(file_path)
+        return self._api.jobs.run("send_homework", self._api.send_homework, file_path)
+
+    def preview_batch(self, paths: list):
+        return self._api.parse_many(paths)
 
     def get_config(self):
         try:
@@ -568,9 +927,9 @@ class ApiBridge:
 
     # 调度状态
     def get_scheduler_status(self):
-        # 对外提供快速状态，避免阻塞；如需完整信息可在前端改调 get_scheduler_status_full
+        # 状态只读取内存中的数据（时间表索引、最近运行记录均已预先保存），不会阻塞
         try:
-            return self._scheduler.get_status_fast()
+            return self._scheduler.get_status()
         except Exception as e:
             try:
                 print("[ApiBridge] get_scheduler_status error:", e)
@@ -584,6 +943,12 @@ class ApiBridge:
         except Exception as e:
             return {"success": False, "error": str(e)}
 
+    def get_parse_cache_stats(self):
+        return self._api.get_parse_cache_stats()
+
+    def cancel_parse(self):
+        return self._api.cancel_parse()
+
     def get_rest_base(self):
         """提供本地REST服务基地址，供前端发现。"""
         try:
@@ -597,13 +962,29 @@ class ApiBridge:
 class RestServer:
     """基于 Flask 的本地 REST 服务。"""
 
+    # /api/batch 单次最多的子请求数
+    BATCH_MAX_REQUESTS = 20
+    # 不能放进批量请求的接口：流式响应、批量接口自身、退出与安装更新
+    BATCH_EXCLUDED_PATHS = ('/api/batch', '/api/bootstrap', '/api/events', '/api/exit', '/api/update/apply')
+
     def __init__(self, api: HomeworkAPI, scheduler: ScheduleManager, autostart: AutostartManager):
         self.api = api
         self.scheduler = scheduler
         self.autostart = autostart
         self.port = None
         self._thread = None
+        self._backend = None
+        # 批量请求中可并发执行的子请求在此线程池中运行（子请求不会再进入该线程池，不会互相等待）
+        self._batch_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="RESTBatch")
         app = Flask(__name__)
+        # 限制请求体大小（配置等 JSON 请求都很小），超限时返回错误
+        app.config['MAX_CONTENT_LENGTH'] = int(float(api.config.get('rest_max_request_mb', 2)) * 1024 * 1024)
+        # 只读接口的响应快照（强 ETag），配置保存、调度重新应用或状态变化时失效
+        # 序列化方式与 jsonify 相同，缓存前后响应体一致
+        self._snapshots = SnapshotCache(lambda data: app.json.dumps(data, separators=(",", ":")) + "\n")
+        api.events.add_listener(lambda _e: self._snapshots.invalidate("config", "scheduler_status"),
+                                topics=[TOPIC_CONFIG])
+        api.events.add_listener(lambda _e: self._snapshots.invalidate("scheduler_status"), topics=[TOPIC_SCHEDULER])
         # 下载进度与取消标记
         self._dl_state = {"stage": "idle", "percent": 0, "received": 0, "total": 0, "source": "", "portable": False}
         self._dl_cancel = False
@@ -623,21 +1004,73 @@ class RestServer:
         def cors(resp):
             resp.headers['Access-Control-Allow-Origin'] = '*'
             resp.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
-            resp.headers['Access-Control-Allow-Headers'] = 'Content-Type, Accept, X-Requested-With'
+            resp.headers['Access-Control-Allow-Headers'] = 'Content-Type, Accept, X-Requested-With, If-None-Match'
+            resp.headers['Access-Control-Expose-Headers'] = 'ETag'
             return resp
 
+        def cached_json(resource, build, key=None, ttl=None):
+            # 返回缓存的快照；GET 请求带相同 ETag 时返回 304，不再重新计算和序列化
+            snapshot = self._snapshots.get(resource, build, key, ttl)
+            if flask_request.method == 'GET' and flask_request.if_none_match.contains(snapshot.etag):
+                self._snapshots.count_not_modified()
+                resp = make_response('', 304)
+            else:
+                resp = app.response_class(snapshot.body, mimetype='application/json')
+            resp.set_etag(snapshot.etag)
+            resp.headers['Cache-Control'] = 'no-cache'
+            return cors(resp)
+
         @app.after_request
         def add_cors_headers(resp):
             # 全局添加CORS响应头，保证预检/异常响应也包含CORS
             resp.headers.setdefault('Access-Control-Allow-Origin', '*')
             resp.headers.setdefault('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-            resp.headers.setdefault('Access-Control-Allow-Headers', 'Content-Type, Accept, X-Requested-With')
+            resp.headers.setdefault('Access-Control-Allow-Headers', 'Content-Type, Accept, X-Requested-With, If-None-Match')
+            resp.headers.setdefault('Access-Control-Expose-Headers', 'ETag')
             return resp
 
+        @app.errorhandler(413)
+        def request_too_large(_e):
+            limit_mb = app.config['MAX_CONTENT_LENGTH'] / 1024 / 1024
+            return cors(make_response(jsonify({"success": False, "error": f"请求内容过大（上限 {limit_mb:g} MB）"}), 200))
+
         @app.route('/api/ping', methods=['GET', 'OPTIONS'])
         def ping():
             return cors(make_response(jsonify({"success": True, "pong": True}), 200))
 
+        @app.route('/api/events', methods=['GET'])
+        def events_stream():
+            # Server-Sent Events：调度状态、发送任务、更新下载进度与配置变更；?topics=a,b 只订阅部分主题
+            topics = [t for t in (flask_request.args.get('topics') or '').split(',') if t] or None
+            last_id = flask_request.headers.get('Last-Event-ID') or flask_request.args.get('last_event_id')
+            last_id = int(last_id) if last_id and last_id.isdigit() else None
+            # 每个连接会一直占用一个订阅（及服务端的一个流线程），数量有上限；超出时返回 503，界面改为定时查询
+            subscription = self.api.events.subscribe(
+                topics, last_id, max_subscribers=int(self.api.config.get('rest_max_event_streams', 4)))
+            if subscription is None:
+                resp = make_response(jsonify({"success": False, "error": "事件推送连接数已达上限"}), 503)
+                resp.headers['Retry-After'] = '30'
+                return cors(resp)
+
+            def _stream():
+                try:
+                    yield "retry: 3000\n\n"
+                    while not subscription.closed:
+                        event = subscription.get(timeout=15)
+                        if subscription.closed:
+                            break
+                        # 定期发送注释行保持连接，同时及时发现界面已断开
+                        yield format_sse(event) if event else ": keepalive\n\n"
+                finally:
+                    subscription.close()
+
+            resp = Response(_stream(), mimetype='text/event-stream')
+            # 响应未开始发送就被关闭时（如服务端流线程已满）生成器的 finally 不会执行，这里同样释放订阅
+            resp.call_on_close(subscription.close)
+            resp.headers['Cache-Control'] = 'no-cache'
+            resp.headers['X-Accel-Buffering'] = 'no'
+            return cors(resp)
+
         @app.route('/api/update/progress', methods=['GET'])
         def update_progress():
             try:
@@ -762,7 +1195,6 @@ class RestServer:
                 import requests as _rq
                 import tempfile as _tf
                 import subprocess as _sp
-                import threading as _th
                 import time as _t
 
                 owner_repo = 'NB-Group/Auto_Homework_sender'
@@ -875,6 +1307,7 @@ class RestServer:
                 last_err = None
                 self._dl_cancel = False
                 self._dl_state = {"stage": "downloading", "percent": 0, "received": 0, "total": 0, "source": "", "portable": bool(is_zip)}
+                self._publish_download()
                 for url in candidates:
                     try:
                         print('[Update][apply] try url:', url)
@@ -889,10 +1322,12 @@ class RestServer:
                             except Exception:
                                 pass
                             self._dl_state.update({"total": total, "source": url})
+                            self._publish_download()
                             with open(installer_path, 'wb') as f:
                                 for chunk in resp.iter_content(chunk_size=1024*256):
                                     if chunk:
                                         f.write(chunk)
+                                        last_pct = self._dl_state["percent"]
                                         self._dl_state["received"] += len(chunk)
                                         if total:
                                             pct = int(self._dl_state["received"] * 100 / total)
@@ -908,6 +1343,9 @@ class RestServer:
                                             print(f'[Update][progress] {self._dl_state["percent"]}% - {self._dl_state["received"]} bytes')
                                         except Exception:
                                             pass
+                                        # 百分比变化时才推送，避免每个数据块都产生一次事件
+                                        if self._dl_state["percent"] != last_pct:
+                                            self._publish_download()
                                         if self._dl_cancel:
                                             raise Exception('cancelled')
                         last_err = None
@@ -915,6 +1353,7 @@ class RestServer:
                     except Exception as e:
                         if str(e) == 'cancelled':
                             self._dl_state.update({"stage": "idle"})
+                            self._publish_download()
                             return cors(make_response(jsonify({'success': False, 'error': '已取消'}), 200))
                         last_err = e
                         try:
@@ -927,6 +1366,7 @@ class RestServer:
 
                 # 进入安装/解压阶段
                 self._dl_state.update({"stage": "installing", "percent": 100})
+                self._publish_download()
                 try:
                     print('[Update][apply] download completed, starting installation...')
                 except Exception:
@@ -1001,23 +1441,8 @@ class RestServer:
                         return cors(make_response(jsonify({'success': False, 'error': f'启动安装失败: {e}'}), 200))
 
                 # 异步退出当前应用，给前端留出响应时间
-                def _delayed_exit():
-                    try:
-                        import time as _t
-                        _t.sleep(2.0)
-                    except Exception:
-                        pass
-                    try:
-                        self.scheduler.shutdown()
-                    except Exception:
-                        pass
-                    try:
-                        print('[Update][apply] exiting current app for installer...')
-                    except Exception:
-                        pass
-                    os._exit(0)
-
-                _th.Thread(target=_delayed_exit, daemon=True).start()
+                print('[Update][apply] exiting current app for installer...')
+                request_exit(self.api, self.scheduler, "启动安装程序", delay=2.0)
 
                 return cors(make_response(jsonify({'success': True, 'started': True}), 200))
             except Exception as e:
@@ -1025,23 +1450,22 @@ class RestServer:
 
         @app.route('/api/config', methods=['GET'])
         def get_config():
-            return cors(make_response(jsonify(self.api.get_config()), 200))
+            return cached_json('config', self.api.get_config)
 
         @app.route('/api/config', methods=['POST', 'OPTIONS'])
         def save_config():
             if flask_request.method == 'OPTIONS':
                 return cors(make_response('', 200))
             data = flask_request.get_json(silent=True) or {}
-            # 支持直接贴入 webhook URL，解析出 access_token
+            # 支持直接贴入 webhook URL，解析出 access_token（含多群 targets）
             try:
-                token = (data or {}).get('access_token', '')
-                if isinstance(token, str) and 'access_token=' in token:
-                    import urllib.parse as _up
-                    parsed = _up.urlparse(token)
-                    qs = _up.parse_qs(parsed.query)
-                    at = (qs.get('access_token') or [''])[0]
-                    if at:
-                        data['access_token'] = at
+                if isinstance((data or {}).get('access_token'), str):
+                    data['access_token'] = normalize_access_token(data['access_token'])
+                if isinstance((data or {}).get('targets'), list):
+                    data['targets'] = [
+                        {**t, 'access_token': normalize_access_token(t.get('access_token'))}
+                        for t in data['targets'] if isinstance(t, dict)
+                    ]
             except Exception:
                 pass
             result = self.api.save_config(data)
@@ -1062,25 +1486,189 @@ class RestServer:
         @app.route('/api/scheduler/status', methods=['GET'])
         def scheduler_status():
             try:
-                return cors(make_response(jsonify(self.scheduler.get_status_fast()), 200))
+                # 兜底 60 秒：没有任务的方案不会因时间推移触发失效
+                return cached_json('scheduler_status', self.scheduler.get_status,
+                                   key=self.scheduler.status_version(), ttl=60)
+            except Exception as e:
+                return cors(make_response(jsonify({"success": False, "error": str(e)}), 200))
+
+        @app.route('/api/batch', methods=['POST', 'OPTIONS'])
+        def batch():
+            # {"requests": [{"id": "cfg", "method": "GET", "path": "/api/config", "body": {...}}, ...]}
+            # 连续的 GET 并发执行，POST 按顺序单独执行；结果按请求顺序返回
+            if flask_request.method == 'OPTIONS':
+                return cors(make_response('', 200))
+            items = (flask_request.get_json(silent=True) or {}).get('requests')
+            if not isinstance(items, list) or not items:
+                return cors(make_response(jsonify({"success": False, "error": "requests 须为非空列表"}), 200))
+            if len(items) > self.BATCH_MAX_REQUESTS:
+                return cors(make_response(jsonify(
+                    {"success": False, "error": f"单次最多 {self.BATCH_MAX_REQUESTS} 个子请求"}), 200))
+            started = time.perf_counter()
+            results = self._run_batch(items)
+            return cors(make_response(jsonify({
+                "success": True,
+                "results": results,
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+            }), 200))
+
+        @app.route('/api/bootstrap', methods=['GET'])
+        def bootstrap():
+            # 首屏所需的全部状态一次返回：配置、调度状态、开机启动状态、已解析好的预览与缓存的更新检查结果
+            started = time.perf_counter()
+            results = self._run_batch([
+                {"id": "config", "path": "/api/config"},
+                {"id": "scheduler_status", "path": "/api/scheduler/status"},
+                {"id": "autostart", "path": "/api/autostart/status"},
+            ])
+            data = {r["id"]: r["body"] if r["status"] == 200 else None for r in results}
+            ppt_path = (data.get("config") or {}).get("ppt_file_path")
+            # 预览只取监视器已解析好的结果，不在首屏请求里现场解析 PPT
+            latest = self.api.watcher.get_latest(ppt_path) if ppt_path and self.api.watcher else None
+            data["preview"] = {"success": True, **latest} if latest else None
+            data["update"] = None
+            try:
+                if self._update_cache.get('data') and time.time() - float(self._update_cache.get('ts', 0)) < self._update_cache_ttl:
+                    data["update"] = {"success": True, **self._update_cache['data']}
+            except Exception:
+                pass
+            return cors(make_response(jsonify({
+                "success": True,
+                "version": APP_VERSION,
+                **data,
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+            }), 200))
+
+        @app.route('/api/scheduler/history', methods=['GET'])
+        def scheduler_history():
+            # ?since=时间戳或日期 &limit=条数 &profile=方案 id
+            try:
+                limit = max(1, min(1000, int(flask_request.args.get('limit', 100))))
+            except (TypeError, ValueError):
+                limit = 100
+            since = parse_since(flask_request.args.get('since'))
+            profile_id = flask_request.args.get('profile') or None
+            try:
+                return cors(make_response(jsonify(self.scheduler.get_history(since, limit, profile_id)), 200))
             except Exception as e:
                 return cors(make_response(jsonify({"success": False, "error": str(e)}), 200))
 
+        @app.route('/api/profiles', methods=['GET'])
+        def profiles_status():
+            try:
+                status = self.scheduler.get_status()
+                return cors(make_response(jsonify({"success": True, "profiles": status["profiles"]}), 200))
+            except Exception as e:
+                return cors(make_response(jsonify({"success": False, "error": str(e)}), 200))
+
+        @app.route('/api/profiles/<profile_id>/status', methods=['GET'])
+        def profile_status(profile_id):
+            status = self.scheduler.get_profile_status(profile_id)
+            if status is None:
+                return cors(make_response(jsonify({"success": False, "error": "方案不存在"}), 200))
+            return cors(make_response(jsonify({"success": True, **status}), 200))
+
+        @app.route('/api/parse_cache/stats', methods=['GET'])
+        def parse_cache_stats():
+            return cors(make_response(jsonify(self.api.get_parse_cache_stats()), 200))
+
+        @app.route('/api/snapshots/stats', methods=['GET'])
+        def snapshots_stats():
+            return cors(make_response(jsonify({"success": True, **self._snapshots.snapshot_stats()}), 200))
+
+        @app.route('/api/parse/cancel', methods=['POST', 'OPTIONS'])
+        def parse_cancel():
+            if flask_request.method == 'OPTIONS':
+                return cors(make_response('', 200))
+            return cors(make_response(jsonify(self.api.cancel_parse()), 200))
+
+        @app.route('/api/parse/status', methods=['GET'])
+        def parse_status():
+            return cors(make_response(jsonify(self.api.get_parse_worker_status()), 200))
+
+        @app.route('/api/send/stats', methods=['GET'])
+        def send_stats():
+            return cors(make_response(jsonify(self.api.get_send_stats()), 200))
+
+        @app.route('/api/metrics/send', methods=['GET'])
+        def metrics_send():
+            try:
+                recent = max(0, min(500, int(flask_request.args.get('recent', 50))))
+            except (TypeError, ValueError):
+                recent = 50
+            return cors(make_response(jsonify(self.api.get_send_metrics(recent)), 200))
+
+        @app.route('/api/outbox', methods=['GET'])
+        def outbox_status():
+            try:
+                limit = max(1, min(500, int(flask_request.args.get('limit', 50))))
+            except (TypeError, ValueError):
+                limit = 50
+            return cors(make_response(jsonify(self.api.get_outbox_status(limit)), 200))
+
+        @app.route('/api/ratelimit/status', methods=['GET'])
+        def ratelimit_status():
+            return cors(make_response(jsonify(self.api.get_rate_limit_status()), 200))
+
         @app.route('/api/select_ppt_file', methods=['POST', 'OPTIONS'])
         def select_ppt_file():
             if flask_request.method == 'OPTIONS':
                 return cors(make_response('', 200))
             return cors(make_response(jsonify(self.api.select_ppt_file()), 200))
 
-        @app.route('/api/preview_homework', methods=['POST', 'OPTIONS'])
+        @app.route('/api/preview_homework', methods=['GET', 'POST', 'OPTIONS'])
         def preview_homework():
             if flask_request.method == 'OPTIONS':
                 return cors(make_response('', 200))
-            data = flask_request.get_json(silent=True) or {}
-            file_path = (data or {}).get('file_path') or self.api.get_config().get('ppt_file_path')
+            if flask_request.method == 'GET':
+                file_path = flask_request.args.get('file_path')
+            else:
+                file_path = (flask_request.get_json(silent=True) or {}).get('file_path')
+            file_path = file_path or self.api.get_config().get('ppt_file_path')
             if not file_path:
                 return cors(make_response(jsonify({"success": False, "error": "未提供文件路径"}), 200))
-            return cors(make_response(jsonify(self.api.preview_homework(file_path)), 200))
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                return cors(make_response(jsonify(self.api.preview_homework(file_path)), 200))
+            # 以文件修改时间与大小为版本键：PPT 保存后键随之变化，旧快照不再使用
+            return cached_json('preview', lambda: self.api.preview_homework(file_path),
+                               key=(file_path, stat.st_mtime_ns, stat.st_size))
+
+        @app.route('/api/preview/latest', methods=['GET'])
+        def preview_latest():
+            return cors(make_response(jsonify(self.api.get_latest_preview()), 200))
+
+        @app.route('/api/preview_batch', methods=['POST', 'OPTIONS'])
+        def preview_batch():
+            if flask_request.method == 'OPTIONS':
+                return cors(make_response('', 200))
+            data = flask_request.get_json(silent=True) or {}
+            paths = (data or {}).get('paths') or []
+            folder = (data or {}).get('folder')
+            # 支持直接传入文件夹：按文件名排序收集其中的 .pptx（跳过 Office 临时文件）
+            if not paths and folder:
+                try:
+                    paths = [os.path.join(folder, n) for n in sorted(os.listdir(folder))
+                             if n.lower().endswith('.pptx') and not n.startswith('~$')]
+                except Exception as e:
+                    return cors(make_response(jsonify({"success": False, "error": str(e)}), 200))
+            if not paths:
+                return cors(make_response(jsonify({"success": False, "error": "未提供文件路径"}), 200))
+            return cors(make_response(jsonify(self.api.parse_many(paths)), 200))
+
+        def _wants_wait(data):
+            # ?wait=1 保持旧的同步行为：等待任务完成后返回发送结果
+            flag = flask_request.args.get('wait') or (data or {}).get('wait')
+            return str(flag).lower() in ('1', 'true', 'yes')
+
+        def _job_response(submitted, data):
+            if submitted.get("success") and _wants_wait(data):
+                job = self.api.jobs.wait(submitted["job_id"])
+                if job is None:
+                    return {"success": False, "error": "任务不存在或已过期", "job_id": submitted["job_id"]}
+                return {**(job["result"] or {}), "job_id": job["id"]}
+            return submitted
 
         @app.route('/api/send_homework', methods=['POST', 'OPTIONS'])
         def send_homework():
@@ -1090,7 +1678,8 @@ class RestServer:
             file_path = (data or {}).get('file_path') or self.api.get_config().get('ppt_file_path')
             if not file_path:
                 return cors(make_response(jsonify({"success": False, "error": "未提供文件路径"}), 200))
-            return cors(make_response(jsonify(self.api.send_homework(file_path)), 200))
+            submitted = self.api.submit_send_homework(file_path, source="rest")
+            return cors(make_response(jsonify(_job_response(submitted, data)), 200))
 
         @app.route('/api/send_content', methods=['POST', 'OPTIONS'])
         def send_content():
@@ -1100,9 +1689,24 @@ class RestServer:
             content = (data or {}).get('content')
             if not content:
                 return cors(make_response(jsonify({"success": False, "error": "未提供发送内容"}), 200))
-            # 直接发送内容到钉钉
-            result = self.api.send_to_dingtalk(content)
-            return cors(make_response(jsonify(result), 200))
+            # 直接发送内容到钉钉（作为任务执行，立即返回任务 ID）
+            submitted = self.api.submit_send_content(content, source="rest")
+            return cors(make_response(jsonify(_job_response(submitted, data)), 200))
+
+        @app.route('/api/jobs', methods=['GET'])
+        def jobs_list():
+            return cors(make_response(jsonify(self.api.list_jobs()), 200))
+
+        @app.route('/api/jobs/<job_id>', methods=['GET'])
+        def job_status(job_id):
+            # ?wait=秒 长轮询：任务完成或状态变化（版本号大于 ?since=）时立即返回，最长 30 秒
+            try:
+                wait = max(0.0, min(30.0, float(flask_request.args.get('wait', 0))))
+            except (TypeError, ValueError):
+                wait = 0.0
+            since = flask_request.args.get('since')
+            since = int(since) if since and since.isdigit() else None
+            return cors(make_response(jsonify(self.api.get_job(job_id, wait, since)), 200))
 
         @app.route('/api/window/minimize', methods=['POST', 'OPTIONS'])
         def window_minimize():
@@ -1145,15 +1749,18 @@ class RestServer:
             if flask_request.method == 'OPTIONS':
                 return cors(make_response('', 200))
             try:
-                self.scheduler.shutdown()
-                os._exit(0)
+                # 先返回响应，再在后台等待其他进行中的请求完成后退出
+                request_exit(self.api, self.scheduler, "收到退出请求")
+                return cors(make_response(jsonify({"success": True}), 200))
             except Exception as e:
                 return cors(make_response(jsonify({"success": False, "error": str(e)}), 200))
 
         @app.route('/api/autostart/status', methods=['GET'])
         def autostart_status():
             try:
-                return cors(make_response(jsonify(self.autostart.get_autostart_status()), 200))
+                # 本进程写注册表后版本键改变；在程序外修改的启动项 5 分钟内生效
+                return cached_json('autostart', self.autostart.get_autostart_status,
+                                   key=AutostartManager.registry_generation, ttl=300)
             except Exception as e:
                 return cors(make_response(jsonify({"success": False, "error": str(e)}), 200))
 
@@ -1178,17 +1785,86 @@ class RestServer:
 
         def run_app():
             try:
-                self._app.run(host='127.0.0.1', port=self.port, debug=False, use_reloader=False)
+                # 服务后端可通过 rest_backend 配置切换（见 rest_serving.py）
+                self._backend = create_backend(self._app, '127.0.0.1', self.port, self.api.config)
+                print(f"[REST] 服务已启动: {self.base_url} ({self._backend.snapshot()['backend']})")
+                self._backend.serve_forever()
             except Exception as e:
                 print('[REST] server error:', e)
 
         self._thread = threading.Thread(target=run_app, name='RESTServer', daemon=True)
         self._thread.start()
 
+    def _run_subrequest(self, index, item):
+        """经 Flask 测试客户端执行一个子请求（与直接请求走同一套路由、缓存与 ETag 处理）"""
+        item = item if isinstance(item, dict) else {}
+        request_id = item.get('id', index)
+        method = str(item.get('method') or 'GET').upper()
+        path = str(item.get('path') or '')
+        if method not in ('GET', 'POST') or not path.startswith('/api/') \
+                or path.split('?', 1)[0] in self.BATCH_EXCLUDED_PATHS:
+            return {"id": request_id, "status": 400, "body": {"success": False, "error": f"不支持的子请求: {method} {path}"}}
+        headers = {k: v for k, v in (item.get('headers') or {}).items() if k.lower() in ('if-none-match', 'accept')}
+        started = time.perf_counter()
+        try:
+            resp = self._app.test_client().open(
+                path, method=method, headers=headers, json=item.get('body') if method == 'POST' else None)
+            body = None
+            if resp.status_code != 304:
+                body = resp.get_json(silent=True)
+                if body is None:
+                    body = resp.get_data(as_text=True)
+            return {
+                "id": request_id,
+                "status": resp.status_code,
+                "etag": resp.headers.get('ETag'),
+                "body": body,
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+            }
+        except Exception as e:
+            return {"id": request_id, "status": 500, "body": {"success": False, "error": str(e)}}
+
+    def _run_batch(self, items):
+        """连续的 GET 子请求并发执行；POST 可能修改状态，按原顺序单独执行"""
+        results = []
+        group = []
+
+        def _flush():
+            if len(group) == 1:
+                results.append(self._run_subrequest(*group[0]))
+            elif group:
+                results.extend(self._batch_pool.map(lambda g: self._run_subrequest(*g), group))
+            group.clear()
+
+        for index, item in enumerate(items):
+            method = str((item or {}).get('method') or 'GET').upper() if isinstance(item, dict) else 'GET'
+            if method == 'GET':
+                group.append((index, item))
+                continue
+            _flush()
+            results.append(self._run_subrequest(index, item))
+        _flush()
+        return results
+
+    def drain(self, timeout: float = 5.0) -> bool:
+        """停止接收新请求并等待进行中的请求完成（最多 timeout 秒）"""
+        if not self._backend:
+            return True
+        drained = self._backend.drain(timeout)
+        print(f"[REST] 服务已停止{'' if drained else '（部分请求未在超时前完成）'}")
+        return drained
+
     @property
     def base_url(self) -> str:
         return f"http://127.0.0.1:{self.port}" if self.port else ''
 
+    def _publish_download(self):
+        """推送更新下载进度（界面订阅 /api/events，不再轮询 /api/update/progress）"""
+        try:
+            self.api.events.publish(TOPIC_UPDATE, dict(self._dl_state))
+        except Exception:
+            pass
+
     # 健康检查
     def ping(self):
         """用于前端快速验证桥接是否可用。"""
@@ -1268,21 +1944,8 @@ class RestServer:
     def exit_app(self):
         """彻底退出应用程序"""
         try:
-            # 停止调度器
-            self._scheduler.shutdown()
-
-            # 销毁窗口
-            global _MAIN_WINDOW
-            if _MAIN_WINDOW:
-                try:
-                    _MAIN_WINDOW.destroy()
-                except Exception:
-                    pass
-
-            # 退出程序
-            import sys
-            sys.exit(0)
-
+            # 停止调度器与 REST 服务后关闭窗口
+            request_exit(self._api, self._scheduler, "用户退出")
             return {"success": True}
         except Exception as e:
             return {"success": False, "error": str(e)}
@@ -1296,6 +1959,21 @@ def start_ui_mode(instance_manager=None, hidden=False):
 
     api_bridge = ApiBridge(api, scheduler)
 
+    # 监视PPT文件，保存后自动重新解析并推送预览
+    try:
+        api.start_watcher(on_update=_push_preview_update)
+    except Exception as e:
+        print(f"[Watcher] 启动失败: {e}")
+
+    # 发送任务状态推送到前端
+    api.jobs.add_listener(_push_job_update)
+
+    # 发送队列：补发上次未送达的消息
+    try:
+        api.start_outbox()
+    except Exception as e:
+        print(f"[Outbox] 启动失败: {e}")
+
     # 启动本地 REST 服务
     autostart = AutostartManager()
     global _REST_SERVER
@@ -1628,6 +2306,9 @@ def main():
         pass
 
 if __name__ == "__main__":
+    # 打包后批量解析使用进程池，子进程需由 freeze_support 接管
+    import multiprocessing
+    multiprocessing.freeze_support()
     main()
 
 
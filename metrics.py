@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+发送链路耗时统计模块
+对解析（打开文件、XML 解析、生成 Markdown）与发送（DNS、TCP 建连、TLS 握手、等待服务端响应）
+分阶段计时，保存在内存直方图中；最近的样本追加写入 AppData 下的 jsonl 文件，
+便于把“作业发晚了”与当时的网络状况对应起来。
+
+网络阶段通过替换 urllib3 的连接类获得：只有新建连接时才有 DNS/建连/TLS 耗时，
+复用长连接的请求只有 request/server 两个阶段。
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+from collections import deque
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+
+class Histogram:
+    """固定分桶的耗时直方图（毫秒），另保留最近的样本用于计算分位数"""
+
+    BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+
+    def __init__(self, window=512):
+        self.buckets = [0] * (len(self.BOUNDS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.recent = deque(maxlen=window)
+
+    def observe(self, ms):
+        i = 0
+        while i < len(self.BOUNDS_MS) and ms > self.BOUNDS_MS[i]:
+            i += 1
+        self.buckets[i] += 1
+        self.count += 1
+        self.total += ms
+        self.min = ms if self.min is None else min(self.min, ms)
+        self.max = ms if self.max is None else max(self.max, ms)
+        self.recent.append(ms)
+
+    @staticmethod
+    def _percentile(ordered, pct):
+        if not ordered:
+            return None
+        k = (len(ordered) - 1) * pct / 100
+        lo = int(k)
+        hi = min(lo + 1, len(ordered) - 1)
+        return round(ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo), 2)
+
+    def snapshot(self):
+        ordered = sorted(self.recent)
+        labels = [f"<={b}" for b in self.BOUNDS_MS] + [f">{self.BOUNDS_MS[-1]}"]
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count, 2) if self.count else None,
+            "min_ms": round(self.min, 2) if self.min is not None else None,
+            "max_ms": round(self.max, 2) if self.max is not None else None,
+            "p50_ms": self._percentile(ordered, 50),
+            "p95_ms": self._percentile(ordered, 95),
+            "p99_ms": self._percentile(ordered, 99),
+            "buckets": {label: n for label, n in zip(labels, self.buckets) if n},
+        }
+
+
+class MetricsRegistry:
+    """按名称管理直方图，并持久化最近的样本"""
+
+    def __init__(self, samples_file=None, max_samples=500, max_file_bytes=1024 * 1024):
+        self.samples_file = samples_file
+        self.max_file_bytes = max_file_bytes
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._samples = deque(maxlen=max_samples)
+        self._load()
+
+    def observe(self, name, ms):
+        if ms is None:
+            return
+        with self._lock:
+            hist = self._histograms.get(name)
+            if hist is None:
+                hist = self._histograms[name] = Histogram()
+            hist.observe(ms)
+
+    def observe_phases(self, prefix, phases):
+        for name, ms in phases.items():
+            self.observe(f"{prefix}.{name}", ms)
+
+    def record_sample(self, kind, phases, **meta):
+        """记录一条样本（各阶段耗时与附加信息），并追加写入样本文件"""
+        sample = {
+            "ts": round(time.time(), 3),
+            "kind": kind,
+            "phases": {k: round(v, 2) for k, v in phases.items()},
+            **meta,
+        }
+        with self._lock:
+            self._samples.append(sample)
+            self._append(sample)
+        return sample
+
+    def snapshot(self, prefixes=None, recent=50):
+        with self._lock:
+            histograms = {name: h.snapshot() for name, h in sorted(self._histograms.items())
+                          if not prefixes or name.split(".", 1)[0] in prefixes}
+            samples = [s for s in self._samples if not prefixes or s.get("kind") in prefixes]
+        return {"histograms": histograms, "recent": samples[-recent:] if recent else []}
+
+    def _load(self):
+        """启动时读入上次保存的样本（只恢复样本，直方图从本次运行开始统计）"""
+        if not self.samples_file or not os.path.exists(self.samples_file):
+            return
+        try:
+            with open(self.samples_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        self._samples.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except Exception as e:
+            print(f"[Metrics] 读取样本文件失败: {e}")
+
+    def _append(self, sample):
+        if not self.samples_file:
+            return
+        try:
+            with open(self.samples_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(sample, ensure_ascii=False) + "\n")
+            if os.path.getsize(self.samples_file) > self.max_file_bytes:
+                # 超过大小上限时只保留内存中的最近样本
+                tmp = self.samples_file + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    for s in self._samples:
+                        f.write(json.dumps(s, ensure_ascii=False) + "\n")
+                os.replace(tmp, self.samples_file)
+        except Exception as e:
+            print(f"[Metrics] 写入样本文件失败: {e}")
+
+
+# ---- 网络阶段计时 ----
+
+_local = threading.local()
+
+
+def begin_request_timing():
+    """开始记录当前线程下一次请求的网络阶段，返回将被填充的字典"""
+    _local.phases = {}
+    _local.opened_connection = False
+    return _local.phases
+
+
+def end_request_timing():
+    phases = getattr(_local, "phases", None)
+    _local.phases = None
+    return phases or {}
+
+
+def request_opened_connection():
+    """当前线程最近一次计时的请求是否新建（或尝试新建）了连接"""
+    return bool(getattr(_local, "opened_connection", False))
+
+
+def _current_phases():
+    return getattr(_local, "phases", None)
+
+
+class _TimedConnectionMixin:
+    def connect(self):
+        # 复用的长连接不会调用 connect()，据此区分新建连接与复用连接
+        if _current_phases() is not None:
+            _local.opened_connection = True
+        super().connect()
+
+    def _new_conn(self):
+        phases = _current_phases()
+        host = self._dns_host
+        t0 = time.perf_counter()
+        try:
+            infos = socket.getaddrinfo(host, self.port, 0, socket.SOCK_STREAM)
+        except OSError:
+            # 解析失败交给 urllib3 抛出原有的异常类型
+            return super()._new_conn()
+        t1 = time.perf_counter()
+        # 用解析出的地址建连（SNI 与证书校验仍使用 self.host），避免重复解析
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        last_error = None
+        sock = None
+        try:
+            for address in addresses:
+                self._dns_host = address
+                try:
+                    sock = super()._new_conn()
+                    break
+                except Exception as e:
+                    last_error = e
+        finally:
+            self._dns_host = host
+        if sock is None:
+            raise last_error
+        if phases is not None:
+            phases["dns"] = (t1 - t0) * 1000
+            phases["connect"] = (time.perf_counter() - t1) * 1000
+        return sock
+
+    def request(self, *args, **kwargs):
+        phases = _current_phases()
+        t0 = time.perf_counter()
+        try:
+            return super().request(*args, **kwargs)
+        finally:
+            if phases is not None:
+                phases["request"] = (time.perf_counter() - t0) * 1000
+
+    def getresponse(self, *args, **kwargs):
+        phases = _current_phases()
+        t0 = time.perf_counter()
+        try:
+            return super().getresponse(*args, **kwargs)
+        finally:
+            if phases is not None:
+                # 请求发出到收到响应头：服务端处理时间加一次网络往返
+                phases["server"] = (time.perf_counter() - t0) * 1000
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    def connect(self):
+        phases = _current_phases()
+        t0 = time.perf_counter()
+        super().connect()
+        if phases is not None and "connect" in phases:
+            elapsed = (time.perf_counter() - t0) * 1000
+            phases["tls"] = max(0.0, elapsed - phases["dns"] - phases["connect"])
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+_TIMED_POOL_CLASSES = {
+    "http": TimedHTTPConnectionPool,
+    "https": TimedHTTPSConnectionPool,
+}
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """使用可计时连接类的 requests 适配器（直连与经 HTTP 代理都计时）"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = dict(_TIMED_POOL_CLASSES)
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+        # SOCKS 代理使用自己的连接池类，保持不变
+        if not proxy.lower().startswith("socks"):
+            manager.pool_classes_by_scheme = dict(_TIMED_POOL_CLASSES)
+        return manager
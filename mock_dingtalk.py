@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+本地钉钉机器人模拟服务
+模拟 /robot/send 接口，用于离线测试与压测发送链路（重试、连接复用、限流、拆分），
+可注入延迟、错误码、HTTP 5xx、限流响应与连接中断。只依赖标准库。
+
+用法：
+    python mock_dingtalk.py --port 18080 --latency-ms 80 --drop-rate 0.05
+    然后设置环境变量 AH_DINGTALK_BASE_URL=http://127.0.0.1:18080 运行程序，
+    或在代码中使用 HomeworkAPI(dingtalk_base_url=server.url)。
+"""
+
+import argparse
+import json
+import random
+import socket
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class MockDingTalkServer:
+    """可嵌入测试/压测脚本的模拟钉钉机器人服务"""
+
+    def __init__(self, host="127.0.0.1", port=0, latency_ms=0.0, jitter_ms=0.0, errcode=0,
+                 error_rate=0.0, status_5xx_rate=0.0, drop_rate=0.0, rate_limit_per_minute=0,
+                 keyword=None, max_bytes=20000):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        # error_rate 比例的请求返回 errcode（errcode 为 0 时不生效）
+        self.errcode = errcode
+        self.error_rate = error_rate
+        self.status_5xx_rate = status_5xx_rate
+        # drop_rate 比例的请求读完请求体后直接断开连接，不返回响应
+        self.drop_rate = drop_rate
+        # 每个 access_token 每分钟允许的消息数，超出返回 130101（0 表示不限流）
+        self.rate_limit_per_minute = rate_limit_per_minute
+        # 模拟机器人“自定义关键词”安全设置
+        self.keyword = keyword
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._windows = defaultdict(deque)
+        self.stats = defaultdict(int)
+        self.messages = deque(maxlen=1000)
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="MockDingTalk", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def reset(self):
+        with self._lock:
+            self.stats.clear()
+            self.messages.clear()
+            self._windows.clear()
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _rate_limited(self, token):
+        if not self.rate_limit_per_minute:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows[token]
+            while window and now - window[0] >= 60:
+                window.popleft()
+            if len(window) >= self.rate_limit_per_minute:
+                return True
+            window.append(now)
+            return False
+
+    def _handle(self, token, body):
+        """返回 (HTTP 状态码, 响应字典)；返回 None 表示断开连接。"""
+        if self.drop_rate and random.random() < self.drop_rate:
+            self._count("dropped")
+            return None
+        if self.status_5xx_rate and random.random() < self.status_5xx_rate:
+            self._count("http_5xx")
+            return 503, {"errcode": -1, "errmsg": "service unavailable"}
+        if not token:
+            self._count("rejected")
+            return 200, {"errcode": 300001, "errmsg": "token is not exist"}
+        if self._rate_limited(token):
+            self._count("rate_limited")
+            return 200, {"errcode": 130101, "errmsg": "send too fast, exceed 20 times per minute"}
+        if self.errcode and random.random() < self.error_rate:
+            self._count("errcode")
+            return 200, {"errcode": self.errcode, "errmsg": f"mock error {self.errcode}"}
+        try:
+            payload = json.loads(body)
+            text = payload["markdown"]["text"] if payload.get("msgtype") == "markdown" else payload["text"]["content"]
+        except Exception:
+            self._count("rejected")
+            return 200, {"errcode": 40035, "errmsg": "invalid parameter"}
+        if self.max_bytes and len(text.encode("utf-8")) > self.max_bytes:
+            self._count("rejected")
+            return 200, {"errcode": 460101, "errmsg": "message too long"}
+        if self.keyword and self.keyword not in text:
+            self._count("rejected")
+            return 200, {"errcode": 310000, "errmsg": "keywords not in content"}
+        self._count("ok")
+        with self._lock:
+            self.messages.append({"token": token, "text": text, "received_at": time.time()})
+        return 200, {"errcode": 0, "errmsg": "ok"}
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # 响应头与响应体分两次写出，关闭 Nagle 以免与客户端延迟确认叠加产生约 40ms 停顿
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                server._count("requests")
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length)
+                parsed = urlparse(self.path)
+                if parsed.path != "/robot/send":
+                    self._reply(404, {"errcode": 404, "errmsg": "not found"})
+                    return
+                delay = server.latency_ms + (random.uniform(0, server.jitter_ms) if server.jitter_ms else 0)
+                if delay:
+                    time.sleep(delay / 1000)
+                token = (parse_qs(parsed.query).get("access_token") or [""])[0]
+                outcome = server._handle(token, body)
+                if outcome is None:
+                    try:
+                        self.connection.shutdown(socket.SHUT_RDWR)
+                    except OSError:
+                        pass
+                    self.close_connection = True
+                    return
+                self._reply(*outcome)
+
+            def do_HEAD(self):
+                # 连接预热使用 HEAD 请求：只返回响应头，保持长连接
+                server._count("head")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def _reply(self, status, data):
+                raw = json.dumps(data).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    ap = argparse.ArgumentParser(description="本地钉钉机器人模拟服务")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=18080)
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="每个请求的固定延迟")
+    ap.add_argument("--jitter-ms", type=float, default=0.0, help="额外的随机延迟上限")
+    ap.add_argument("--errcode", type=int, default=0, help="按 --error-rate 比例返回的错误码")
+    ap.add_argument("--error-rate", type=float, default=1.0)
+    ap.add_argument("--http-5xx-rate", type=float, default=0.0, help="返回 HTTP 503 的比例")
+    ap.add_argument("--drop-rate", type=float, default=0.0, help="直接断开连接的比例")
+    ap.add_argument("--rate-limit", type=int, default=0, help="每个 token 每分钟允许的消息数，0 表示不限")
+    ap.add_argument("--keyword", default=None, help="要求消息包含的关键词（如 作业）")
+    ap.add_argument("--max-bytes", type=int, default=20000, help="消息正文的 UTF-8 字节上限")
+    args = ap.parse_args()
+
+    server = MockDingTalkServer(
+        host=args.host, port=args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        errcode=args.errcode, error_rate=args.error_rate, status_5xx_rate=args.http_5xx_rate,
+        drop_rate=args.drop_rate, rate_limit_per_minute=args.rate_limit, keyword=args.keyword,
+        max_bytes=args.max_bytes,
+    ).start()
+    print(f"[Mock] 钉钉模拟服务已启动: {server.url}  (AH_DINGTALK_BASE_URL={server.url})")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"[Mock] {dict(server.stats)}")
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+钉钉发送队列（Outbox）模块
+所有发送先写入 AppData 下的 SQLite（WAL 模式），再尝试投递；
+同一去重键（dedup_key）只会入队一次；进程在发送中被结束时，启动后重新排队（可能重复发送）。
+请求确定未送达钉钉的失败（DNS/建连失败、5xx、429 限流）由后台线程按退避策略重发。
+请求已发出但结果未知的失败（等待响应超时、发送后连接中断）直接标记为失败、不再补发，
+以免重复发送；只有开启 send_retry_read_timeout 时才会按上述策略重发。
+"""
+
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+STATUS_PENDING = "pending"
+STATUS_SENDING = "sending"
+STATUS_SENT = "sent"
+STATUS_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    dedup_key TEXT NOT NULL UNIQUE,
+    target_name TEXT,
+    access_token TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    sent_at REAL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(status, next_attempt_at);
+"""
+
+
+class Outbox:
+    """基于 SQLite 的持久化发送队列"""
+
+    def __init__(self, db_path, deliver, max_attempts=20, max_age_hours=12, backoff_base=30, backoff_max=1800,
+                 retention_days=7):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        # 超过该时长仍未送达的消息不再补发（例如隔天的作业已没有意义）
+        self.max_age_hours = max_age_hours
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+        # deliver(access_token, payload) 执行实际发送，返回含 success/retryable 的结果字典
+        self._deliver = deliver
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    # ---- 队列操作 ----
+
+    def enqueue(self, access_token, payload, dedup_key, target_name=None):
+        """入队；去重键已存在时不重复入队。返回 (行记录, 是否新建)。"""
+        now = time.time()
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT OR IGNORE INTO outbox (dedup_key, target_name, access_token, payload, status, "
+                "next_attempt_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (dedup_key, target_name, access_token, json.dumps(payload, ensure_ascii=False),
+                 STATUS_PENDING, now, now, now),
+            )
+            created = cur.rowcount == 1
+            row = self._conn.execute("SELECT * FROM outbox WHERE dedup_key = ?", (dedup_key,)).fetchone()
+        return dict(row), created
+
+    def claim(self, item_id):
+        """将待发送消息标记为发送中；已被其他线程领取或已完成时返回 False。"""
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE outbox SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ? AND status = ?",
+                (STATUS_SENDING, time.time(), item_id, STATUS_PENDING),
+            )
+            return cur.rowcount == 1
+
+    def mark_sent(self, item_id):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET status = ?, sent_at = ?, updated_at = ?, last_error = NULL WHERE id = ?",
+                (STATUS_SENT, now, now, item_id),
+            )
+
+    def mark_failed(self, item_id, error):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET status = ?, updated_at = ?, last_error = ? WHERE id = ?",
+                (STATUS_FAILED, time.time(), error, item_id),
+            )
+
+    def mark_retry(self, item_id, error):
+        """投递失败但可重试：按尝试次数指数退避后重新排队，超过次数上限则标记失败。返回是否仍会重试。"""
+        with self._lock:
+            row = self._conn.execute("SELECT attempts FROM outbox WHERE id = ?", (item_id,)).fetchone()
+        attempts = row["attempts"] if row else self.max_attempts
+        if attempts >= self.max_attempts:
+            self.mark_failed(item_id, f"{error}（已重试 {attempts} 次）")
+            return False
+        delay = min(self.backoff_max, self.backoff_base * (2 ** max(0, attempts - 1)))
+        delay = delay / 2 + random.uniform(0, delay / 2)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET status = ?, next_attempt_at = ?, updated_at = ?, last_error = ? WHERE id = ?",
+                (STATUS_PENDING, now + delay, now, error, item_id),
+            )
+        self._wake.set()
+        return True
+
+    def recover(self):
+        """启动时恢复：上次进程在发送中被结束的消息重新排队。"""
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE outbox SET status = ?, next_attempt_at = ?, updated_at = ? WHERE status = ?",
+                (STATUS_PENDING, time.time(), time.time(), STATUS_SENDING),
+            )
+            pending = self._conn.execute(
+                "SELECT COUNT(*) FROM outbox WHERE status = ?", (STATUS_PENDING,)).fetchone()[0]
+        if cur.rowcount or pending:
+            print(f"[Outbox] 启动恢复：{cur.rowcount} 条发送中断的消息重新排队，共 {pending} 条待发送")
+        return pending
+
+    def purge(self):
+        """清理超过保留期的已完成记录。"""
+        cutoff = time.time() - self.retention_days * 86400
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM outbox WHERE status IN (?, ?) AND updated_at < ?",
+                (STATUS_SENT, STATUS_FAILED, cutoff),
+            )
+
+    def _due_items(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM outbox WHERE status = ? ORDER BY id", (STATUS_PENDING,)).fetchall()
+        return [dict(r) for r in rows]
+
+    def _next_due_in(self, now):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(next_attempt_at) FROM outbox WHERE status = ?", (STATUS_PENDING,)).fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - now)
+
+    def summary(self, limit=50):
+        """队列状态：各状态计数与最近的消息（不含 token 与消息体）。"""
+        with self._lock:
+            counts = {r["status"]: r["n"] for r in self._conn.execute(
+                "SELECT status, COUNT(*) AS n FROM outbox GROUP BY status")}
+            rows = self._conn.execute(
+                "SELECT id, dedup_key, target_name, status, attempts, next_attempt_at, created_at, "
+                "updated_at, sent_at, last_error FROM outbox ORDER BY id DESC LIMIT ?", (int(limit),)).fetchall()
+        return {
+            "counts": {s: counts.get(s, 0) for s in (STATUS_PENDING, STATUS_SENDING, STATUS_SENT, STATUS_FAILED)},
+            "items": [dict(r) for r in rows],
+            "draining": bool(self._thread and self._thread.is_alive()),
+        }
+
+    # ---- 投递 ----
+
+    def deliver(self, item):
+        """投递单条消息（调用方已 claim），并按结果更新状态。"""
+        try:
+            result = self._deliver(item["access_token"], json.loads(item["payload"]))
+        except Exception as e:
+            result = {"success": False, "error": str(e), "retryable": True}
+        if result.get("success"):
+            self.mark_sent(item["id"])
+        elif result.get("retryable"):
+            result["queued"] = self.mark_retry(item["id"], result.get("error") or "发送失败")
+        else:
+            self.mark_failed(item["id"], result.get("error") or "发送失败")
+        return result
+
+    def start(self):
+        """启动后台补发线程（先恢复上次未完成的消息）。"""
+        if self._thread and self._thread.is_alive():
+            return
+        self.recover()
+        self.purge()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name="OutboxDrainer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def wake(self):
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stop_event.is_set():
+            try:
+                self._drain_once()
+                due_in = self._next_due_in(time.time())
+            except Exception as e:
+                print(f"[Outbox] 补发异常: {e}")
+                due_in = 60
+            # 没有待发送消息时仅等待新的唤醒；定期醒来以兜底
+            self._wake.wait(600 if due_in is None else min(due_in, 600))
+            self._wake.clear()
+
+    def _drain_once(self):
+        now = time.time()
+        blocked_tokens = set()
+        for item in self._due_items():
+            if self._stop_event.is_set():
+                return
+            token = item["access_token"]
+            # 同一机器人的消息按入队顺序投递：前一条未送达时后续消息等待
+            if token in blocked_tokens:
+                continue
+            if item["next_attempt_at"] > now:
+                blocked_tokens.add(token)
+                continue
+            if self.max_age_hours and now - item["created_at"] > self.max_age_hours * 3600:
+                self.mark_failed(item["id"], f"超过 {self.max_age_hours} 小时未能送达，已放弃")
+                print(f"[Outbox] 消息 {item['id']} 已过期，放弃补发")
+                continue
+            if not self.claim(item["id"]):
+                continue
+            result = self.deliver(item)
+            if result.get("success"):
+                print(f"[Outbox] 补发成功: #{item['id']} -> {item.get('target_name')}")
+            else:
+                blocked_tokens.add(token)
+                print(f"[Outbox] 补发失败: #{item['id']} -> {item.get('target_name')}: {result.get('error')}")
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+隔离解析子进程模块
+PPT 解析在可复用的子进程中执行，由父进程负责超时、内存上限、取消与定期回收，
+避免损坏或超大的文件拖垮常驻托盘进程或卡住定时发送。
+"""
+
+import multiprocessing
+import threading
+import time
+
+
+def _worker_main(conn):
+    """子进程主循环：逐个接收 (路径, 引擎) 请求并返回解析结果；收到 None 时退出。"""
+    # 延迟导入，避免父子进程之间的循环导入
+    from homework_api import _parse_in_subprocess
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, OSError):
+            break
+        if request is None:
+            break
+        file_path, engine = request
+        try:
+            conn.send(_parse_in_subprocess(file_path, engine))
+        except (BrokenPipeError, OSError):
+            break
+
+
+def _get_rss_mb(pid):
+    """读取子进程常驻内存（MB）；psutil 不可用时返回 None。"""
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss / (1024 * 1024)
+    except Exception:
+        return None
+
+
+class ParseWorker:
+    """常驻解析子进程管理器（同一时间只处理一个解析请求）"""
+
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, timeout=60, max_rss_mb=1024, max_tasks=20):
+        self.timeout = timeout
+        self.max_rss_mb = max_rss_mb
+        self.max_tasks = max_tasks
+        # 统一使用 spawn，避免在多线程进程中 fork
+        self._ctx = multiprocessing.get_context("spawn")
+        self._proc = None
+        self._conn = None
+        self._tasks_done = 0
+        self._lock = threading.Lock()
+        self._cancel_event = threading.Event()
+        self._current_file = None
+        self.restarts = 0
+
+    def _ensure_process(self):
+        if self._proc is not None and self._proc.is_alive():
+            return
+        self._kill()
+        parent_conn, child_conn = self._ctx.Pipe()
+        proc = self._ctx.Process(target=_worker_main, args=(child_conn,), name="ParseWorker", daemon=True)
+        proc.start()
+        child_conn.close()
+        self._proc, self._conn = proc, parent_conn
+        self._tasks_done = 0
+        print(f"[ParseWorker] 子进程已启动，PID: {proc.pid}")
+
+    def _kill(self):
+        """强制结束当前子进程（超时、超内存或取消时使用）。"""
+        proc, conn = self._proc, self._conn
+        self._proc, self._conn = None, None
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        if proc is not None:
+            try:
+                proc.terminate()
+                proc.join(timeout=2)
+                if proc.is_alive():
+                    proc.kill()
+                    proc.join(timeout=2)
+            except Exception:
+                pass
+            self.restarts += 1
+
+    def _retire(self):
+        """正常回收子进程：通知其退出，释放 python-pptx 累积的内存。"""
+        proc, conn = self._proc, self._conn
+        self._proc, self._conn = None, None
+        try:
+            conn.send(None)
+            proc.join(timeout=2)
+        except Exception:
+            pass
+        if proc.is_alive():
+            proc.terminate()
+        try:
+            conn.close()
+        except Exception:
+            pass
+        print(f"[ParseWorker] 已完成 {self._tasks_done} 次解析，回收子进程")
+
+    def parse(self, file_path, engine="auto"):
+        """在子进程中解析PPT，返回与 parse_ppt_to_markdown 相同结构的结果字典。"""
+        if not self._lock.acquire(timeout=self.timeout):
+            return {"success": False, "error": "解析进程繁忙，请稍后重试"}
+        try:
+            self._cancel_event.clear()
+            self._current_file = file_path
+            try:
+                self._ensure_process()
+                self._conn.send((file_path, engine))
+            except Exception as e:
+                self._kill()
+                return {"success": False, "error": f"无法启动解析进程: {e}"}
+
+            deadline = time.monotonic() + self.timeout
+            while True:
+                try:
+                    if self._conn.poll(self.POLL_INTERVAL):
+                        result = self._conn.recv()
+                        break
+                except (EOFError, OSError):
+                    self._kill()
+                    return {"success": False, "error": "解析进程异常退出，文件可能已损坏"}
+
+                if self._cancel_event.is_set():
+                    self._kill()
+                    print(f"[ParseWorker] 解析已取消: {file_path}")
+                    return {"success": False, "error": "解析已取消", "cancelled": True}
+                if time.monotonic() >= deadline:
+                    self._kill()
+                    print(f"[ParseWorker] 解析超时({self.timeout}s): {file_path}")
+                    return {"success": False, "error": f"解析超时（超过 {self.timeout} 秒）"}
+                if self.max_rss_mb:
+                    rss = _get_rss_mb(self._proc.pid)
+                    if rss is not None and rss > self.max_rss_mb:
+                        self._kill()
+                        print(f"[ParseWorker] 内存超限({rss:.0f}MB > {self.max_rss_mb}MB): {file_path}")
+                        return {"success": False, "error": f"解析占用内存超过上限 {self.max_rss_mb}MB"}
+
+            self._tasks_done += 1
+            if self.max_tasks and self._tasks_done >= self.max_tasks:
+                self._retire()
+            return result
+        finally:
+            self._current_file = None
+            self._lock.release()
+
+    def cancel(self):
+        """取消正在进行的解析；没有进行中的解析时返回 False。"""
+        if self._current_file is None:
+            return False
+        self._cancel_event.set()
+        return True
+
+    def status(self):
+        proc = self._proc
+        return {
+            "alive": bool(proc is not None and proc.is_alive()),
+            "pid": proc.pid if proc is not None else None,
+            "busy": self._current_file is not None,
+            "current_file": self._current_file,
+            "tasks_done": self._tasks_done,
+            "max_tasks": self.max_tasks,
+            "restarts": self.restarts,
+        }
+
+    def shutdown(self):
+        with self._lock:
+            if self._proc is not None and self._proc.is_alive():
+                self._retire()
+            else:
+                self._kill()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+PPTX 快速读取模块
+只从 .pptx 压缩包中读取定位最后一页所需的 XML 部件，并以增量方式解析该页，
+避免 python-pptx 加载整个演示文稿（所有页面、版式、母版及媒体引用）。
+遇到任何无法确定的结构时抛出 FastPathUnsupported，由调用方回退到 python-pptx。
+"""
+
+import mmap
+import posixpath
+import time
+import zipfile
+import xml.etree.ElementTree as ET
+from contextlib import contextmanager
+
+_NS_P = "http://schemas.openxmlformats.org/presentationml/2006/main"
+_NS_A = "http://schemas.openxmlformats.org/drawingml/2006/main"
+_NS_R = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+_REL_OFFICE_DOCUMENT = "/officeDocument"
+
+_P_CSLD = f"{{{_NS_P}}}cSld"
+_P_SPTREE = f"{{{_NS_P}}}spTree"
+_P_SP = f"{{{_NS_P}}}sp"
+_P_TXBODY = f"{{{_NS_P}}}txBody"
+_P_SLDIDLST = f"{{{_NS_P}}}sldIdLst"
+_P_SLDID = f"{{{_NS_P}}}sldId"
+_A_P = f"{{{_NS_A}}}p"
+_A_R = f"{{{_NS_A}}}r"
+_A_FLD = f"{{{_NS_A}}}fld"
+_A_BR = f"{{{_NS_A}}}br"
+_A_T = f"{{{_NS_A}}}t"
+_R_ID = f"{{{_NS_R}}}id"
+_REL = f"{{{_NS_PKG_REL}}}Relationship"
+
+
+class FastPathUnsupported(Exception):
+    """快速路径无法处理该文件，应回退到 python-pptx。"""
+
+
+class _MappedFile:
+    """为 mmap 补齐 zipfile 需要的文件对象接口（旧版本 mmap 没有 seekable）。"""
+
+    def __init__(self, mm):
+        self._mm = mm
+
+    def read(self, size=-1):
+        return self._mm.read(size)
+
+    def seek(self, offset, whence=0):
+        self._mm.seek(offset, whence)
+        return self._mm.tell()
+
+    def tell(self):
+        return self._mm.tell()
+
+    def seekable(self):
+        return True
+
+
+@contextmanager
+def _open_package(file_path):
+    """以内存映射方式打开 .pptx 压缩包，只按需读取中央目录与目标部件。"""
+    try:
+        with open(file_path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, OSError) as e:
+        # 空文件无法映射；其余 IO 错误交由 python-pptx 给出原有的错误信息
+        raise FastPathUnsupported(f"无法映射文件: {e}")
+    try:
+        try:
+            zf = zipfile.ZipFile(_MappedFile(mm))
+        except zipfile.BadZipFile as e:
+            raise FastPathUnsupported(f"不是有效的 pptx 压缩包: {e}")
+        with zf:
+            yield zf
+    finally:
+        mm.close()
+
+
+def _rels_part_name(part_name):
+    directory, name = posixpath.split(part_name)
+    return posixpath.join(directory, "_rels", f"{name}.rels")
+
+
+def _resolve_target(source_part, target):
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return posixpath.normpath(posixpath.join(posixpath.dirname(source_part), target))
+
+
+def _read_rels(zf, part_name):
+    """读取部件的关系表，返回 {rId: (type, 目标部件名)}。"""
+    rels_name = _rels_part_name(part_name)
+    try:
+        data = zf.read(rels_name)
+    except KeyError:
+        raise FastPathUnsupported(f"缺少关系部件: {rels_name}")
+    rels = {}
+    for rel in ET.fromstring(data).iter(_REL):
+        if rel.get("TargetMode") == "External":
+            continue
+        rels[rel.get("Id")] = (rel.get("Type", ""), _resolve_target(part_name, rel.get("Target", "")))
+    return rels
+
+
+def _main_document_part(zf):
+    try:
+        data = zf.read("_rels/.rels")
+    except KeyError:
+        raise FastPathUnsupported("缺少包关系 _rels/.rels")
+    for rel in ET.fromstring(data).iter(_REL):
+        if rel.get("Type", "").endswith(_REL_OFFICE_DOCUMENT):
+            return rel.get("Target", "").lstrip("/")
+    raise FastPathUnsupported("未找到演示文稿主部件")
+
+
+def _slide_rids(zf, presentation_part):
+    """按放映顺序返回幻灯片关系 ID；读到 sldIdLst 结束即停止，不解析其余部分。"""
+    rids = []
+    try:
+        with zf.open(presentation_part) as f:
+            for event, elem in ET.iterparse(f, events=("end",)):
+                if elem.tag == _P_SLDID:
+                    rids.append(elem.get(_R_ID))
+                elif elem.tag == _P_SLDIDLST:
+                    break
+    except KeyError:
+        raise FastPathUnsupported(f"缺少部件: {presentation_part}")
+    return rids
+
+
+def _last_slide_part(zf):
+    presentation_part = _main_document_part(zf)
+    rids = _slide_rids(zf, presentation_part)
+    if not rids:
+        return None
+    rels = _read_rels(zf, presentation_part)
+    rel = rels.get(rids[-1])
+    if not rel or not rel[0].endswith("/slide"):
+        raise FastPathUnsupported(f"无法解析最后一页的关系: {rids[-1]}")
+    return rel[1]
+
+
+def _iter_shape_texts(stream):
+    """增量解析幻灯片 XML，按文档顺序产出顶层文本形状（p:sp）的文本。
+
+    与 python-pptx 的 shape.text 保持一致：段落以换行连接，段内换行符 a:br 记为垂直制表符。
+    """
+    stack = []
+    paragraphs = None
+    parts = None
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            stack.append(tag)
+            depth = len(stack)
+            if tag == _P_SP and depth == 4 and stack[1] == _P_CSLD and stack[2] == _P_SPTREE:
+                paragraphs = []
+            elif paragraphs is not None and tag == _A_P and depth == 6 and stack[4] == _P_TXBODY:
+                parts = []
+            continue
+
+        depth = len(stack)
+        stack.pop()
+        if paragraphs is None:
+            continue
+        if tag == _A_T and parts is not None and depth == 8 and stack[-1] in (_A_R, _A_FLD):
+            parts.append(elem.text or "")
+        elif tag == _A_BR and parts is not None and depth == 7:
+            parts.append("\v")
+        elif tag == _A_P and parts is not None and depth == 6:
+            paragraphs.append("".join(parts))
+            parts = None
+        elif tag == _P_SP and depth == 4:
+            yield "\n".join(paragraphs)
+            paragraphs = None
+            elem.clear()
+
+
+def read_last_slide_texts(file_path, timings=None):
+    """读取最后一页所有文本形状的文本列表；无幻灯片时返回空列表。
+
+    传入 timings 字典时记录各阶段耗时（毫秒）：open 为打开压缩包并定位最后一页，xml_parse 为解析该页。
+    """
+    started = time.perf_counter()
+    with _open_package(file_path) as zf:
+        slide_part = _last_slide_part(zf)
+        if slide_part is None:
+            return []
+        try:
+            stream = zf.open(slide_part)
+        except KeyError:
+            raise FastPathUnsupported(f"缺少幻灯片部件: {slide_part}")
+        opened = time.perf_counter()
+        with stream:
+            try:
+                texts = list(_iter_shape_texts(stream))
+            except ET.ParseError as e:
+                raise FastPathUnsupported(f"幻灯片 XML 解析失败: {e}")
+        if timings is not None:
+            timings["open"] = (opened - started) * 1000
+            timings["xml_parse"] = (time.perf_counter() - opened) * 1000
+        return texts
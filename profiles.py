@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+发送方案（班级）模块
+一位老师可能负责多个班级：每个方案有自己的作业PPT、发送目标（群）与发送时间表，
+由同一个调度器与同一个发送线程池执行，不必为每个班级各开一个程序。
+
+配置结构：顶层配置即默认方案（id 为 "default"），其余方案写在 profiles 列表中，例如
+    "profiles": [{"id": "class2", "name": "二班", "ppt_file_path": "...", "access_token": "...",
+                  "friday_send_time": "16:00"}]
+PPT、群与群名称只属于各自的方案，不从顶层继承；发送时间、节假日、调休与是否启用自动发送
+未单独设置时沿用顶层配置。
+"""
+
+import re
+
+DEFAULT_PROFILE_ID = "default"
+
+# 只属于各自方案的键（不从顶层继承，避免二班误发一班的作业）
+OWN_KEYS = ("ppt_file_path", "access_token", "access_token_name", "targets")
+# 未单独设置时沿用顶层配置的键
+INHERITED_KEYS = (
+    "auto_send_enabled", "auto_send_time", "weekday_send_time", "friday_send_time", "send_times",
+    "holidays", "makeup_workdays", "schedule_exceptions",
+)
+
+_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,32}$")
+
+
+class ProfileRegistry:
+    """按 id 管理全部发送方案；方案为普通字典（顶层配置中的相关键加上 id 与 name）"""
+
+    def __init__(self, profiles):
+        self._profiles = {p["id"]: p for p in profiles}
+
+    @classmethod
+    def from_config(cls, config):
+        """从配置构建方案列表；id 无效或重复的方案会被忽略并打印警告。"""
+        default = {key: config.get(key) for key in OWN_KEYS + INHERITED_KEYS if key in config}
+        default.update({"id": DEFAULT_PROFILE_ID, "name": config.get("profile_name") or "默认班级"})
+        profiles = [default]
+        seen = {DEFAULT_PROFILE_ID}
+        for i, item in enumerate(config.get("profiles") or []):
+            if not isinstance(item, dict):
+                continue
+            profile_id = str(item.get("id") or f"profile{i + 1}")
+            if not _ID_PATTERN.match(profile_id) or profile_id in seen:
+                print(f"[Profiles] 忽略 id 无效或重复的方案: {profile_id}")
+                continue
+            seen.add(profile_id)
+            profile = {key: config.get(key) for key in INHERITED_KEYS if key in config}
+            profile.update({key: item[key] for key in OWN_KEYS + INHERITED_KEYS if key in item})
+            profile.update({"id": profile_id, "name": item.get("name") or profile_id})
+            profiles.append(profile)
+        return cls(profiles)
+
+    def get(self, profile_id):
+        return self._profiles.get(profile_id or DEFAULT_PROFILE_ID)
+
+    def all(self):
+        return list(self._profiles.values())
+
+    def ids(self):
+        return list(self._profiles)
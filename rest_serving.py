@@ -0,0 +1,489 @@
+#!/usr/bin/env python3
+"""
+本地 REST 服务的运行后端
+原先 RestServer 直接调用 Flask 的 app.run()（Werkzeug 开发服务器），每个请求新开一个线程，
+不适合在托盘里连续运行数周。这里提供可替换的后端：
+
+    pooled    （默认）固定大小的工作线程池 + 有界等待队列，HTTP/1.1 keep-alive，
+              空闲连接由监听线程统一等待、超时关闭，不占用工作线程；队列满时直接返回 503；
+              SSE（text/event-stream）等长时间的流式响应交给数量有上限的独立流线程，不占用工作线程；
+              退出时停止接收新连接，关闭空闲连接并等待进行中的请求完成
+    werkzeug  原来的开发服务器（每请求一个线程），保留用于对比压测与排查问题
+
+由配置项 rest_backend 选择，rest_workers / rest_max_pending / rest_max_idle_connections /
+rest_keep_alive_seconds / rest_max_event_streams 调整参数。请求体大小限制由 rest_max_request_mb 设置（RestServer 同时设置
+Flask 的 MAX_CONTENT_LENGTH）。
+"""
+
+import io
+import selectors
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler, make_server
+
+BACKEND_POOLED = "pooled"
+BACKEND_WERKZEUG = "werkzeug"
+BACKENDS = (BACKEND_POOLED, BACKEND_WERKZEUG)
+
+_BUSY_BODY = '{"success": false, "error": "服务繁忙，请稍后重试"}'.encode("utf-8")
+_BUSY_RESPONSE = (b"HTTP/1.1 503 Service Unavailable\r\nContent-Type: application/json; charset=utf-8\r\n"
+                  b"Content-Length: " + str(len(_BUSY_BODY)).encode() + b"\r\nRetry-After: 1\r\n"
+                  b"Access-Control-Allow-Origin: *\r\nConnection: close\r\n\r\n" + _BUSY_BODY)
+
+
+class _PooledRequestHandler(WSGIRequestHandler):
+    """每次调度只处理一个请求的处理器。
+
+    Werkzeug 自带的处理器总是发送 Connection: close，并在响应后读掉套接字中剩余的数据，
+    无法复用连接。这里先把请求体完整读入内存（受 max_body_bytes 限制），响应按 Content-Length
+    或分块编码写出；响应完成后如连接可复用，交还服务端挂起等待下一个请求。
+    流式响应（text/event-stream）的响应体交给服务端的流线程写出（detached），工作线程立即返回。
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        # 套接字超时只约束“读完一个请求”的时间；连接空闲等待由服务端负责
+        self.timeout = self.server.request_timeout
+        super().setup()
+        # 响应头与响应体分两次写出，关闭 Nagle 算法，避免 keep-alive 连接上每个请求多等一个 ACK 延迟（约 40ms）
+        try:
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError:
+            pass
+        self.keep_open = False
+        self.detached = False
+
+    def handle(self):
+        try:
+            while True:
+                self.close_connection = True
+                self.handle_one_request()
+                # 客户端已连续发来下一个请求（缓冲区中有数据）时直接处理，否则交还服务端等待
+                if self.close_connection or not self._has_buffered_input():
+                    break
+        except (ConnectionError, socket.timeout) as e:
+            self.close_connection = True
+            self.connection_dropped(e)
+        self.keep_open = not self.close_connection and not self.server.draining
+
+    def _has_buffered_input(self):
+        self.connection.settimeout(0)
+        try:
+            return bool(self.rfile.peek(1))
+        except OSError:
+            return False
+        finally:
+            self.connection.settimeout(self.timeout)
+
+    def finish(self):
+        # 已交给流线程的连接由流线程负责关闭
+        if not self.keep_open and not self.detached:
+            super().finish()
+
+    def close(self):
+        self.keep_open = False
+        try:
+            super().finish()
+        except OSError:
+            pass
+
+    def run_wsgi(self):
+        if not self.server.can_keep_alive():
+            self.close_connection = True
+        length = self.headers.get("Content-Length")
+        chunked = "chunked" in self.headers.get("Transfer-Encoding", "").lower()
+        if chunked or (length and (not length.isdigit() or int(length) > self.server.max_body_bytes)):
+            # 分块上传或超过大小限制：交给 Werkzeug 原实现处理（返回错误等），响应后关闭连接
+            self.close_connection = True
+            super().run_wsgi()
+            return
+        self._run_wsgi_keep_alive(int(length or 0))
+
+    def _run_wsgi_keep_alive(self, length):
+        if self.headers.get("Expect", "").lower().strip(" \t") == "100-continue":
+            self.wfile.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+        environ = self.make_environ()
+        environ["wsgi.input"] = io.BytesIO(self.rfile.read(length) if length else b"")
+        state = {"status": None, "headers": None, "sent": False, "chunked": False}
+
+        def write(data):
+            if not state["sent"]:
+                code, _, msg = state["status"].partition(" ")
+                code = int(code)
+                self.send_response(code, msg)
+                keys = set()
+                for key, value in state["headers"]:
+                    self.send_header(key, value)
+                    keys.add(key.lower())
+                state["chunked"] = not ("content-length" in keys or environ["REQUEST_METHOD"] == "HEAD"
+                                        or 100 <= code < 200 or code in (204, 304))
+                if state["chunked"]:
+                    self.send_header("Transfer-Encoding", "chunked")
+                if self.close_connection:
+                    self.send_header("Connection", "close")
+                self.end_headers()
+                state["sent"] = True
+            if data:
+                if state["chunked"]:
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                else:
+                    self.wfile.write(data)
+            # 逐块刷新，SSE 等流式响应才能及时送达
+            self.wfile.flush()
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info:
+                try:
+                    if state["sent"]:
+                        raise exc_info[1].with_traceback(exc_info[2])
+                finally:
+                    exc_info = None
+            state["status"], state["headers"] = status, headers
+            return write
+
+        application_iter = self.server.app(environ, start_response)
+        if state["headers"] is not None and _is_event_stream(state["headers"]):
+            # 流式响应可能持续数小时：交给流线程写出，工作线程立即回到线程池
+            self.close_connection = True
+            # 先标记再启动：流线程可能在本函数返回前就结束并关闭连接
+            self.detached = True
+            if self.server.start_stream(self, lambda: self._write_body(application_iter, write, state)):
+                return
+            self.detached = False
+            # 流线程已满：直接返回 503，不让长连接占住工作线程
+            if hasattr(application_iter, "close"):
+                application_iter.close()
+            self.server.stats["rejected"] += 1
+            self.wfile.write(_BUSY_RESPONSE)
+            return
+        self._write_body(application_iter, write, state)
+
+    def _write_body(self, application_iter, write, state):
+        try:
+            for data in application_iter:
+                write(data)
+            if not state["sent"]:
+                write(b"")
+            if state["chunked"]:
+                self.wfile.write(b"0\r\n\r\n")
+        except (ConnectionError, socket.timeout):
+            raise
+        except Exception as e:
+            # Flask 已把视图异常转换为 500 响应；走到这里说明响应已开始发送，只能关闭连接
+            self.close_connection = True
+            self.log_error("Error on request %s: %r", self.path, e)
+        finally:
+            if hasattr(application_iter, "close"):
+                application_iter.close()
+
+    def log_request(self, code="-", size="-"):
+        # 界面每秒可能有多个请求，逐条打印访问日志反而拖慢服务；只记录服务端错误
+        if str(code).startswith("5"):
+            super().log_request(code, size)
+
+    def log_error(self, format, *args):
+        # 读取请求超时按连接断开处理，不打印
+        if format.startswith("Request timed out"):
+            return
+        super().log_error(format, *args)
+
+
+def _is_event_stream(headers):
+    for key, value in headers:
+        if key.lower() == "content-type":
+            return value.split(";", 1)[0].strip().lower() == "text/event-stream"
+    return False
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """固定线程池的 WSGI 服务。
+
+    监听线程用 selector 同时等待新连接与空闲的 keep-alive 连接，连接上有请求到达时才交给线程池；
+    最多 max_workers 个请求并发处理，另有 max_pending 个排队，超出时对新连接立即返回 503，
+    不会因突发请求无限制地创建线程，空闲连接也不占用工作线程。
+    SSE 流在响应头确定后转到独立的流线程（最多 max_streams 个，超出返回 503），不占用工作线程。
+    """
+
+    multithread = True
+
+    def __init__(self, host, port, app, max_workers=8, max_pending=32, max_idle=32, keep_alive_seconds=15.0,
+                 request_timeout=10.0, max_body_bytes=2 * 1024 * 1024, max_streams=4):
+        self.max_workers = max(1, int(max_workers))
+        self.max_streams = max(0, int(max_streams))
+        self.max_pending = max(0, int(max_pending))
+        self.max_idle = max(0, int(max_idle))
+        self.keep_alive_seconds = keep_alive_seconds
+        self.request_timeout = request_timeout
+        self.max_body_bytes = max_body_bytes
+        self.draining = False
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="RESTWorker")
+        self._lock = threading.Condition()
+        self._active = 0
+        self._streams = 0
+        self._idle = {}
+        self._to_park = []
+        self._stop = threading.Event()
+        self._stopped = threading.Event()
+        self._serving = False
+        self._closing = False
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self.stats = {"accepted": 0, "rejected": 0, "reused": 0, "idle_closed": 0}
+        super().__init__(host, port, app, handler=_PooledRequestHandler)
+
+    def can_keep_alive(self):
+        with self._lock:
+            return not self.draining and len(self._idle) + len(self._to_park) < self.max_idle
+
+    def serve_forever(self, poll_interval=0.1):
+        self._serving = True
+        selector = selectors.DefaultSelector()
+        selector.register(self.socket, selectors.EVENT_READ, "accept")
+        selector.register(self._wake_r, selectors.EVENT_READ, "wake")
+        try:
+            while not self._stop.is_set():
+                for key, _ in selector.select(poll_interval):
+                    if key.data == "accept":
+                        self._handle_request_noblock()
+                    elif key.data == "wake":
+                        try:
+                            while self._wake_r.recv(512):
+                                pass
+                        except OSError:
+                            pass
+                    else:
+                        selector.unregister(key.fileobj)
+                        with self._lock:
+                            self._idle.pop(key.data, None)
+                        self.stats["reused"] += 1
+                        self._dispatch(key.data.request, key.data.client_address, key.data)
+                self._register_parked(selector)
+                self._expire_idle(selector)
+        finally:
+            with self._lock:
+                self._closing = True
+                idle = list(self._idle) + self._to_park
+                self._idle.clear()
+                self._to_park = []
+            for handler in idle:
+                self._close_handler(handler)
+            selector.close()
+            self.server_close()
+            self._stopped.set()
+
+    def _register_parked(self, selector):
+        with self._lock:
+            parked, self._to_park = self._to_park, []
+            now = time.monotonic()
+            for handler in parked:
+                self._idle[handler] = now
+        for handler in parked:
+            try:
+                selector.register(handler.connection, selectors.EVENT_READ, handler)
+            except (ValueError, OSError):
+                with self._lock:
+                    self._idle.pop(handler, None)
+                self._close_handler(handler)
+
+    def _expire_idle(self, selector):
+        deadline = time.monotonic() - self.keep_alive_seconds
+        with self._lock:
+            expired = [h for h, since in self._idle.items() if since < deadline]
+            for handler in expired:
+                del self._idle[handler]
+        for handler in expired:
+            try:
+                selector.unregister(handler.connection)
+            except (KeyError, ValueError, OSError):
+                pass
+            self.stats["idle_closed"] += 1
+            self._close_handler(handler)
+
+    def process_request(self, request, client_address):
+        with self._lock:
+            busy = self.draining or self._active >= self.max_workers + self.max_pending
+        if busy:
+            self.stats["rejected"] += 1
+            try:
+                request.sendall(_BUSY_RESPONSE)
+            except OSError:
+                pass
+            self.shutdown_request(request)
+            return
+        self.stats["accepted"] += 1
+        self._dispatch(request, client_address, None)
+
+    def _dispatch(self, request, client_address, handler):
+        with self._lock:
+            self._active += 1
+        try:
+            self._pool.submit(self._serve, request, client_address, handler)
+        except RuntimeError:
+            # 线程池已关闭（正在退出）
+            self._done()
+            self.shutdown_request(request)
+
+    def _serve(self, request, client_address, handler):
+        try:
+            if handler is None:
+                # 构造时依次执行 setup / handle / finish
+                handler = self.RequestHandlerClass(request, client_address, self)
+            else:
+                handler.handle()
+                handler.finish()
+        except Exception:
+            self.handle_error(request, client_address)
+            if handler is not None:
+                handler.keep_open = False
+        finally:
+            if handler is not None and handler.detached:
+                # 连接已交给流线程
+                self._done()
+                return
+            parked = False
+            if handler is not None and handler.keep_open:
+                with self._lock:
+                    if not self._closing:
+                        self._to_park.append(handler)
+                        parked = True
+            if parked:
+                self._wake()
+            else:
+                if handler is not None:
+                    handler.close()
+                self.shutdown_request(request)
+            self._done()
+
+    def start_stream(self, handler, write_body):
+        """在独立的流线程中写出流式响应；流线程已满或正在退出时返回 False"""
+        with self._lock:
+            if self.draining or self._streams >= self.max_streams:
+                return False
+            self._streams += 1
+        threading.Thread(target=self._run_stream, args=(handler, write_body),
+                         name="RESTStream", daemon=True).start()
+        return True
+
+    def _run_stream(self, handler, write_body):
+        try:
+            write_body()
+        except (ConnectionError, socket.timeout, OSError):
+            # 客户端已断开
+            pass
+        except Exception:
+            self.handle_error(handler.request, handler.client_address)
+        finally:
+            try:
+                self._close_handler(handler)
+            finally:
+                with self._lock:
+                    self._streams -= 1
+                    self._lock.notify_all()
+
+    def _close_handler(self, handler):
+        handler.close()
+        self.shutdown_request(handler.request)
+
+    def _done(self):
+        with self._lock:
+            self._active -= 1
+            self._lock.notify_all()
+
+    def _wake(self):
+        try:
+            self._wake_w.send(b"\0")
+        except OSError:
+            pass
+
+    def shutdown(self):
+        self._stop.set()
+        self._wake()
+        if self._serving:
+            self._stopped.wait()
+
+    def server_close(self):
+        super().server_close()
+        for sock in (self._wake_r, self._wake_w):
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    def drain(self, timeout=5.0):
+        """停止接收新连接并关闭空闲连接，最多等待 timeout 秒让进行中的请求与流式响应完成。
+
+        返回是否在超时前全部完成。"""
+        with self._lock:
+            self.draining = True
+        self.shutdown()
+        deadline = time.monotonic() + max(0.0, timeout)
+        with self._lock:
+            while self._active > 0 or self._streams > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._lock.wait(remaining)
+            drained = self._active == 0 and self._streams == 0
+        self._pool.shutdown(wait=False)
+        return drained
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "backend": BACKEND_POOLED,
+                "workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "max_idle": self.max_idle,
+                "keep_alive_seconds": self.keep_alive_seconds,
+                "active": self._active,
+                "idle": len(self._idle),
+                "max_streams": self.max_streams,
+                "streams": self._streams,
+                "draining": self.draining,
+                **self.stats,
+            }
+
+
+class _DevServerBackend:
+    """Werkzeug 开发服务器（每个请求一个线程），行为与原来的 app.run() 相同"""
+
+    def __init__(self, host, port, app):
+        self._server = make_server(host, port, app, threaded=True)
+        self.port = self._server.port
+        self.draining = False
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def drain(self, timeout=5.0):
+        # 开发服务器不跟踪进行中的请求，只能停止接收新连接
+        self.draining = True
+        self._server.shutdown()
+        return True
+
+    def snapshot(self):
+        return {"backend": BACKEND_WERKZEUG, "draining": self.draining}
+
+
+def create_backend(app, host, port, config=None):
+    """按配置创建服务后端；返回的对象提供 port、serve_forever()、drain(timeout) 与 snapshot()"""
+    config = config or {}
+    name = str(config.get("rest_backend", BACKEND_POOLED)).lower()
+    if name not in BACKENDS:
+        print(f"[REST] 未知的服务后端 {name}，使用 {BACKEND_POOLED}")
+        name = BACKEND_POOLED
+    if name == BACKEND_WERKZEUG:
+        return _DevServerBackend(host, port, app)
+    return PooledWSGIServer(
+        host, port, app,
+        max_workers=int(config.get("rest_workers", 8)),
+        max_pending=int(config.get("rest_max_pending", 32)),
+        max_idle=int(config.get("rest_max_idle_connections", 32)),
+        keep_alive_seconds=float(config.get("rest_keep_alive_seconds", 15)),
+        max_body_bytes=int(float(config.get("rest_max_request_mb", 2)) * 1024 * 1024),
+        max_streams=int(config.get("rest_max_event_streams", 4)),
+    )
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+定时发送运行记录模块
+每一次定时发送（包括错过后补发与跳过）写入 AppData 下的 SQLite（WAL 模式）：计划时间、实际开始时间、
+耗时、发送目标、结果与错误类别。按计划时间建索引，支持按时间查询、统计成功率与延迟分位数，
+超过保留期的记录自动清理，便于跨一个学期、多台电脑核对作业是否按时发出。
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+OUTCOME_SENT = "sent"
+OUTCOME_QUEUED = "queued"
+OUTCOME_FAILED = "failed"
+OUTCOME_SKIPPED = "skipped"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    profile_id TEXT NOT NULL,
+    scheduled_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    duration_ms REAL,
+    lateness_ms REAL,
+    targets TEXT,
+    outcome TEXT NOT NULL,
+    error_class TEXT,
+    error TEXT,
+    job_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_scheduled ON runs(scheduled_at);
+CREATE INDEX IF NOT EXISTS idx_runs_profile ON runs(profile_id, scheduled_at);
+"""
+
+
+def classify_error(result):
+    """把发送结果归类为便于统计的错误类别；成功返回 None"""
+    if result.get("success"):
+        return None
+    if result.get("skipped"):
+        return "missed"
+    if result.get("queued"):
+        return "network"
+    error = str(result.get("error") or "")
+    if "ACCESS_TOKEN" in error or "PPT文件路径" in error or "作业内容为空" in error:
+        return "config"
+    if "解析" in error:
+        return "parse"
+    if "超时" in error or "timed out" in error.lower() or "timeout" in error.lower():
+        return "timeout"
+    if "频繁" in error or "过多" in error:
+        return "rate_limit"
+    if "发送失败:" in error or "errcode" in error:
+        return "dingtalk"
+    if "连接" in error or "Connection" in error or "网络" in error:
+        return "network"
+    return "error"
+
+
+def parse_since(value):
+    """解析查询参数 since：Unix 时间戳、"YYYY-MM-DD" 或 "YYYY-MM-DD HH:MM[:SS]"；无法解析时返回 None"""
+    if value in (None, ""):
+        return None
+    text = str(value).strip()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(text, fmt).timestamp()
+        except ValueError:
+            continue
+    return None
+
+
+def _percentile(ordered, pct):
+    if not ordered:
+        return None
+    k = (len(ordered) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return round(ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo), 2)
+
+
+def _fmt(ts):
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S") if ts else None
+
+
+class RunHistory:
+    """基于 SQLite 的定时发送运行记录"""
+
+    def __init__(self, db_path, retention_days=400):
+        self.db_path = db_path
+        # 默认保留一年多，足以覆盖两个学期
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+        # 各方案最近一条记录（按计划时间）保存在内存中，状态接口读取时不访问数据库
+        self._last = {}
+        self._load_last()
+
+    def _load_last(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM runs r WHERE id = (SELECT id FROM runs WHERE profile_id = r.profile_id "
+                "ORDER BY scheduled_at DESC, id DESC LIMIT 1)").fetchall()
+            self._last = {row["profile_id"]: self._row_to_dict(row) for row in rows}
+
+    def record(self, profile_id, scheduled, outcome, started=None, finished=None, targets=None,
+               error_class=None, error=None, job_id=None):
+        """写入一次运行记录；scheduled/started/finished 为 datetime 或时间戳"""
+        def _ts(value):
+            if value is None:
+                return None
+            return value.timestamp() if isinstance(value, datetime) else float(value)
+
+        scheduled_ts, started_ts, finished_ts = _ts(scheduled), _ts(started), _ts(finished)
+        duration_ms = (finished_ts - started_ts) * 1000 if started_ts and finished_ts else None
+        lateness_ms = (started_ts - scheduled_ts) * 1000 if started_ts else None
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO runs (profile_id, scheduled_at, started_at, finished_at, duration_ms, lateness_ms, "
+                "targets, outcome, error_class, error, job_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (profile_id, scheduled_ts, started_ts, finished_ts, duration_ms, lateness_ms,
+                 json.dumps(targets or [], ensure_ascii=False), outcome, error_class,
+                 (error or "")[:500] or None, job_id),
+            )
+            row = self._conn.execute("SELECT * FROM runs WHERE id = ?", (cur.lastrowid,)).fetchone()
+            last = self._last.get(profile_id)
+            # 补发时可能先写入更早计划时刻的跳过记录，最近一条仍按计划时间判断
+            if last is None or scheduled_ts >= last["_scheduled_ts"]:
+                self._last[profile_id] = self._row_to_dict(row)
+
+    def purge(self):
+        """清理超过保留期的记录，返回删除条数"""
+        cutoff = time.time() - self.retention_days * 86400
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM runs WHERE scheduled_at < ?", (cutoff,))
+        if cur.rowcount:
+            self._load_last()
+        return cur.rowcount
+
+    @staticmethod
+    def _where(since, profile_id):
+        clauses, args = [], []
+        if since is not None:
+            clauses.append("scheduled_at >= ?")
+            args.append(since)
+        if profile_id:
+            clauses.append("profile_id = ?")
+            args.append(profile_id)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+    def query(self, since=None, limit=100, profile_id=None):
+        """按计划时间倒序返回运行记录（since 为时间戳，只返回其后的记录）"""
+        where, args = self._where(since, profile_id)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM runs{where} ORDER BY scheduled_at DESC, id DESC LIMIT ?",
+                args + [max(1, int(limit))]).fetchall()
+        runs = []
+        for row in rows:
+            item = self._row_to_dict(row)
+            item.pop("_scheduled_ts")
+            runs.append(item)
+        return runs
+
+    @staticmethod
+    def _row_to_dict(row):
+        item = dict(row)
+        item["_scheduled_ts"] = item["scheduled_at"]
+        item["targets"] = json.loads(item["targets"] or "[]")
+        for key in ("scheduled_at", "started_at", "finished_at"):
+            item[key] = _fmt(item[key])
+        for key in ("duration_ms", "lateness_ms"):
+            if item[key] is not None:
+                item[key] = round(item[key], 2)
+        return item
+
+    def last(self, profile_id):
+        """方案最近一条记录（内存中保存，不访问数据库）"""
+        last = self._last.get(profile_id)
+        if last is None:
+            return None
+        item = dict(last)
+        item.pop("_scheduled_ts")
+        return item
+
+    def stats(self, since=None, profile_id=None):
+        """成功率（送达或已入队补发视为成功）、各结果计数与延迟/耗时分位数"""
+        where, args = self._where(since, profile_id)
+        with self._lock:
+            counts = {r["outcome"]: r["n"] for r in self._conn.execute(
+                f"SELECT outcome, COUNT(*) AS n FROM runs{where} GROUP BY outcome", args)}
+            errors = {r["error_class"]: r["n"] for r in self._conn.execute(
+                f"SELECT error_class, COUNT(*) AS n FROM runs{where} "
+                f"{'AND' if where else 'WHERE'} error_class IS NOT NULL GROUP BY error_class", args)}
+            lateness = [r[0] for r in self._conn.execute(
+                f"SELECT lateness_ms FROM runs{where} {'AND' if where else 'WHERE'} lateness_ms IS NOT NULL "
+                f"ORDER BY lateness_ms", args)]
+            durations = [r[0] for r in self._conn.execute(
+                f"SELECT duration_ms FROM runs{where} {'AND' if where else 'WHERE'} duration_ms IS NOT NULL "
+                f"ORDER BY duration_ms", args)]
+        total = sum(counts.values())
+        delivered = counts.get(OUTCOME_SENT, 0) + counts.get(OUTCOME_QUEUED, 0)
+        return {
+            "total": total,
+            "outcomes": {o: counts.get(o, 0) for o in (OUTCOME_SENT, OUTCOME_QUEUED, OUTCOME_FAILED, OUTCOME_SKIPPED)},
+            "error_classes": errors,
+            "success_rate": round(delivered / total, 4) if total else None,
+            "lateness_ms": {f"p{p}": _percentile(lateness, p) for p in (50, 95, 99)},
+            "duration_ms": {f"p{p}": _percentile(durations, p) for p in (50, 95, 99)},
+        }
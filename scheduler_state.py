@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+调度状态持久化模块
+记录最近一次完成（发送、失败或跳过）的计划时刻与下一次应触发的时刻，保存在 AppData 下的
+scheduler_state.json。程序重启或电脑睡眠唤醒后据此判断是否错过了发送，并避免同一计划时刻重复发送。
+每一次补发/跳过的决定也保存在这里（最近若干条），便于事后排查。
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+
+_TIME_FMT = "%Y-%m-%d %H:%M:%S"
+
+
+def _fmt(value):
+    return value.strftime(_TIME_FMT) if value else None
+
+
+def _parse(value):
+    try:
+        return datetime.strptime(value, _TIME_FMT) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+class SchedulerState:
+    """调度状态：last_due（最近处理完的计划时刻）、next_due（下一次计划时刻）与最近的决定记录"""
+
+    def __init__(self, path, keep_decisions=50):
+        self.path = path
+        self.keep_decisions = keep_decisions
+        self._lock = threading.Lock()
+        self._data = {"last_due": None, "last_result": None, "last_finished_at": None,
+                      "next_due": None, "decisions": []}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self._data.update(data)
+        except Exception as e:
+            print(f"[Scheduler] 读取调度状态失败，按首次运行处理: {e}")
+
+    def _save_locked(self):
+        # 先写临时文件再替换，断电或崩溃时不会留下半个文件
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"[Scheduler] 保存调度状态失败: {e}")
+
+    @property
+    def last_due(self):
+        with self._lock:
+            return _parse(self._data.get("last_due"))
+
+    @property
+    def next_due(self):
+        with self._lock:
+            return _parse(self._data.get("next_due"))
+
+    def is_handled(self, due):
+        """该计划时刻是否已处理过（时钟回拨或重复触发时不再发送）"""
+        last_due = self.last_due
+        return last_due is not None and due <= last_due
+
+    def set_next_due(self, due):
+        with self._lock:
+            if self._data.get("next_due") == _fmt(due):
+                return
+            self._data["next_due"] = _fmt(due)
+            self._save_locked()
+
+    def mark_done(self, due, result, next_due=None):
+        """记录计划时刻 due 的处理结果（sent/failed/queued/skipped）"""
+        with self._lock:
+            last_due = _parse(self._data.get("last_due"))
+            if last_due is None or due > last_due:
+                self._data["last_due"] = _fmt(due)
+                self._data["last_result"] = result
+                self._data["last_finished_at"] = _fmt(datetime.now())
+            if next_due is not None:
+                self._data["next_due"] = _fmt(next_due)
+            self._save_locked()
+
+    def log_decision(self, action, reason, due=None, **extra):
+        """记录一次调度决定并打印日志"""
+        entry = {"at": _fmt(datetime.now()), "action": action, "due": _fmt(due), "reason": reason, **extra}
+        print(f"[Scheduler] 决定: {action}（计划 {entry['due'] or '-'}）{reason}")
+        with self._lock:
+            decisions = self._data.setdefault("decisions", [])
+            decisions.append(entry)
+            del decisions[:max(0, len(decisions) - self.keep_decisions)]
+            self._save_locked()
+        return entry
+
+    def snapshot(self, decisions=10):
+        with self._lock:
+            data = dict(self._data)
+            data["decisions"] = list(self._data.get("decisions") or [])[-decisions:][::-1]
+        return data
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+只读接口的响应快照
+配置、调度状态、开机启动状态与作业预览每次请求都要重新计算并序列化 JSON（开机启动状态还要读注册表）。
+这里按资源缓存序列化好的响应体，并以内容哈希作为强 ETag：界面带 If-None-Match 请求时直接返回 304。
+
+快照只在数据确实变化时重建：
+    - 显式失效：invalidate(resource)，例如保存配置、重新应用调度时
+    - 版本键：key 参数随数据版本变化（如调度任务版本号、PPT 文件的修改时间与大小），键变了即视为新快照
+    - ttl：用于无法得到变化通知的数据（如在程序外修改的注册表），作为兜底
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class Snapshot:
+    """一份序列化好的响应"""
+
+    __slots__ = ("resource", "key", "body", "etag", "created", "expires")
+
+    def __init__(self, resource, key, body, ttl=None):
+        self.resource = resource
+        self.key = key
+        self.body = body
+        self.etag = hashlib.sha1(body).hexdigest()[:24]
+        self.created = time.monotonic()
+        self.expires = self.created + ttl if ttl else None
+
+    def fresh(self, now):
+        return self.expires is None or now < self.expires
+
+
+class SnapshotCache:
+    """按资源保存响应快照；dumps 为 JSON 序列化函数（与接口原来的输出保持一致）"""
+
+    def __init__(self, dumps, max_per_resource=4):
+        self._dumps = dumps
+        self.max_per_resource = max_per_resource
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._generations = {}
+        self.stats = {"hits": 0, "misses": 0, "not_modified": 0, "invalidations": 0}
+
+    def get(self, resource, build, key=None, ttl=None):
+        """返回资源的快照；没有可用快照时调用 build() 生成数据并序列化。
+
+        build() 返回 success 为 False 的结果时不缓存，下次请求重新计算。
+        """
+        now = time.monotonic()
+        with self._lock:
+            entries = self._entries.get(resource)
+            snapshot = entries.get(key) if entries else None
+            if snapshot is not None and snapshot.fresh(now):
+                self.stats["hits"] += 1
+                return snapshot
+            generation = self._generations.get(resource, 0)
+        data = build()
+        body = self._dumps(data)
+        snapshot = Snapshot(resource, key, body.encode("utf-8") if isinstance(body, str) else body, ttl)
+        with self._lock:
+            self.stats["misses"] += 1
+            # 生成期间资源被失效过则不保存，避免把旧数据存成新快照
+            if self._generations.get(resource, 0) == generation and not (
+                    isinstance(data, dict) and data.get("success") is False):
+                entries = self._entries.setdefault(resource, OrderedDict())
+                entries[key] = snapshot
+                entries.move_to_end(key)
+                while len(entries) > self.max_per_resource:
+                    entries.popitem(last=False)
+        return snapshot
+
+    def invalidate(self, *resources):
+        with self._lock:
+            for resource in resources:
+                self._entries.pop(resource, None)
+                self._generations[resource] = self._generations.get(resource, 0) + 1
+            self.stats["invalidations"] += 1
+
+    def count_not_modified(self):
+        with self._lock:
+            self.stats["not_modified"] += 1
+
+    def snapshot_stats(self):
+        with self._lock:
+            return {**self.stats, "resources": {r: len(e) for r, e in self._entries.items()}}
@@ -11,33 +11,68 @@ function checkApiAvailable() {
     return true;
 }
 
-// 等待API就绪
+// 等待API就绪：REST 使用固定端口，地址总是立即可用，无需轮询等待
 function waitForApi(timeout = 5000) {
-    return new Promise((resolve, reject) => {
-        const startTime = Date.now();
-        let checkCount = 0;
-        
-        function check() {
-            checkCount++;
-            const elapsed = Date.now() - startTime;
-            
-            if (checkCount % 10 === 0) { // 每1秒打印一次状态
-                console.log(`[waitForApi] 第${checkCount}次检查 (${elapsed}ms), REST:`, window.__API_BASE__, 'pywebview:', typeof pywebview !== 'undefined' ? 'defined' : 'undefined');
+    return checkApiAvailable() ? Promise.resolve(true) : Promise.reject(new Error('API 等待超时'));
+}
+
+// 事件推送（Server-Sent Events）：调度状态、发送任务、更新下载进度与配置变更
+let __eventSource = null;
+let __eventsConnected = false;
+let __statusPollTimer = null;
+
+function subscribeEvents() {
+    if (__eventSource) return;
+    if (typeof EventSource === 'undefined') {
+        // 不支持 EventSource 时退回定时查询调度状态
+        console.warn('[Events] 不支持 EventSource，改为定时查询状态');
+        if (!__statusPollTimer) __statusPollTimer = setInterval(checkSchedulerStatus, 30000);
+        return;
+    }
+    checkApiAvailable();
+    __eventSource = new EventSource(`${window.__API_BASE__}/api/events`);
+    __eventSource.onopen = () => {
+        __eventsConnected = true;
+        if (__statusPollTimer) { clearInterval(__statusPollTimer); __statusPollTimer = null; }
+        console.log('[Events] 已连接');
+    };
+    // 连接断开时 EventSource 会按服务端给出的 retry 间隔自动重连（并带上 Last-Event-ID）
+    __eventSource.onerror = () => {
+        __eventsConnected = false;
+        if (__eventSource && __eventSource.readyState === EventSource.CLOSED) {
+            // 服务端拒绝（如推送连接数已达上限返回 503）时不会自动重连：暂时定时查询，稍后重新订阅
+            console.warn('[Events] 连接被拒绝，改为定时查询状态，30 秒后重试');
+            __eventSource = null;
+            if (!__statusPollTimer) __statusPollTimer = setInterval(checkSchedulerStatus, 30000);
+            setTimeout(subscribeEvents, 30000);
+        }
+    };
+    __eventSource.addEventListener('scheduler', (e) => {
+        try { updateSchedulerStatus(JSON.parse(e.data)); } catch (err) { console.warn('[Events] scheduler', err); }
+    });
+    __eventSource.addEventListener('update', (e) => {
+        try { renderUpdateProgress(JSON.parse(e.data)); } catch (err) { console.warn('[Events] update', err); }
+    });
+    __eventSource.addEventListener('config', (e) => {
+        // 其他入口（托盘、REST）修改了配置：设置窗口未打开时同步界面
+        try {
+            const modal = document.getElementById('settings-modal');
+            if (!modal || !modal.classList.contains('active')) {
+                lastLoadedConfig = { ...JSON.parse(e.data) };
             }
-            
-            if (checkApiAvailable()) {
-                console.log(`[waitForApi] API 可用！用时 ${elapsed}ms`);
-                resolve(true);
-            } else if (elapsed > timeout) {
-                console.error(`[waitForApi] API 等待超时 ${elapsed}ms`);
-                reject(new Error('API 等待超时'));
-            } else {
-                setTimeout(check, 100);
+        } catch (err) { console.warn('[Events] config', err); }
+    });
+    __eventSource.addEventListener('job', (e) => {
+        try {
+            const job = JSON.parse(e.data);
+            // 定时发送完成时即时提示（界面发起的发送由 waitForSendJob 处理）
+            if (job.status === 'done' && String(job.source || '').startsWith('scheduler')) {
+                const r = job.result || {};
+                if (r.success) showSuccess('定时发送成功');
+                else if (r.queued) showError('定时发送暂未送达，恢复网络后将自动补发');
+                else showError('定时发送失败: ' + (r.error || '未知错误'));
             }
-        }
-        
-        console.log('[waitForApi] 开始等待 API，超时时间:', timeout + 'ms');
-        check();
+        } catch (err) { console.warn('[Events] job', err); }
     });
 }
 
@@ -103,10 +138,10 @@ document.addEventListener('DOMContentLoaded', function() {
         window.__API_BASE__ = window.__API_BASE__ || 'http://127.0.0.1:58701';
         console.log('API 已准备就绪', window.__API_BASE__);
         debugApiStatus();
-        loadSettings();
-        initTheme();
-        checkSchedulerStatus();
-        setInterval(checkSchedulerStatus, 30000);
+        // 首屏状态一次请求取回；失败时回退为逐个加载
+        loadStartupState();
+        // 之后的状态变化由服务端推送
+        subscribeEvents();
     }
     
     // 绑定主按钮（兜底绑定）
@@ -160,7 +195,7 @@ document.addEventListener('DOMContentLoaded', function() {
 
     // 兜底：无论是否就绪，1秒后先刷新一次状态，避免一直停留在“检查中”
     setTimeout(() => {
-        try { checkSchedulerStatus(); } catch (e) { console.log('兜底状态刷新失败', e); }
+        try { if (!window.__bootstrap) checkSchedulerStatus(); } catch (e) { console.log('兜底状态刷新失败', e); }
         // 再次兜底绑定一次按钮（防止DOM晚渲染或被替换）
         try { bindMainButton(); } catch (e) { console.log('兜底按钮绑定失败', e); }
     }, 1000);
@@ -278,19 +313,28 @@ function cancelUpdateDownload(){
     showSuccess('已取消下载');
 }
 
+function renderUpdateProgress(s){
+    if(!s || s.success === false) return null;
+    const stage = s.stage || 'downloading';
+    // 未在下载（如启动时收到的保留状态）时不弹出进度
+    const m = document.getElementById('update-progress-modal');
+    if(stage === 'idle' || !m || !m.classList.contains('active')) return stage;
+    const pct = Number(s.percent || 0);
+    const host = (s.source || '').split('/')[2] || '';
+    const text = stage === 'downloading' ? `正在下载 ${host} (${pct}%)` : (stage === 'installing' ? '正在安装/解压...' : '准备中...');
+    console.log('[Update][progress]', stage, pct + '%', 'from', host);
+    updateProgress(pct, text);
+    return stage;
+}
+
 function startUpdateProgressPolling(){
     if(__updatePollTimer) clearInterval(__updatePollTimer);
+    // 已订阅事件推送时，下载进度由 'update' 事件驱动
+    if(__eventsConnected) return;
     __updatePollTimer = setInterval(async ()=>{
         try{
             const r = await fetch(`${window.__API_BASE__}/api/update/progress`, { cache: 'no-store' });
-            const s = await r.json();
-            if(!s || s.success === false) return;
-            const stage = s.stage || 'downloading';
-            const pct = Number(s.percent || 0);
-            const host = (s.source || '').split('/')[2] || '';
-            const text = stage === 'downloading' ? `正在下载 ${host} (${pct}%)` : (stage === 'installing' ? '正在安装/解压...' : '准备中...');
-            console.log('[Update][polling]', stage, pct + '%', 'from', host);
-            updateProgress(pct, text);
+            const stage = renderUpdateProgress(await r.json());
             // 只有在安装阶段才停止轮询，避免 idle 状态提前停止
             if(stage === 'installing'){
                 clearInterval(__updatePollTimer); __updatePollTimer=null;
@@ -303,9 +347,8 @@ function startUpdateProgressPolling(){
 window.addEventListener('pywebviewready', function() {
     console.log('pywebviewready 事件触发');
     try {
-        loadSettings();
-        initTheme();
-        checkSchedulerStatus();
+        // 与 DOMContentLoaded 共用同一次首屏加载，不再重复请求
+        loadStartupState();
         bindMainButton();
     } catch (e) { console.log('pywebviewready 初始化失败', e); }
 });
@@ -368,6 +411,11 @@ function updateInteractiveBackground() {
     });
 }
 
+// 预览走 GET：服务端按文件修改时间缓存并返回 ETag，文件未变时浏览器重新验证只得到 304
+function previewUrl(filePath) {
+    return `${window.__API_BASE__}/api/preview_homework?file_path=${encodeURIComponent(filePath)}`;
+}
+
 // 选择并预览PPT
 let selectAndPreviewRunning = false;
 async function selectAndPreview() {
@@ -429,13 +477,13 @@ async function selectAndPreview() {
 
         // 通过 REST 获取配置
         if (window.__API_BASE__) {
-            const resp = await fetch(`${window.__API_BASE__}/api/config`);
+            const resp = await fetch(`${window.__API_BASE__}/api/config`, { cache: 'no-cache' });
             const config = await resp.json();
             console.log('[selectAndPreview] get_config ok (REST)', config);
             if (config.ppt_file_path) {
-                showLoading('加载保存的PPT文件...');
-                const pr = await fetch(`${window.__API_BASE__}/api/preview_homework`, { method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({ file_path: config.ppt_file_path })});
-                const previewResult = await pr.json();
+                showLoading('加载保存的PPT文件...', true);
+                const previewResult = takeBootPreview(config.ppt_file_path)
+                    || await (await fetch(previewUrl(config.ppt_file_path), { cache: 'no-cache' })).json();
                 console.log('[selectAndPreview] preview with saved path result (REST)', previewResult);
                 if (previewResult.success) {
                     currentFile = config.ppt_file_path; // 设置当前文件路径
@@ -456,7 +504,7 @@ async function selectAndPreview() {
             const config = await pywebview.api.get_config();
             console.log('[selectAndPreview] get_config ok', config);
             if (config.ppt_file_path) {
-                showLoading('加载保存的PPT文件...');
+                showLoading('加载保存的PPT文件...', true);
                 if (!ensureApiMethod('preview_homework')) {
                     await waitForApi(2000);
                     if (!ensureApiMethod('preview_homework')) throw new Error('preview_homework not available');
@@ -497,6 +545,7 @@ async function selectAndPreview() {
         if (result.success && result.file_path) {
             currentFile = result.file_path;
             updateStatus('正在解析PPT内容...');
+            showLoading('正在解析PPT内容...', true);
             
             if (!ensureApiMethod('preview_homework')) {
                 await waitForApi(2000);
@@ -504,7 +553,7 @@ async function selectAndPreview() {
             }
             let previewResult;
             if (window.__API_BASE__) {
-                const pr2 = await fetch(`${window.__API_BASE__}/api/preview_homework`, { method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({ file_path: currentFile })});
+                const pr2 = await fetch(previewUrl(currentFile), { cache: 'no-cache' });
                 previewResult = await pr2.json();
             } else {
                 previewResult = await pywebview.api.preview_homework(currentFile);
@@ -549,6 +598,29 @@ function showPreview(content, fileName) {
     switchPage('preview-page');
 }
 
+// 后端监视到PPT保存后推送的最新预览：正在预览同一文件时直接刷新
+window.onHomeworkUpdated = function(data) {
+    try {
+        if (!data || !data.content) return;
+        const norm = (p) => String(p || '').replace(/\\/g, '/').toLowerCase();
+        // 尚未打开预览时，更新 bootstrap 带回的预览，避免首次打开时显示旧内容
+        const boot = window.__bootstrap;
+        if (boot && boot.preview && norm(boot.preview.file_path) === norm(data.file_path)) {
+            boot.preview = { ...boot.preview, ...data };
+        }
+        if (!currentFile) return;
+        if (norm(data.file_path) !== norm(currentFile)) return;
+        const previewPage = document.getElementById('preview-page');
+        if (!previewPage || !previewPage.classList.contains('active')) return;
+        previewContent = data.content;
+        document.getElementById('preview-content').innerHTML = markdownToHtml(data.content);
+        updateStatus('PPT 已更新，预览已刷新');
+        console.log('[onHomeworkUpdated] 预览已刷新 v' + data.version);
+    } catch (e) {
+        console.warn('[onHomeworkUpdated] 刷新失败', e);
+    }
+};
+
 // 绑定确认发送按钮事件
 function bindConfirmSendButton() {
     const btn = document.getElementById('confirm-send-btn');
@@ -589,6 +661,15 @@ async function confirmSend() {
     
     try {
         let result;
+        // 发送前查询限流排队情况，需要等待时提示用户
+        if (window.__API_BASE__) {
+            try {
+                const rl = await (await fetch(`${window.__API_BASE__}/api/ratelimit/status`, { cache: 'no-store' })).json();
+                if (rl && rl.success && rl.expected_wait_s >= 1) {
+                    showLoading(`发送较频繁，排队中（预计等待 ${Math.ceil(rl.expected_wait_s)} 秒）...`);
+                }
+            } catch (_) {}
+        }
         if (window.__API_BASE__) {
             // 直接发送预览内容，不需要文件路径
             console.log('[confirmSend] 使用 REST API 发送内容');
@@ -598,7 +679,10 @@ async function confirmSend() {
                 body: JSON.stringify({ content: previewContent })
             });
             console.log('[confirmSend] 响应状态:', response.status);
-            result = await response.json();
+            const submitted = await response.json();
+            console.log('[confirmSend] 任务已提交:', submitted);
+            // 发送在后台任务中执行，这里长轮询任务状态，界面保持可响应
+            result = submitted.job_id ? await waitForSendJob(submitted.job_id) : submitted;
             console.log('[confirmSend] 响应结果:', result);
         } else {
             // 回退到 pywebview
@@ -624,6 +708,25 @@ async function confirmSend() {
     }
 }
 
+// 长轮询发送任务直到完成，返回发送结果
+async function waitForSendJob(jobId) {
+    let version = -1;
+    for (;;) {
+        const url = `${window.__API_BASE__}/api/jobs/${encodeURIComponent(jobId)}?wait=25&since=${Math.max(version, 0)}`;
+        const data = await (await fetch(url, { cache: 'no-store' })).json();
+        if (!data || !data.success) {
+            return { success: false, error: (data && data.error) || '无法获取发送任务状态' };
+        }
+        const job = data.job;
+        if (job.version !== version) {
+            version = job.version;
+            if (job.status === 'queued') showLoading('发送任务排队中...');
+            else if (job.status === 'running') showLoading('正在发送到钉钉...');
+        }
+        if (job.status === 'done') return job.result || { success: false, error: '发送任务无结果' };
+    }
+}
+
 // 返回主页
 function goBack() {
     switchPage('main-page');
@@ -759,6 +862,86 @@ function hideModalWithAnimation(modal) {
 
 
 
+// 多群配置与文本框互转：每行 "群名称=Access Token"
+function targetsToText(targets) {
+    return (targets || [])
+        .filter(t => t && t.access_token)
+        .map(t => (t.name ? `${t.name}=${t.access_token}` : t.access_token))
+        .join('\n');
+}
+
+// 节假日、调休日等“每行一条”的设置
+function listToLines(items) {
+    return (items || [])
+        .map(item => (item && typeof item === 'object')
+            ? `${item.date}${item.time || item.as ? '=' + (item.time || item.as) : ''}`
+            : String(item))
+        .join('\n');
+}
+
+function linesToList(text) {
+    return String(text || '').split('\n').map(line => line.trim()).filter(Boolean);
+}
+
+function parseTargetsText(text) {
+    const targets = [];
+    String(text || '').split('\n').forEach((line, i) => {
+        line = line.trim();
+        if (!line) return;
+        // webhook 链接自身含 "="：以链接开头的行视为未命名，否则按第一个 "=" 拆分名称
+        const eq = line.indexOf('=');
+        if (eq > 0 && !/^https?:/i.test(line)) {
+            targets.push({ name: line.slice(0, eq).trim(), access_token: line.slice(eq + 1).trim() });
+        } else {
+            targets.push({ name: `群${i + 1}`, access_token: line });
+        }
+    });
+    return targets;
+}
+
+// 一次取回首屏所需状态（配置、调度状态、开机启动状态、已解析的预览与更新检查缓存）
+async function loadBootstrap() {
+    checkApiAvailable();
+    try {
+        const resp = await fetch(`${window.__API_BASE__}/api/bootstrap`, { cache: 'no-store' });
+        const boot = await resp.json();
+        if (!boot || !boot.success || !boot.config) throw new Error((boot && boot.error) || '无数据');
+        window.__bootstrap = boot;
+        applySettings(boot.config);
+        applyTheme(boot.config.theme || 'dark');
+        if (boot.autostart) updateAutostartStatusDisplay(boot.autostart);
+        if (boot.scheduler_status) updateSchedulerStatus(boot.scheduler_status);
+        console.log(`[Bootstrap] 首屏状态已加载（服务端 ${boot.elapsed_ms}ms）`);
+        return true;
+    } catch (e) {
+        console.warn('[Bootstrap] 加载失败，回退逐个请求', e);
+        return false;
+    }
+}
+
+// 首屏状态只加载一次：DOMContentLoaded 与 pywebviewready 都会调用，共用同一个请求
+function loadStartupState() {
+    if (!window.__startupLoad) {
+        window.__startupLoad = loadBootstrap().then((ok) => {
+            if (ok) return;
+            loadSettings();
+            initTheme();
+            checkSchedulerStatus();
+        });
+    }
+    return window.__startupLoad;
+}
+
+// 取出首屏随 bootstrap 带回的预览（仅用一次，路径不一致时忽略）
+function takeBootPreview(filePath) {
+    const boot = window.__bootstrap;
+    const preview = boot && boot.preview;
+    if (!preview) return null;
+    boot.preview = null;
+    const norm = (p) => String(p || '').replace(/\\/g, '/').toLowerCase();
+    return norm(preview.file_path) === norm(filePath) ? preview : null;
+}
+
 // 加载设置
 async function loadSettings() {
     try {
@@ -767,7 +950,7 @@ async function loadSettings() {
         // 优先通过 REST 读取，避免桥接未就绪导致未加载
         if (window.__API_BASE__) {
             try {
-                const resp = await fetch(`${window.__API_BASE__}/api/config`, { cache: 'no-store' });
+                const resp = await fetch(`${window.__API_BASE__}/api/config`, { cache: 'no-cache' });
                 config = await resp.json();
             } catch (e) {
                 console.warn('REST 获取配置失败，回退 pywebview', e);
@@ -783,46 +966,55 @@ async function loadSettings() {
 
         if (!config) throw new Error('无法加载配置');
 
-        // 记录最近一次成功加载/保存的配置，用于取消还原
-        lastLoadedConfig = { ...config };
+        applySettings(config);
 
-        document.getElementById('access-token').value = config.access_token || '';
-        document.getElementById('ppt-file-path').value = config.ppt_file_path || '';
+        // 加载开机启动状态（若桥接未就绪会自动跳过）
+        await loadAutostartStatus();
 
-        // 处理新的调度时间设置
-        document.getElementById('weekday-time').value = config.weekday_send_time || '05:00';
-        document.getElementById('friday-time').value = config.friday_send_time || '15:00';
+        console.log('设置加载成功:', config);
+    } catch (error) {
+        console.error('加载设置失败:', error);
+    }
+}
 
-        // 兼容旧版本，如果没有新字段则使用旧字段
-        if (!config.weekday_send_time && config.auto_send_time) {
-            document.getElementById('weekday-time').value = config.auto_send_time;
-        }
-        if (!config.friday_send_time && config.auto_send_time) {
-            document.getElementById('friday-time').value = config.auto_send_time;
-        }
+// 把配置填入设置表单
+function applySettings(config) {
+    // 记录最近一次成功加载/保存的配置，用于取消还原
+    lastLoadedConfig = { ...config };
 
-        document.getElementById('auto-enabled').checked = config.auto_send_enabled || false;
+    document.getElementById('access-token').value = config.access_token || '';
+    document.getElementById('extra-targets').value = targetsToText(config.targets);
+    document.getElementById('ppt-file-path').value = config.ppt_file_path || '';
 
-        // 新增选项
-        const uiChk = document.getElementById('autostart-ui');
+    // 处理新的调度时间设置
+    document.getElementById('weekday-time').value = config.weekday_send_time || '05:00';
+    document.getElementById('friday-time').value = config.friday_send_time || '15:00';
 
-        if (uiChk) uiChk.checked = (config.auto_start_ui ?? true);
+    // 兼容旧版本，如果没有新字段则使用旧字段
+    if (!config.weekday_send_time && config.auto_send_time) {
+        document.getElementById('weekday-time').value = config.auto_send_time;
+    }
+    if (!config.friday_send_time && config.auto_send_time) {
+        document.getElementById('friday-time').value = config.auto_send_time;
+    }
 
-        // 已移除“毛玻璃”动态配置相关监听
+    document.getElementById('holiday-dates').value = listToLines(config.holidays);
+    document.getElementById('makeup-days').value = listToLines(config.makeup_workdays);
 
-        // 设置主题下拉框
-        const theme = config.theme || 'dark';
-        const themeText = theme === 'dark' ? '深色模式' : '浅色模式';
-        document.getElementById('theme-select-text').textContent = themeText;
-        updateThemeSelection(theme);
+    document.getElementById('auto-enabled').checked = config.auto_send_enabled || false;
 
-        // 加载开机启动状态（若桥接未就绪会自动跳过）
-        await loadAutostartStatus();
+    // 新增选项
+    const uiChk = document.getElementById('autostart-ui');
 
-        console.log('设置加载成功:', config);
-    } catch (error) {
-        console.error('加载设置失败:', error);
-    }
+    if (uiChk) uiChk.checked = (config.auto_start_ui ?? true);
+
+    // 已移除“毛玻璃”动态配置相关监听
+
+    // 设置主题下拉框
+    const theme = config.theme || 'dark';
+    const themeText = theme === 'dark' ? '深色模式' : '浅色模式';
+    document.getElementById('theme-select-text').textContent = themeText;
+    updateThemeSelection(theme);
 }
 
 // 加载开机启动状态
@@ -870,12 +1062,15 @@ async function saveSettings() {
 
     const config = {
         access_token: accessToken,
+        targets: parseTargetsText(document.getElementById('extra-targets').value),
         ppt_file_path: document.getElementById('ppt-file-path').value,
         // 新的调度时间设置
         weekday_send_time: document.getElementById('weekday-time').value,
         friday_send_time: document.getElementById('friday-time').value,
         // 保持向后兼容
         auto_send_time: document.getElementById('weekday-time').value,
+        holidays: linesToList(document.getElementById('holiday-dates').value),
+        makeup_workdays: linesToList(document.getElementById('makeup-days').value),
         auto_send_enabled: document.getElementById('auto-enabled').checked,
         theme: themeValue,
         auto_start_ui: document.getElementById('autostart-ui')?.checked ?? true,
@@ -956,9 +1151,12 @@ function cancelSettings() {
         if (lastLoadedConfig) {
             const lc = lastLoadedConfig;
             document.getElementById('access-token').value = lc.access_token || '';
+            document.getElementById('extra-targets').value = targetsToText(lc.targets);
             document.getElementById('ppt-file-path').value = lc.ppt_file_path || '';
             document.getElementById('weekday-time').value = lc.weekday_send_time || lc.auto_send_time || '17:00';
             document.getElementById('friday-time').value = lc.friday_send_time || lc.auto_send_time || '15:00';
+            document.getElementById('holiday-dates').value = listToLines(lc.holidays);
+            document.getElementById('makeup-days').value = listToLines(lc.makeup_workdays);
             document.getElementById('auto-enabled').checked = !!lc.auto_send_enabled;
             // 已移除“毛玻璃”动态配置的还原
         }
@@ -972,10 +1170,11 @@ function cancelSettings() {
 // 已移除“毛玻璃”动态配置函数
 
 // 显示加载状态
-function showLoading(text = '处理中...') {
+function showLoading(text = '处理中...', cancellable = false) {
     const loading = document.getElementById('loading');
     const loadingText = document.querySelector('.loading-text');
     loadingText.textContent = text;
+    loading.classList.toggle('cancellable', !!cancellable);
     loading.classList.add('active');
     console.log('[loading] show:', text);
 }
@@ -983,10 +1182,23 @@ function showLoading(text = '处理中...') {
 // 隐藏加载状态
 function hideLoading() {
     const loading = document.getElementById('loading');
-    loading.classList.remove('active');
+    loading.classList.remove('active', 'cancellable');
     console.log('[loading] hide');
 }
 
+// 取消正在进行的PPT解析（后端会结束解析子进程）
+async function cancelParse() {
+    try {
+        if (window.__API_BASE__) {
+            await fetch(`${window.__API_BASE__}/api/parse/cancel`, { method: 'POST' });
+        } else if (ensureApiMethod('cancel_parse')) {
+            await pywebview.api.cancel_parse();
+        }
+    } catch (e) {
+        console.warn('[cancelParse] 取消失败', e);
+    }
+}
+
 // 更新状态文本
 function updateStatus(text) {
     const statusText = document.getElementById('status-text');
@@ -1020,7 +1232,7 @@ async function checkSchedulerStatus() {
     try {
         // 使用 REST API 获取调度器状态
         if (window.__API_BASE__) {
-            const resp = await fetch(`${window.__API_BASE__}/api/scheduler/status`, { cache: 'no-store' });
+            const resp = await fetch(`${window.__API_BASE__}/api/scheduler/status`, { cache: 'no-cache' });
             const status = await resp.json();
             updateSchedulerStatus(status);
         } else {
@@ -1082,6 +1294,14 @@ function updateSchedulerStatus(status) {
             if (status.weekday_send_time && status.friday_send_time) {
                 statusText += `\n周一-四: ${status.weekday_send_time} | 周五: ${status.friday_send_time}`;
             }
+            // 今天不发送（周末、节假日）时提示
+            if (status.current_time === null && status.upcoming_runs) {
+                statusText += ' | 今天不发送';
+            }
+            // 其他班级（发送方案）的下次发送时间
+            (status.profiles || []).filter(p => p.id !== 'default' && p.auto_send_enabled).forEach(p => {
+                statusText += `\n${p.name}: 下次 ${p.next_run !== 'None' ? p.next_run.slice(5, 16) : '无'}`;
+            });
         } else {
             statusText = `🔴 自动发送已启用但调度器未运行`;
         }
@@ -1089,7 +1309,7 @@ function updateSchedulerStatus(status) {
         statusText = `⚪ 自动发送未启用`;
     }
 
-    schedulerInfo.innerHTML = statusText.replace('\n', '<br>');
+    schedulerInfo.innerHTML = statusText.replace(/\n/g, '<br>');
     console.log('调度器状态已更新:', statusText);
 }
 
@@ -1130,8 +1350,15 @@ async function checkUpdateManually(manual){
             try{ const m=document.getElementById('settings-modal'); if(m && m.classList.contains('active')) { hideSettings(); } }catch(_){ }
         }
         const forceParam = manual ? '?force=1' : '';
-        const r = await fetch(`${window.__API_BASE__}/api/update/check${forceParam}`);
-        const j = await r.json();
+        let j;
+        // 自动检查优先使用 bootstrap 带回的缓存结果，省去一次请求
+        if (!manual && window.__bootstrap && window.__bootstrap.update) {
+            j = window.__bootstrap.update;
+            window.__bootstrap.update = null;
+        } else {
+            const r = await fetch(`${window.__API_BASE__}/api/update/check${forceParam}`);
+            j = await r.json();
+        }
         if(!j.success){
             // 为了开发调试：当获取失败也尝试继续提示，便于验证流程
             console.warn('[update] 获取最新版本失败:', j.error);
@@ -0,0 +1,79 @@
+import re
+
+import pytest
+
+from homework_api import _split_line_bytes, split_homework_markdown
+
+PREFIX = re.compile(r"^【作业 (\d+)/(\d+)】\n\n")
+
+
+def utf8_len(text):
+    return len(text.encode("utf-8"))
+
+
+def strip_prefix(part):
+    match = PREFIX.match(part)
+    assert match, part
+    return match, part[match.end():]
+
+
+def test_short_message_is_unchanged():
+    content = "# 作业内容\n\n## 语文\n- 背诵课文\n"
+    assert split_homework_markdown(content, 5000) == [content]
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 4, 5, 7, 10])
+def test_line_split_never_breaks_multibyte_characters(limit):
+    line = "语文a数学😀英语bc" * 3
+    chunks = _split_line_bytes(line, limit)
+    assert "".join(chunks) == line
+    for chunk in chunks:
+        # 单个字符超过上限时只能独占一段
+        assert utf8_len(chunk) <= limit or len(chunk) == 1
+        chunk.encode("utf-8").decode("utf-8")
+
+
+def test_three_byte_boundary():
+    # 7 字节上限只能放下两个汉字（6 字节），第三个字不能被拆开
+    assert _split_line_bytes("一二三四五", 7) == ["一二", "三四", "五"]
+
+
+@pytest.mark.parametrize("max_bytes", [200, 333, 500])
+def test_parts_fit_limit_and_are_numbered(max_bytes):
+    lines = ["# 作业内容", ""]
+    for subject in ("语文", "数学", "英语"):
+        lines.append(f"## {subject}")
+        lines += [f"- {subject}第{i}题：完成练习册😀" for i in range(12)]
+    content = "\n".join(lines) + "\n"
+    parts = split_homework_markdown(content, max_bytes)
+    assert len(parts) > 1
+    body_lines = []
+    for i, part in enumerate(parts, 1):
+        assert utf8_len(part) <= max_bytes
+        match, body = strip_prefix(part)
+        assert (int(match.group(1)), int(match.group(2))) == (i, len(parts))
+        body_lines += [ln for ln in body.rstrip("\n").split("\n") if not ln.endswith("（续）")]
+    # 除续写标题外，原文每一行按顺序保留
+    assert [ln for ln in body_lines if ln] == [ln for ln in lines if ln]
+
+
+def test_split_subject_continues_with_heading():
+    content = "## 数学\n" + "".join(f"- 第{i}题\n" for i in range(40))
+    parts = split_homework_markdown(content, 150)
+    assert len(parts) > 1
+    for part in parts[1:]:
+        _, body = strip_prefix(part)
+        assert body.startswith("## 数学（续）\n")
+
+
+def test_oversized_single_line_is_split():
+    content = "## 语文\n- " + "很长的作业说明" * 60 + "\n"
+    parts = split_homework_markdown(content, 300)
+    assert all(utf8_len(p) <= 300 for p in parts)
+    joined = "".join(strip_prefix(p)[1].replace("## 语文（续）\n", "").replace("\n", "") for p in parts)
+    assert joined == content.replace("\n", "")
+
+
+def test_limit_too_small_raises():
+    with pytest.raises(ValueError):
+        split_homework_markdown("作业" * 100, 20)
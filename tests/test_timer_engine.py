@@ -0,0 +1,166 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from timer_engine import OVERLAP_ALLOW, OVERLAP_QUEUE, OVERLAP_SKIP, TimerEngine, daily_at
+
+
+def every(seconds):
+    def next_fire(after):
+        return after + timedelta(seconds=seconds)
+    return next_fire
+
+
+class Recorder:
+    """记录回调的并发数与调用次数；release 之前回调一直阻塞"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.release = threading.Event()
+        self.calls = 0
+        self.running = 0
+        self.max_running = 0
+
+    def __call__(self, due):
+        with self.lock:
+            self.calls += 1
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            self.release.wait(5)
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+@pytest.fixture
+def engine():
+    e = TimerEngine(name="TestEngine", max_workers=4)
+    e.start()
+    yield e
+    e.shutdown()
+
+
+def job_stats(engine, name):
+    return next(j for j in engine.jobs() if j["name"] == name)
+
+
+def wait_until(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_daily_at_is_strictly_after():
+    rule = daily_at("08:30")
+    assert rule(datetime(2026, 10, 12, 8, 0)) == datetime(2026, 10, 12, 8, 30)
+    assert rule(datetime(2026, 10, 12, 8, 30)) == datetime(2026, 10, 13, 8, 30)
+
+
+def test_unknown_overlap_policy_is_rejected(engine):
+    with pytest.raises(ValueError):
+        engine.add("bad", every(1), lambda due: None, overlap="sometimes")
+
+
+def test_fires_and_records_runs(engine):
+    fired = threading.Event()
+    engine.add("once", every(0.05), lambda due: fired.set())
+    assert fired.wait(2)
+    assert wait_until(lambda: job_stats(engine, "once")["stats"]["runs"] >= 1)
+
+
+def test_skip_policy_drops_overlapping_triggers(engine):
+    rec = Recorder()
+    engine.add("slow", every(0.05), rec, overlap=OVERLAP_SKIP)
+    assert wait_until(lambda: job_stats(engine, "slow")["stats"]["skipped"] >= 3)
+    assert rec.calls == 1
+    rec.release.set()
+    assert rec.max_running == 1
+
+
+def test_queue_policy_runs_backlog_in_order_and_caps_it(engine):
+    rec = Recorder()
+    engine.add("queued", every(0.05), rec, overlap=OVERLAP_QUEUE)
+    assert wait_until(lambda: job_stats(engine, "queued")["stats"]["skipped"] >= 1)
+    job = job_stats(engine, "queued")
+    assert job["backlog"] == TimerEngine.MAX_BACKLOG
+    assert rec.calls == 1
+    engine.clear()
+    rec.release.set()
+    assert rec.max_running == 1
+
+
+def test_queue_policy_runs_queued_trigger_after_previous_finishes(engine):
+    rec = Recorder()
+    engine.add("queued", every(0.05), rec, overlap=OVERLAP_QUEUE)
+    assert wait_until(lambda: job_stats(engine, "queued")["stats"]["queued"] >= 1)
+    rec.release.set()
+    assert wait_until(lambda: rec.calls >= 2)
+    assert rec.max_running == 1
+
+
+def test_allow_policy_runs_concurrently(engine):
+    rec = Recorder()
+    engine.add("parallel", every(0.05), rec, overlap=OVERLAP_ALLOW)
+    assert wait_until(lambda: rec.max_running >= 2)
+    rec.release.set()
+    assert job_stats(engine, "parallel")["stats"]["skipped"] == 0
+
+
+def test_timeout_stops_blocking_later_triggers(engine):
+    rec = Recorder()
+    engine.add("hung", every(0.05), rec, timeout=0.1, overlap=OVERLAP_SKIP)
+    assert wait_until(lambda: job_stats(engine, "hung")["stats"]["timed_out"] >= 1)
+    # 超时的执行不再占用重叠名额，后续触发照常执行
+    assert wait_until(lambda: rec.calls >= 2)
+    rec.release.set()
+
+
+def test_clear_by_tag(engine):
+    engine.add("a", every(60), lambda due: None, tag="one")
+    engine.add("b", every(60), lambda due: None, tag="two")
+    engine.clear(tag="one")
+    assert [j["name"] for j in engine.jobs()] == ["b"]
+
+
+def test_version_changes_on_add_and_clear(engine):
+    v0 = engine.version
+    engine.add("a", every(60), lambda due: None)
+    v1 = engine.version
+    engine.clear()
+    assert v0 < v1 < engine.version
+
+
+def test_reschedule_recomputes_due_times(engine):
+    engine.add("daily", daily_at("17:00"), lambda due: None)
+    engine.reschedule(datetime(2026, 10, 12, 12, 0))
+    assert engine.next_run() == datetime(2026, 10, 12, 17, 0)
+
+
+def test_backward_clock_jump_reschedules(monkeypatch):
+    e = TimerEngine(name="TestEngine", max_sleep=0.1)
+    jumps = []
+    e.on_clock_jump = lambda kind, seconds: jumps.append((kind, seconds))
+    due_times = []
+
+    def rule(after):
+        due_times.append(after)
+        return after + timedelta(days=30)
+
+    e.add("monthly", rule, lambda due: None)
+    real_time = time.time
+    # 墙上时间先快 100 秒再恢复：调度线程看到的是一次回拨
+    monkeypatch.setattr(time, "time", lambda: real_time() + 100)
+    e.start()
+    try:
+        time.sleep(0.2)
+        monkeypatch.setattr(time, "time", real_time)
+        assert wait_until(lambda: any(kind == "jump" and seconds < 0 for kind, seconds in jumps))
+        assert len(due_times) >= 2
+    finally:
+        e.shutdown()
@@ -0,0 +1,102 @@
+from datetime import date, datetime, time, timedelta
+from itertools import islice
+
+import pytest
+
+from timetable import Timetable
+
+# 2026-10-12 为周一
+MON = date(2026, 10, 12)
+
+
+def make(**config):
+    return Timetable.from_config({"weekday_send_time": "17:00", "friday_send_time": "15:00", **config})
+
+
+def test_weekly_times():
+    t = make()
+    assert t.time_for(MON) == time(17, 0)
+    assert t.time_for(MON + timedelta(days=4)) == time(15, 0)
+    assert t.time_for(MON + timedelta(days=5)) is None
+    assert t.time_for(MON + timedelta(days=6)) is None
+
+
+def test_send_times_override_single_weekday():
+    t = make(send_times={"sat": "10:00", "周三": None})
+    assert t.time_for(MON + timedelta(days=5)) == time(10, 0)
+    assert t.time_for(MON + timedelta(days=2)) is None
+
+
+def test_holiday_range_beats_makeup_day():
+    t = make(holidays=["2026-10-01~2026-10-07"], makeup_workdays=["2026-10-04", "2026-10-10=周五"])
+    assert t.time_for(date(2026, 10, 1)) is None
+    # 调休日落在节假日区间内时仍按节假日处理
+    assert t.time_for(date(2026, 10, 4)) is None
+    # 周六调休，按周五的时间发送
+    assert t.time_for(date(2026, 10, 10)) == time(15, 0)
+
+
+def test_makeup_day_with_explicit_time():
+    t = make(makeup_workdays=[{"date": "2026-10-11", "time": "16:30"}, "2026-10-18=mon"])
+    assert t.time_for(date(2026, 10, 11)) == time(16, 30)
+    assert t.time_for(date(2026, 10, 18)) == time(17, 0)
+
+
+def test_exception_beats_holiday_and_later_exception_wins():
+    t = make(holidays=["2026-10-01~2026-10-07"],
+             schedule_exceptions=[{"start": "2026-10-05", "end": "2026-10-09", "time": "08:00"},
+                                  {"start": "2026-10-08", "time": None}])
+    assert t.time_for(date(2026, 10, 5)) == time(8, 0)
+    assert t.time_for(date(2026, 10, 8)) is None
+    assert t.time_for(date(2026, 10, 9)) == time(8, 0)
+
+
+def test_invalid_entries_are_ignored():
+    t = make(holidays=["not-a-date"], makeup_workdays=["2026-13-01"], send_times={"xyz": "10:00"})
+    assert t.holidays == []
+    assert t.makeup_days == {}
+    assert t.time_for(MON) == time(17, 0)
+
+
+def test_next_fire_skips_closed_range():
+    t = make(schedule_exceptions=[{"start": "2026-10-13", "end": "2026-10-30", "time": None}])
+    assert t.next_fire(datetime.combine(MON, time(17, 0))) == datetime(2026, 11, 2, 17, 0)
+
+
+def test_next_fire_is_strictly_after():
+    t = make()
+    at = datetime.combine(MON, time(17, 0))
+    assert t.next_fire(at - timedelta(seconds=1)) == at
+    assert t.next_fire(at) == at + timedelta(days=1)
+
+
+@pytest.mark.parametrize("index_size", [2, 4, 8])
+def test_index_refill_matches_direct_computation(index_size):
+    t = Timetable.from_config({"weekday_send_time": "17:00", "friday_send_time": "15:00",
+                               "holidays": ["2026-10-20~2026-10-22"], "makeup_workdays": ["2026-10-25"]})
+    t.index_size = index_size
+    after = datetime.combine(MON, time(0, 0))
+    expected = list(islice(t.iter_fire_times(after), 20))
+    got = []
+    for _ in range(20):
+        after = t.next_fire(after)
+        got.append(after)
+    assert got == expected
+
+
+def test_next_fire_after_earlier_query_rebuilds_index():
+    # 系统时间先被调快再改回：较早的查询不能跳过中间的发送时刻
+    t = make()
+    assert t.next_fire(datetime(2026, 10, 12, 12)) == datetime(2026, 10, 12, 17)
+    assert t.next_fire(datetime(2026, 10, 15, 18)) == datetime(2026, 10, 16, 15)
+    assert t.next_fire(datetime(2026, 10, 12, 12)) == datetime(2026, 10, 12, 17)
+
+
+def test_offset_rule_fires_before_each_send():
+    t = make()
+    rule = t.offset_rule(timedelta(minutes=10))
+    t.next_fire(datetime(2026, 10, 12, 0))
+    assert rule(datetime(2026, 10, 12, 0)) == datetime(2026, 10, 12, 16, 50)
+    assert rule(datetime(2026, 10, 12, 16, 55)) == datetime(2026, 10, 13, 16, 50)
+    # 索引不覆盖的较早时刻从头计算
+    assert rule(datetime(2026, 10, 1, 0)) == datetime(2026, 10, 1, 16, 50)
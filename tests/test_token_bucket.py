@@ -0,0 +1,99 @@
+import time
+
+import pytest
+
+from homework_api import TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(time, "monotonic", fake)
+    return fake
+
+
+def test_capacity_leaves_room_for_refill(clock):
+    bucket = TokenBucket(rate_per_minute=20, burst=5)
+    assert bucket.capacity == 5
+    assert bucket.base_refill * 60 == pytest.approx(15)
+    # 配额小于突发量时容量收缩为配额减一
+    assert TokenBucket(rate_per_minute=3, burst=5).capacity == 2
+
+
+def test_burst_then_empty(clock):
+    bucket = TokenBucket(rate_per_minute=20, burst=5)
+    for _ in range(5):
+        assert bucket.acquire(timeout=0) == 0
+    assert bucket.acquire(timeout=0) is None
+
+
+def test_refill_over_time(clock):
+    bucket = TokenBucket(rate_per_minute=20, burst=5)
+    for _ in range(5):
+        bucket.acquire(timeout=0)
+    # 每分钟补充 15 个，即每 4 秒一个
+    clock.advance(3.9)
+    assert bucket.acquire(timeout=0) is None
+    clock.advance(0.1)
+    assert bucket.acquire(timeout=0) == 0
+    clock.advance(600)
+    assert bucket.status()["tokens"] == 5
+
+
+def test_never_exceeds_quota_in_any_minute(clock):
+    bucket = TokenBucket(rate_per_minute=20, burst=5)
+    sent = 0
+    for _ in range(600):
+        while bucket.acquire(timeout=0) is not None:
+            sent += 1
+        clock.advance(0.1)
+    # 60 秒内：初始容量 5 + 补充 15
+    assert 19 <= sent <= 20
+
+
+def test_expected_wait(clock):
+    bucket = TokenBucket(rate_per_minute=20, burst=5)
+    assert bucket.expected_wait() == 0
+    for _ in range(5):
+        bucket.acquire(timeout=0)
+    assert bucket.expected_wait() == pytest.approx(4.0)
+
+
+def test_throttle_halves_rate_and_success_recovers(clock):
+    bucket = TokenBucket(rate_per_minute=20, burst=5)
+    bucket.on_throttled()
+    assert bucket.status()["tokens"] == 0
+    assert bucket.refill * 60 == pytest.approx(7.5)
+    bucket.on_throttled()
+    assert bucket.refill * 60 == pytest.approx(3.75)
+    bucket.on_success()
+    assert bucket.refill * 60 == pytest.approx(4.75)
+    for _ in range(50):
+        bucket.on_success()
+    assert bucket.refill == bucket.base_refill
+
+
+def test_throttle_has_floor(clock):
+    bucket = TokenBucket(rate_per_minute=20, burst=5)
+    for _ in range(20):
+        bucket.on_throttled()
+    assert bucket.refill * 60 == pytest.approx(TokenBucket.MIN_REFILL_PER_MINUTE)
+
+
+def test_reconfigure_keeps_throttled_rate(clock):
+    bucket = TokenBucket(rate_per_minute=20, burst=5)
+    bucket.on_throttled()
+    bucket.configure(40, 5)
+    assert bucket.refill * 60 == pytest.approx(7.5)
+    assert bucket.base_refill * 60 == pytest.approx(35)
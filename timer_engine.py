@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+定时任务引擎
+任务按下一次触发时间保存在最小堆中，调度线程在条件变量上休眠到最近的截止时间，
+而不是每秒轮询；新增或清空任务时立即唤醒重新计算。触发精度在 100 毫秒以内。
+
+截止时间以墙上时间（时间戳）表示，休眠时长换算为单调时钟上的等待；
+为应对系统时间调整或睡眠唤醒，单次休眠不超过 max_sleep 秒，醒来后按墙上时间重新判断。
+每次醒来比较墙上时钟与单调时钟的走时：两者相差过大（系统时间被调整、睡眠期间单调时钟暂停）
+或醒得比预期晚很多（睡眠期间单调时钟仍在走），通过 on_clock_jump 回调告知使用方。
+墙上时间回拨时按当前时间重新计算全部任务的触发时间，否则要等到回拨前算出的时刻才会再次触发。
+
+到期任务交给有界线程池执行，调度线程本身只计算截止时间（触发时刻与执行超时）并分派任务。
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from metrics import Histogram
+
+
+def daily_at(time_str):
+    """返回“每天 HH:MM[:SS]”的触发规则：next_fire(after) 给出严格晚于 after 的下一次触发时间。"""
+    fmt = "%H:%M:%S" if time_str.count(":") == 2 else "%H:%M"
+    at = datetime.strptime(time_str, fmt).time()
+
+    def next_fire(after):
+        candidate = datetime.combine(after.date(), at)
+        if candidate <= after:
+            candidate = datetime.combine(after.date() + timedelta(days=1), at)
+        return candidate
+
+    return next_fire
+
+
+OVERLAP_SKIP = "skip"
+OVERLAP_QUEUE = "queue"
+OVERLAP_ALLOW = "allow"
+
+
+class TimerEngine:
+    """最小堆定时器：add 注册周期任务，到期后把 callback(due)（due 为计划触发时间）交给有界线程池执行。
+
+    调度线程只负责计算截止时间与分派任务，慢任务不会推迟其他任务的触发。每个任务可设置
+    超时（超时后不再阻塞同一任务的后续触发）与重叠策略：上一次仍在执行时，
+    skip 跳过本次、queue 等上一次结束后再执行、allow 同时执行。
+    """
+
+    # 提前量：条件变量可能略早唤醒，差距在此范围内直接触发
+    FIRE_TOLERANCE = 0.005
+    # 墙上时钟与单调时钟相差超过该秒数视为时钟跳变或睡眠唤醒
+    CLOCK_JUMP_THRESHOLD = 30.0
+    # queue 策略下每个任务最多积压的触发次数
+    MAX_BACKLOG = 3
+
+    def __init__(self, name="TimerEngine", max_sleep=300.0, on_clock_jump=None, max_workers=4):
+        self.name = name
+        self.max_sleep = max_sleep
+        # on_clock_jump(kind, seconds)：kind 为 "jump"（墙上时间相对单调时钟跳动）或 "stall"（醒得过晚）
+        self.on_clock_jump = on_clock_jump
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}Worker")
+        self._cond = threading.Condition()
+        self._heap = []
+        self._jobs = {}
+        # 执行中的任务：run_id -> {"job", "due", "started", "deadline"}（started/deadline 为单调时钟）
+        self._runs = {}
+        self._seq = itertools.count()
+        self._run_seq = itertools.count()
+        self._thread = None
+        self._stopped = False
+        # 任务状态版本号：任务增删、到期、开始或结束执行时递增
+        self._version = 0
+
+    # ---- 任务管理 ----
+
+    def add(self, name, next_fire, callback, tag=None, timeout=None, overlap=OVERLAP_SKIP):
+        """注册任务；next_fire(after: datetime) 返回下一次触发时间（None 表示不再触发）。返回任务 ID。
+
+        timeout 为单次执行的超时秒数（None 表示不限），overlap 为重叠策略（skip/queue/allow）。
+        """
+        if overlap not in (OVERLAP_SKIP, OVERLAP_QUEUE, OVERLAP_ALLOW):
+            raise ValueError(f"未知的重叠策略: {overlap}")
+        due = next_fire(datetime.now())
+        job = {
+            "id": next(self._seq),
+            "name": name,
+            "tag": tag,
+            "next_fire": next_fire,
+            "callback": callback,
+            "timeout": timeout,
+            "overlap": overlap,
+            "due": due,
+            "last_run": None,
+            "running": 0,
+            "backlog": deque(),
+            "stats": {"runs": 0, "failed": 0, "skipped": 0, "queued": 0, "timed_out": 0,
+                      "last_duration_ms": None, "duration": Histogram(window=64)},
+        }
+        with self._cond:
+            self._jobs[job["id"]] = job
+            self._version += 1
+            if due is not None:
+                heapq.heappush(self._heap, (due.timestamp(), job["id"]))
+            self._cond.notify_all()
+        return job["id"]
+
+    def clear(self, tag=None):
+        """移除全部任务（或指定 tag 的任务）；堆中的旧条目在弹出时丢弃，执行中的任务继续执行完。"""
+        with self._cond:
+            for job_id in [jid for jid, j in self._jobs.items() if tag is None or j["tag"] == tag]:
+                self._jobs[job_id]["backlog"].clear()
+                del self._jobs[job_id]
+            if not self._jobs:
+                self._heap.clear()
+            self._version += 1
+            self._cond.notify_all()
+
+    def reschedule(self, after=None):
+        """按 after（默认当前时间）重新计算全部任务的下一次触发时间并重建堆"""
+        with self._cond:
+            self._reschedule_locked(after or datetime.now())
+            self._cond.notify_all()
+
+    def _reschedule_locked(self, after):
+        self._heap = []
+        for job in self._jobs.values():
+            job["due"] = job["next_fire"](after)
+            if job["due"] is not None:
+                self._heap.append((job["due"].timestamp(), job["id"]))
+        heapq.heapify(self._heap)
+        self._version += 1
+
+    def _peek_locked(self):
+        """返回堆顶有效条目（跳过已移除或已重排的旧条目）。"""
+        while self._heap:
+            ts, job_id = self._heap[0]
+            job = self._jobs.get(job_id)
+            if job is not None and job["due"] is not None and job["due"].timestamp() == ts:
+                return ts, job
+            heapq.heappop(self._heap)
+        return None
+
+    def next_run(self):
+        """最近一次触发时间（datetime），没有任务时返回 None。"""
+        with self._cond:
+            top = self._peek_locked()
+            return top[1]["due"] if top else None
+
+    def jobs(self):
+        with self._cond:
+            return [{"name": j["name"], "tag": j["tag"], "due": j["due"], "last_run": j["last_run"],
+                     "running": j["running"], "backlog": len(j["backlog"]), "overlap": j["overlap"],
+                     "timeout": j["timeout"], "stats": self._stats_locked(j)}
+                    for j in sorted(self._jobs.values(), key=lambda j: j["due"] or datetime.max)]
+
+    @staticmethod
+    def _stats_locked(job):
+        stats = dict(job["stats"])
+        duration = stats.pop("duration").snapshot()
+        duration.pop("buckets", None)
+        stats["duration"] = duration
+        return stats
+
+    @property
+    def version(self):
+        """任务状态的版本号；状态快照据此判断是否需要重建"""
+        return self._version
+
+    def has_jobs(self):
+        with self._cond:
+            return bool(self._jobs)
+
+    # ---- 线程 ----
+
+    def is_running(self):
+        return bool(self._thread and self._thread.is_alive())
+
+    def start(self):
+        if self.is_running():
+            return
+        with self._cond:
+            self._stopped = False
+        self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+        self._thread.start()
+
+    def shutdown(self, timeout=2):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+        # 不等待执行中的任务：它们是守护线程，超时的任务可能永远不会结束
+        self._pool.shutdown(wait=False)
+
+    def _detect_clock_jump(self, wall0, mono0, timeout):
+        wall_elapsed = time.time() - wall0
+        mono_elapsed = time.monotonic() - mono0
+        drift = wall_elapsed - mono_elapsed
+        if abs(drift) > self.CLOCK_JUMP_THRESHOLD:
+            return "jump", drift
+        if timeout is not None and mono_elapsed - timeout > self.CLOCK_JUMP_THRESHOLD:
+            return "stall", mono_elapsed - timeout
+        return None
+
+    def _report_clock_jump(self, jump):
+        if self.on_clock_jump is None:
+            return
+        try:
+            self.on_clock_jump(*jump)
+        except Exception as e:
+            print(f"[{self.name}] 时钟跳变回调异常: {e}")
+
+    # ---- 分派与执行 ----
+
+    def _dispatch_locked(self, job, due, starts, notes):
+        """按重叠策略处理一次到期触发：需要执行的放入 starts，跳过/排队记入 notes（锁外打印）"""
+        self._version += 1
+        if job["running"] and job["overlap"] == OVERLAP_SKIP:
+            job["stats"]["skipped"] += 1
+            notes.append(f"任务 {job['name']} 上一次仍在执行，跳过 {due:%Y-%m-%d %H:%M:%S} 的触发")
+            return
+        if job["running"] and job["overlap"] == OVERLAP_QUEUE:
+            if len(job["backlog"]) >= self.MAX_BACKLOG:
+                job["stats"]["skipped"] += 1
+                notes.append(f"任务 {job['name']} 积压过多，丢弃 {due:%Y-%m-%d %H:%M:%S} 的触发")
+            else:
+                job["backlog"].append(due)
+                job["stats"]["queued"] += 1
+                notes.append(f"任务 {job['name']} 上一次仍在执行，{due:%Y-%m-%d %H:%M:%S} 的触发排队等待")
+            return
+        starts.append(self._start_run_locked(job, due))
+
+    def _start_run_locked(self, job, due):
+        run_id = next(self._run_seq)
+        started = time.monotonic()
+        job["running"] += 1
+        job["last_run"] = datetime.now()
+        self._runs[run_id] = {
+            "job": job,
+            "due": due,
+            "started": started,
+            "deadline": started + job["timeout"] if job["timeout"] else None,
+        }
+        return run_id, job, due
+
+    def _release_locked(self, job, starts):
+        """一次执行结束（或超时）后释放重叠占用，并取出排队的触发"""
+        job["running"] -= 1
+        self._version += 1
+        if job["backlog"] and job["running"] == 0 and job["id"] in self._jobs:
+            starts.append(self._start_run_locked(job, job["backlog"].popleft()))
+        self._cond.notify_all()
+
+    def _expire_runs_locked(self, now_mono, starts, notes):
+        for run_id, run in list(self._runs.items()):
+            if run["deadline"] is not None and now_mono >= run["deadline"]:
+                del self._runs[run_id]
+                job = run["job"]
+                job["stats"]["timed_out"] += 1
+                notes.append(f"任务 {job['name']}（计划 {run['due']:%Y-%m-%d %H:%M:%S}）超过 {job['timeout']} 秒"
+                             f"仍未结束，不再阻塞后续触发")
+                self._release_locked(job, starts)
+
+    def _submit(self, starts):
+        for run_id, job, due in starts:
+            try:
+                self._pool.submit(self._execute, run_id, job, due)
+            except RuntimeError:
+                # 线程池已关闭（程序退出中）
+                with self._cond:
+                    self._runs.pop(run_id, None)
+                    job["running"] -= 1
+
+    def _execute(self, run_id, job, due):
+        failed = False
+        try:
+            job["callback"](due)
+        except Exception as e:
+            failed = True
+            print(f"[{self.name}] 任务 {job['name']} 执行异常: {e}")
+        starts = []
+        with self._cond:
+            run = self._runs.pop(run_id, None)
+            started = run["started"] if run else None
+            stats = job["stats"]
+            stats["runs"] += 1
+            self._version += 1
+            if failed:
+                stats["failed"] += 1
+            if started is not None:
+                duration_ms = (time.monotonic() - started) * 1000
+                stats["last_duration_ms"] = round(duration_ms, 2)
+                stats["duration"].observe(duration_ms)
+                # 已超时的执行在超时时已经释放过占用
+                self._release_locked(job, starts)
+        self._submit(starts)
+
+    def _loop(self):
+        while True:
+            jump = None
+            starts = []
+            notes = []
+            with self._cond:
+                if self._stopped:
+                    return
+                wall0, mono0 = time.time(), time.monotonic()
+                self._expire_runs_locked(mono0, starts, notes)
+                top = self._peek_locked()
+                # 下一次需要醒来的时间：最近的触发时刻与最近的执行超时
+                deadlines = [r["deadline"] - mono0 for r in self._runs.values() if r["deadline"] is not None]
+                if top is not None:
+                    deadlines.append(top[0] - wall0)
+                remaining = min(deadlines) if deadlines else None
+                if top is not None and top[0] - wall0 <= self.FIRE_TOLERANCE:
+                    ts, job = top
+                    heapq.heappop(self._heap)
+                    due = job["due"]
+                    job["due"] = job["next_fire"](max(due, datetime.now()))
+                    if job["due"] is not None:
+                        heapq.heappush(self._heap, (job["due"].timestamp(), job["id"]))
+                    self._dispatch_locked(job, due, starts, notes)
+                elif not starts and not notes:
+                    # Condition.wait 基于单调时钟计时；醒来后按墙上时间重新判断
+                    timeout = None if remaining is None else min(max(remaining, 0), self.max_sleep)
+                    self._cond.wait(timeout)
+                    jump = self._detect_clock_jump(wall0, mono0, timeout)
+                    if jump is not None and jump[0] == "jump" and jump[1] < 0:
+                        # 时间回拨：堆中的触发时间是按回拨前的时间算出的，全部重新计算
+                        self._reschedule_locked(datetime.now())
+            # 日志、回调与提交都在锁外进行，期间可以安全地增删任务
+            for note in notes:
+                print(f"[{self.name}] {note}")
+            if jump is not None:
+                self._report_clock_jump(jump)
+            self._submit(starts)
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+发送时间表模块
+按星期几配置发送时间，支持节假日不发送、调休上班日（按指定星期的时间发送）以及日期区间例外
+（如寒暑假停发或改时间）。预先计算接下来的若干次发送时间，查询下一次发送为 O(1)。
+
+同一天的判定优先级：日期区间例外 > 节假日 > 调休上班日 > 每周时间。
+"""
+
+import bisect
+import threading
+from datetime import date, datetime, time, timedelta
+
+WEEKDAY_KEYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+_WEEKDAY_ALIASES = {
+    **{k: i for i, k in enumerate(WEEKDAY_KEYS)},
+    **{name: i for i, name in enumerate(("周一", "周二", "周三", "周四", "周五", "周六", "周日"))},
+    "周天": 6,
+    "星期日": 6,
+    **{f"星期{c}": i for i, c in enumerate("一二三四五六")},
+}
+
+
+def _parse_time(value):
+    if value in (None, "", False):
+        return None
+    text = str(value).strip()
+    fmt = "%H:%M:%S" if text.count(":") == 2 else "%H:%M"
+    return datetime.strptime(text, fmt).time()
+
+
+def _parse_date(value):
+    return datetime.strptime(str(value).strip(), "%Y-%m-%d").date()
+
+
+def _parse_weekday(value):
+    key = str(value).strip().lower()
+    if key in _WEEKDAY_ALIASES:
+        return _WEEKDAY_ALIASES[key]
+    if key.isdigit() and 1 <= int(key) <= 7:
+        return int(key) - 1
+    raise ValueError(f"无法识别的星期: {value}")
+
+
+def _date_range(text):
+    """解析 "YYYY-MM-DD" 或 "YYYY-MM-DD~YYYY-MM-DD"（也接受 "至"），返回 (起, 止)。"""
+    text = str(text).strip().replace("至", "~")
+    if "~" in text:
+        start, end = (_parse_date(p) for p in text.split("~", 1))
+    else:
+        start = end = _parse_date(text)
+    if end < start:
+        start, end = end, start
+    return start, end
+
+
+class Timetable:
+    """每周发送时间表（含节假日、调休与区间例外），并维护接下来若干次发送时间的索引"""
+
+    # 向后查找的最大天数（例如整个寒暑假都停发）
+    HORIZON_DAYS = 400
+
+    def __init__(self, weekly, holidays=(), makeup_days=None, exceptions=(), index_size=8):
+        # weekly: {0..6: time 或 None}
+        self.weekly = {i: weekly.get(i) for i in range(7)}
+        # holidays: [(起, 止)]
+        self.holidays = sorted(holidays)
+        # makeup_days: {date: time}
+        self.makeup_days = dict(makeup_days or {})
+        # exceptions: [(起, 止, time 或 None)]，后出现的覆盖先出现的
+        self.exceptions = list(exceptions)
+        self.index_size = index_size
+        self._lock = threading.Lock()
+        self._index = []
+        # 上一次查询的 after：索引中早于它的条目已被丢弃
+        self._index_after = None
+
+    @classmethod
+    def from_config(cls, config):
+        """从配置构建时间表；无法解析的条目会被忽略并打印警告。"""
+        default_time = config.get("auto_send_time", "09:00")
+        weekday_time = _parse_time(config.get("weekday_send_time", default_time))
+        friday_time = _parse_time(config.get("friday_send_time", default_time))
+        weekly = {0: weekday_time, 1: weekday_time, 2: weekday_time, 3: weekday_time, 4: friday_time,
+                  5: None, 6: None}
+        # send_times 可逐天覆盖，如 {"sat": "10:00", "wed": null}
+        for key, value in (config.get("send_times") or {}).items():
+            try:
+                weekly[_parse_weekday(key)] = _parse_time(value)
+            except ValueError as e:
+                print(f"[Timetable] 忽略无效的每周时间 {key}={value}: {e}")
+
+        holidays = []
+        for item in config.get("holidays") or []:
+            try:
+                holidays.append(_date_range(item))
+            except ValueError as e:
+                print(f"[Timetable] 忽略无效的节假日 {item}: {e}")
+
+        makeup_days = {}
+        for item in config.get("makeup_workdays") or []:
+            try:
+                day, when = cls._parse_makeup(item, weekly)
+                makeup_days[day] = when
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"[Timetable] 忽略无效的调休日 {item}: {e}")
+
+        exceptions = []
+        for item in config.get("schedule_exceptions") or []:
+            try:
+                start = _parse_date(item["start"])
+                end = _parse_date(item.get("end") or item["start"])
+                exceptions.append((start, end, _parse_time(item.get("time"))))
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"[Timetable] 忽略无效的例外区间 {item}: {e}")
+
+        return cls(weekly, holidays, makeup_days, exceptions)
+
+    @staticmethod
+    def _parse_makeup(item, weekly):
+        """调休日："YYYY-MM-DD"（按周一的时间）、"YYYY-MM-DD=周五"、"YYYY-MM-DD=16:30"，
+        或 {"date": ..., "as": "fri"} / {"date": ..., "time": "16:30"}。"""
+        if isinstance(item, dict):
+            day = _parse_date(item["date"])
+            if item.get("time"):
+                return day, _parse_time(item["time"])
+            return day, weekly[_parse_weekday(item.get("as", "mon"))]
+        text = str(item).strip()
+        if "=" in text:
+            day_text, rule = (p.strip() for p in text.split("=", 1))
+            day = _parse_date(day_text)
+            if ":" in rule:
+                return day, _parse_time(rule)
+            return day, weekly[_parse_weekday(rule)]
+        return _parse_date(text), weekly[0]
+
+    def time_for(self, day):
+        """返回某一天的发送时间（time），当天不发送时返回 None。"""
+        for start, end, when in reversed(self.exceptions):
+            if start <= day <= end:
+                return when
+        for start, end in self.holidays:
+            if start <= day <= end:
+                return None
+        if day in self.makeup_days:
+            return self.makeup_days[day]
+        return self.weekly[day.weekday()]
+
+    def iter_fire_times(self, after):
+        """按时间顺序产出严格晚于 after 的发送时刻。"""
+        day = after.date()
+        for _ in range(self.HORIZON_DAYS):
+            when = self.time_for(day)
+            if when is not None:
+                fire = datetime.combine(day, when)
+                if fire > after:
+                    yield fire
+            day += timedelta(days=1)
+
+    def _refill_locked(self, after):
+        start = self._index[-1] if self._index else after
+        fresh = []
+        for fire in self.iter_fire_times(max(start, after)):
+            fresh.append(fire)
+            if len(self._index) + len(fresh) >= self.index_size:
+                break
+        self._index.extend(fresh)
+
+    def next_fire(self, after):
+        """严格晚于 after 的下一次发送时刻；可直接作为 TimerEngine 的触发规则。"""
+        with self._lock:
+            # 系统时间回拨后 after 可能早于上一次查询，此时被丢弃的条目需要重新计算
+            if self._index_after is not None and after < self._index_after:
+                self._index = []
+            self._index_after = after
+            # 丢弃已过去的条目；索引不足一半时从末尾续算
+            del self._index[:bisect.bisect_right(self._index, after)]
+            if len(self._index) < self.index_size // 2:
+                self._refill_locked(after)
+            return self._index[0] if self._index else None
+
+    def offset_rule(self, before):
+        """派生规则：每次发送前 before（timedelta）触发，用于预渲染与连接预热。"""
+        def next_fire(after):
+            # 发送时刻需晚于 after + before，派生时刻才会晚于 after
+            # 索引只有在起点不晚于目标区间时才完整覆盖，否则从头计算
+            with self._lock:
+                covered = bool(self._index) and self._index[0] - before <= after
+                candidates = [f for f in self._index if f - before > after] if covered else []
+            if candidates:
+                return candidates[0] - before
+            fire = next(self.iter_fire_times(after + before), None)
+            return fire - before if fire else None
+        return next_fire
+
+    def upcoming(self, now=None):
+        """接下来的发送时刻（预先计算的索引，不做重新计算）。"""
+        with self._lock:
+            if now is None:
+                return list(self._index)
+            return [f for f in self._index if f > now]
+
+    @staticmethod
+    def describe_weekly(weekly):
+        return {WEEKDAY_KEYS[i]: (t.strftime("%H:%M") if t else None) for i, t in weekly.items()}
+
+    def today_time(self):
+        when = self.time_for(date.today())
+        return when.strftime("%H:%M") if isinstance(when, time) else None